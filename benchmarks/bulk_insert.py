@@ -0,0 +1,78 @@
+"""Compares the per-object insert/upsert paths of RecipeDBAccess with the bulk paths
+
+Runs against the test database (TESTING=True) and drops its tables when done.
+
+    python -m benchmarks.bulk_insert --rows 100000 --upsert-rows 2000
+"""
+
+import argparse
+import json
+from time import perf_counter
+from typing import Callable
+
+from benchmarks.common import get_benchmark_db
+from database.schema.models import Dish
+from database.utils.connection import RecipeDBAccess
+
+
+def make_rows(count: int, offset: int = 0) -> list[dict]:
+    return [
+        {"name": f"dish_{i}", "notes": f"notes for dish {i} https://example.com/{i}"}
+        for i in range(offset, offset + count)
+    ]
+
+
+def timed(db: RecipeDBAccess, run: Callable[[], object], rows: int) -> dict:
+    """Runs one case on empty tables and returns its duration and throughput"""
+    db.drop_tables(force=True)
+    db.create_tables()
+    start = perf_counter()
+    run()
+    seconds = perf_counter() - start
+    return {"rows": rows, "seconds": round(seconds, 4), "rows_per_second": round(rows / seconds)}
+
+
+def seed(db: RecipeDBAccess, count: int) -> None:
+    db.copy_rows(Dish, make_rows(count), columns=["name", "notes"])
+
+
+def run_benchmarks(db: RecipeDBAccess, rows: int, upsert_rows: int) -> dict[str, dict]:
+    results = {
+        "insert_many": timed(
+            db, lambda: db.insert_many([Dish(**row) for row in make_rows(rows)]), rows
+        ),
+        "bulk_insert": timed(db, lambda: db.bulk_insert(Dish, make_rows(rows)), rows),
+        "copy_rows": timed(
+            db, lambda: db.copy_rows(Dish, make_rows(rows), columns=["name", "notes"]), rows
+        ),
+    }
+
+    def upsert_each():
+        seed(db, upsert_rows)
+        for i, row in enumerate(make_rows(upsert_rows, offset=upsert_rows), start=1):
+            dish = Dish(**row)
+            dish.id = i  # IDMixin drops ids passed to the constructor
+            db.upsert(dish)
+
+    def upsert_bulk():
+        seed(db, upsert_rows)
+        updated = make_rows(upsert_rows, offset=upsert_rows)
+        db.bulk_upsert(Dish, [{"id": i, **row} for i, row in enumerate(updated, start=1)])
+
+    results["upsert"] = timed(db, upsert_each, upsert_rows)
+    results["bulk_upsert"] = timed(db, upsert_bulk, upsert_rows)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000, help="rows per insert case")
+    parser.add_argument("--upsert-rows", type=int, default=2000, help="rows per upsert case")
+    args = parser.parse_args()
+
+    _db = get_benchmark_db()
+    try:
+        _results = run_benchmarks(_db, rows=args.rows, upsert_rows=args.upsert_rows)
+        print(json.dumps(_results, indent=2))
+    finally:
+        _db.drop_tables(force=True)
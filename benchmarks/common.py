@@ -0,0 +1,85 @@
+"""Helpers shared by the benchmark scripts
+
+The scripts are run as modules from the repository root, e.g. python -m benchmarks.suite,
+and always against the test database (TESTING=True).
+"""
+
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+sys.path.append(str(ROOT / "src"))
+from database.utils.connection import RecipeDBAccess
+
+
+def get_benchmark_db() -> RecipeDBAccess:
+    """Returns the database instance, refusing to touch the production database
+
+    Raises:
+        RuntimeError: If the environment points at the production database
+    """
+    db = RecipeDBAccess.from_env()
+    if db._credentials.is_production:
+        raise RuntimeError("Benchmarks must run against the test database, set TESTING=True")
+    return db
+
+
+def git_revision() -> str:
+    """Returns the short hash of HEAD, with a -dirty suffix for uncommitted changes"""
+
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], cwd=ROOT, capture_output=True, text=True, check=False
+        ).stdout.strip()
+
+    revision = git("rev-parse", "--short", "HEAD") or "unknown"
+    if git("status", "--porcelain", "--untracked-files=no"):
+        revision += "-dirty"
+    return revision
+
+
+def measure(
+    run: Callable[[], object],
+    repeat: int,
+    warmup: int = 1,
+    setup: Callable[[], object] | None = None,
+) -> dict:
+    """Times a case and summarizes its durations in milliseconds
+
+    Args:
+        run (Callable[[], object]): The case, called once per sample
+        repeat (int): The number of timed samples
+        warmup (int): Untimed calls before sampling, to fill pools and caches
+        setup (Callable[[], object] | None): Untimed call before every sample
+
+    Returns:
+        dict: The sample count, min, median, p95, max and mean durations
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        run()
+
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = perf_counter()
+        run()
+        samples.append((perf_counter() - start) * 1000)
+
+    samples.sort()
+    return {
+        "samples": len(samples),
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "max_ms": round(samples[-1], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+    }
@@ -0,0 +1,63 @@
+"""Compares two suite results and flags the cases that got slower
+
+Cases are compared by median. Exits with status 1 when any case regressed by more than the
+threshold, so the script can gate a CI job.
+
+    python -m benchmarks.compare results/0aa4507-100k.json results/826e64b-100k.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> tuple[list[list[str]], bool]:
+    """Builds the comparison table of two suite results
+
+    Args:
+        baseline (dict): The older result
+        candidate (dict): The newer result
+        threshold (float): The relative slowdown that counts as a regression, e.g. 0.1
+
+    Returns:
+        tuple[list[list[str]], bool]: The table rows, and whether any case regressed
+    """
+    rows = []
+    regressed = False
+    for name in sorted(baseline["cases"].keys() | candidate["cases"].keys()):
+        before = baseline["cases"].get(name, {}).get("median_ms")
+        after = candidate["cases"].get(name, {}).get("median_ms")
+        if before is None or after is None:
+            cells = ["-" if ms is None else f"{ms:.3f}" for ms in (before, after)]
+            rows.append([name, *cells, "", "new" if before is None else "removed"])
+            continue
+        ratio = after / before if before else float("inf")
+        status = ""
+        if ratio > 1 + threshold:
+            status = "REGRESSED"
+            regressed = True
+        elif ratio < 1 - threshold:
+            status = "improved"
+        rows.append([name, f"{before:.3f}", f"{after:.3f}", f"{ratio:.2f}x", status])
+    return rows, regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.1, help="default 0.1 is 10%%")
+    args = parser.parse_args()
+
+    _baseline = json.loads(args.baseline.read_text())
+    _candidate = json.loads(args.candidate.read_text())
+    if _baseline["scale"] != _candidate["scale"]:
+        print(f"Warning: comparing scale {_baseline['scale']} with {_candidate['scale']}")
+
+    _rows, _regressed = compare(_baseline, _candidate, threshold=args.threshold)
+    header = ["case", f"{_baseline['revision']} ms", f"{_candidate['revision']} ms", "ratio", ""]
+    widths = [max(len(row[i]) for row in [header, *_rows]) for i in range(len(header))]
+    for row in [header, *_rows]:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+    sys.exit(1 if _regressed else 0)
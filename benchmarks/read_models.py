@@ -0,0 +1,47 @@
+"""Compares the memory and time of loading dishes as ORM objects and as read models
+
+Run after seeding, e.g. python -m benchmarks.seed --scale 100k.
+
+    python -m benchmarks.read_models
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+from time import perf_counter
+from typing import Callable
+
+from benchmarks.common import get_benchmark_db
+from database.schema.models import Dish
+from database.schema.read_models import DishRow, DishSummary
+from database.utils.connection import RecipeDBAccess
+
+
+def profile(load: Callable[[], object]) -> dict:
+    """Loads once, and returns the duration and the peak memory allocated while loading"""
+    gc.collect()
+    tracemalloc.start()
+    start = perf_counter()
+    result = load()
+    seconds = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rows = result if isinstance(result, int) else len(result)  # type: ignore[arg-type]
+    return {"rows": rows, "seconds": round(seconds, 4), "peak_mib": round(peak / 2**20, 2)}
+
+
+def run_benchmarks(db: RecipeDBAccess) -> dict[str, dict]:
+    return {
+        "orm.get_all": profile(lambda: db.get_all(Dish)),
+        "read_model.get_rows.DishRow": profile(lambda: db.get_rows(DishRow)),
+        "read_model.get_rows.DishSummary": profile(lambda: db.get_rows(DishSummary)),
+        # Consumed without keeping the rows, like an export does
+        "read_model.iter_rows.DishRow": profile(lambda: sum(1 for _ in db.iter_rows(DishRow))),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+    print(json.dumps(run_benchmarks(get_benchmark_db()), indent=2))
@@ -0,0 +1,189 @@
+"""Seeds the test database with a synthetic, reproducible data set
+
+The scale is the number of dishes. Every other table grows with it: half as many recipes,
+one review per dish with one to three reviewers, and one event per ten dishes with one to
+eight dishes each. Rows are loaded with COPY, so the 1m scale takes minutes, not hours.
+
+    python -m benchmarks.seed --scale 100k
+"""
+
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Callable, Iterator
+
+from sqlalchemy import text
+
+from benchmarks.common import get_benchmark_db
+from database.analytics.summaries import refresh_summaries
+from database.notes.render import backfill_rendered_notes
+from database.schema.models import (
+    Base,
+    Dish,
+    DishRecipe,
+    Event,
+    EventDish,
+    PeopleReview,
+    Person,
+    Recipe,
+    Review,
+)
+from database.similarity.neighbors import build_similarity
+from database.utils.connection import RecipeDBAccess
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+ADJECTIVES = ["spicy", "smoked", "crispy", "creamy", "roasted", "braised", "grilled", "tangy"]
+PROTEINS = ["chicken", "tofu", "salmon", "beef", "pork", "shrimp", "lentil", "mushroom"]
+STYLES = ["curry", "tacos", "stew", "noodles", "salad", "sandwich", "casserole", "soup"]
+NOTE_WORDS = [
+    "double the garlic",
+    "kids loved it",
+    "needs more salt",
+    "marinate overnight",
+    "freezes well",
+    "serve with rice",
+    "too sweet",
+    "make ahead",
+]
+EVENT_TYPES = ["dinner", "party", "potluck", "holiday", "picnic"]
+
+START = datetime(2021, 1, 1)
+SPAN_SECONDS = 3 * 365 * 24 * 3600
+
+
+def counts(dishes: int) -> dict[str, int]:
+    """Returns the number of parent rows generated for a scale"""
+    return {
+        "dishes": dishes,
+        "recipes": max(dishes // 2, 1),
+        "people": max(dishes // 100, 10),
+        "reviews": dishes,
+        "events": max(dishes // 10, 1),
+    }
+
+
+def random_time(rng: random.Random) -> datetime:
+    return START + timedelta(seconds=rng.randrange(SPAN_SECONDS))
+
+
+def id_time(i: int, count: int) -> datetime:
+    """Returns the time of the i-th of count rows, later ids being later like a serial id
+
+    Child rows look it up to copy the partition key of their parent.
+    """
+    return START + timedelta(seconds=SPAN_SECONDS * (i - 1) // count)
+
+
+def sample_ids(rng: random.Random, upper: int, low: int, high: int) -> list[int]:
+    """Returns between low and high distinct ids in 1..upper"""
+    return rng.sample(range(1, upper + 1), min(rng.randint(low, high), upper))
+
+
+def dish_rows(rng: random.Random, n: dict[str, int]) -> Iterator[dict]:
+    for i in range(1, n["dishes"] + 1):
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(PROTEINS)} {rng.choice(STYLES)}"
+        notes = f"{rng.choice(NOTE_WORDS)}, {rng.choice(NOTE_WORDS)} https://example.com/{i}"
+        yield {"id": i, "name": f"{name} {i}", "notes": notes, "created_at": random_time(rng)}
+
+
+def recipe_rows(rng: random.Random, n: dict[str, int]) -> Iterator[dict]:
+    for i in range(1, n["recipes"] + 1):
+        added_at = random_time(rng)
+        yield {"id": i, "url": f"https://example.com/recipes/{i}", "added_at": added_at}
+
+
+def dish_recipe_rows(rng: random.Random, n: dict[str, int]) -> Iterator[dict]:
+    for dish_id in range(1, n["dishes"] + 1):
+        for recipe_id in sample_ids(rng, n["recipes"], 0, 2):
+            yield {"dish_id": dish_id, "recipe_id": recipe_id}
+
+
+def person_rows(rng: random.Random, n: dict[str, int]) -> Iterator[dict]:
+    for i in range(1, n["people"] + 1):
+        yield {"id": i, "name": f"person {i}"}
+
+
+def review_rows(rng: random.Random, n: dict[str, int]) -> Iterator[dict]:
+    for i in range(1, n["reviews"] + 1):
+        created_at = id_time(i, n["reviews"])
+        yield {"id": i, "dish_id": rng.randint(1, n["dishes"]), "created_at": created_at}
+
+
+def people_review_rows(rng: random.Random, n: dict[str, int]) -> Iterator[dict]:
+    for review_id in range(1, n["reviews"] + 1):
+        created_at = id_time(review_id, n["reviews"])
+        for people_id in sample_ids(rng, n["people"], 1, 3):
+            yield {"people_id": people_id, "review_id": review_id, "review_created_at": created_at}
+
+
+def event_rows(rng: random.Random, n: dict[str, int]) -> Iterator[dict]:
+    for i in range(1, n["events"] + 1):
+        yield {"id": i, "type": rng.choice(EVENT_TYPES), "started_at": id_time(i, n["events"])}
+
+
+def event_dish_rows(rng: random.Random, n: dict[str, int]) -> Iterator[dict]:
+    for event_id in range(1, n["events"] + 1):
+        started_at = id_time(event_id, n["events"])
+        for dish_id in sample_ids(rng, n["dishes"], 1, 8):
+            yield {"event_id": event_id, "event_started_at": started_at, "dish_id": dish_id}
+
+
+RowGenerator = Callable[[random.Random, dict[str, int]], Iterator[dict]]
+
+# Parents before children, so every foreign key resolves as soon as its row is copied
+TABLES: list[tuple[type[Base], list[str], RowGenerator]] = [
+    (Dish, ["id", "name", "notes", "created_at"], dish_rows),
+    (Recipe, ["id", "url", "added_at"], recipe_rows),
+    (DishRecipe, ["dish_id", "recipe_id"], dish_recipe_rows),
+    (Person, ["id", "name"], person_rows),
+    (Review, ["id", "dish_id", "created_at"], review_rows),
+    (PeopleReview, ["people_id", "review_id", "review_created_at"], people_review_rows),
+    (Event, ["id", "type", "started_at"], event_rows),
+    (EventDish, ["event_id", "event_started_at", "dish_id"], event_dish_rows),
+]
+
+
+def seed(db: RecipeDBAccess, dishes: int, random_seed: int = 0) -> dict[str, int]:
+    """Recreates the tables and fills them with synthetic rows
+
+    Args:
+        db (RecipeDBAccess): The test database
+        dishes (int): The number of dishes, which sets the size of every other table
+        random_seed (int): The seed of the generator, the same seed gives the same rows
+
+    Returns:
+        dict[str, int]: The number of rows copied into each table
+    """
+    rng = random.Random(random_seed)
+    n = counts(dishes)
+    db.drop_tables(force=True)
+    db.create_tables()
+    # Every seeded month gets its partition, rather than filling the default ones
+    db.ensure_partitions(start=START)
+
+    copied = {}
+    for obj_type, columns, rows in TABLES:
+        copied[obj_type.__tablename__] = db.copy_rows(obj_type, rows(rng, n), columns=columns)
+    db.sync_sequences()
+    backfill_rendered_notes(db, batch_size=10000)
+    refresh_summaries(db)
+    build_similarity(db)
+
+    # Fresh statistics, so the planner sees the seeded sizes rather than empty tables
+    with db._engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE"))
+    return copied
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="10k")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    start = perf_counter()
+    _copied = seed(get_benchmark_db(), dishes=SCALES[args.scale], random_seed=args.seed)
+    print(json.dumps({"rows": _copied, "seconds": round(perf_counter() - start, 2)}, indent=2))
@@ -0,0 +1,114 @@
+"""Profiles the cold start of a web worker: importing the app, and serving its first request
+
+Each run is a fresh interpreter, started with -X importtime, so nothing is cached between
+runs. The import of tracker.app is broken down by top-level package, by the time spent in
+the package's own modules, and by page module, since Dash registers every page while the app
+is created. Page times include the imports the page triggers.
+
+    python -m benchmarks.startup --runs 5 --top 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from benchmarks.common import ROOT
+
+# Runs in the child interpreter, and prints its timings as the last line of stdout. Dash
+# executes the page modules from their files, which -X importtime does not report, so the
+# page loader is timed here
+CHILD = """
+import json
+from importlib.machinery import SourceFileLoader
+from time import perf_counter
+
+pages = {}
+exec_module = SourceFileLoader.exec_module
+
+def timed_exec_module(loader, module):
+    start = perf_counter()
+    exec_module(loader, module)
+    if module.__name__.startswith("pages."):
+        pages[module.__name__] = (perf_counter() - start) * 1000
+
+SourceFileLoader.exec_module = timed_exec_module
+start = perf_counter()
+import tracker.app
+imported = perf_counter()
+client = tracker.app.app.server.test_client()
+for path in ["/", "/_dash-layout", "/_dash-dependencies"]:
+    client.get(path)
+served = perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_request_ms": (served - imported) * 1000,
+    "pages": pages,
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, float, float]]:
+    """Parses the -X importtime report
+
+    Returns:
+        list[tuple[str, float, float]]: The (module, self ms, cumulative ms) of every import,
+            in the order they finished
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        imports.append((module.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return imports
+
+
+def profile_once() -> dict:
+    """Starts one interpreter, imports the app and serves the first requests"""
+    env = {**os.environ, "PYTHONPATH": str(ROOT / "src")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        cwd=ROOT / "src",
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(result.stderr)
+    by_package: dict[str, float] = defaultdict(float)
+    for module, self_ms, _ in imports:
+        by_package[module.split(".")[0]] += self_ms
+    return {**timings, "by_package": dict(by_package)}
+
+
+def summarize(runs: list[dict], top: int) -> dict:
+    """Takes the median of every timing over the runs, and keeps the slowest entries"""
+
+    def median_of(key: str) -> dict[str, float]:
+        names = {name for run in runs for name in run[key]}
+        medians = {
+            name: round(statistics.median(run[key].get(name, 0.0) for run in runs), 2)
+            for name in names
+        }
+        return dict(sorted(medians.items(), key=lambda item: item[1], reverse=True)[:top])
+
+    return {
+        "runs": len(runs),
+        "import_ms": round(statistics.median(run["import_ms"] for run in runs), 1),
+        "first_request_ms": round(statistics.median(run["first_request_ms"] for run in runs), 1),
+        "by_package_self_ms": median_of("by_package"),
+        "pages_ms": median_of("pages"),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Interpreters to start")
+    parser.add_argument("--top", type=int, default=15, help="Slowest entries to report")
+    args = parser.parse_args()
+    print(json.dumps(summarize([profile_once() for _ in range(args.runs)], args.top), indent=2))
@@ -0,0 +1,435 @@
+"""Times the data-access layer and the Dash pages against a seeded test database
+
+Every RecipeDBAccess query method, every page layout and every page callback is a case.
+Pages and callbacks go through Flask's test client, so routing, callback dispatch and JSON
+serialization are included, but not the browser or the network. Read cases run first, then
+the write cases, which add rows to the seeded tables.
+
+Results are written to benchmarks/results/<revision>-<scale>.json, for compare.py.
+
+    python -m benchmarks.suite --scale 100k --seed
+    python -m benchmarks.suite --cases "page.*" "callback.*"
+"""
+
+import argparse
+import json
+import platform
+import random
+from datetime import datetime, timedelta, timezone
+from fnmatch import fnmatch
+from pathlib import Path
+from time import sleep
+from typing import Callable, NamedTuple
+
+from sqlalchemy import func, select, text
+
+from benchmarks.common import RESULTS_DIR, get_benchmark_db, git_revision, measure
+from benchmarks.seed import SCALES, SPAN_SECONDS, START, seed
+from database.analytics.summaries import event_months
+from database.schema.models import Dish, Event, Recipe, Review
+from database.schema.read_models import DishRow, DishSummary, RecipeSummary
+from database.similarity.neighbors import similar_dishes
+from database.utils.connection import RecipeDBAccess
+from database.utils.partitions import month_of, next_month
+from tracker.app import app
+from tracker.pages.common.dish_utils import (
+    DISH_DETAIL_INCLUDE,
+    get_dish_cache,
+    get_similar_dishes,
+    make_html_similar_dishes,
+)
+
+
+def multi_output(*outputs: str) -> str:
+    """Returns the app.callback_map key of a callback with several outputs"""
+    return ".." + "...".join(outputs) + ".."
+
+
+ROUTER = multi_output("_pages_content.children", "_pages_store.data")
+LIST_CALLBACK = multi_output(
+    "dish-list.children",
+    "dish-list-page.data",
+    "dish-list-prev.disabled",
+    "dish-list-next.disabled",
+)
+SEARCH_CALLBACK = multi_output(
+    "search-results.children", "search-offset.data", "search-prev.disabled", "search-next.disabled"
+)
+SAVE_CHANGES_CALLBACK = multi_output("url-edit-dish.href", "save-dish-error.children")
+ADD_DISH_CALLBACK = multi_output("url-add-dish.href", "output-state.children")
+MOST_COOKED_CALLBACK = "analytics-most-cooked.figure"
+EXPORT_CALLBACK = "export-status.children"
+
+
+class Case(NamedTuple):
+    name: str
+    run: Callable[[], object]
+    setup: Callable[[], object] | None = None
+    heavy: bool = False  # Sampled once, without warmup
+
+
+class Client:
+    """Calls pages and callbacks the way the browser does, through the Flask test client"""
+
+    def __init__(self):
+        self._client = app.server.test_client()
+        self._client.get("/")  # The first request registers the callbacks
+
+    def callback(
+        self,
+        output: str,
+        values: dict,
+        triggered: list[str] | None = None,
+        job: dict | None = None,
+    ) -> dict:
+        """Dispatches a callback and returns its response
+
+        Args:
+            output (str): The callback's key in app.callback_map
+            values (dict): Input and state values keyed by "<component id>.<property>"
+            triggered (list[str] | None): The inputs that changed, defaults to none
+            job (dict | None): The cacheKey and job of a running background callback, to
+                ask for its result
+
+        Raises:
+            RuntimeError: If the callback fails
+        """
+        callback = app.callback_map[output]
+
+        def fill(dependencies):
+            return [
+                {**dep, "value": values.get(f"{dep['id']}.{dep['property']}")}
+                for dep in dependencies
+            ]
+
+        response = self._client.post(
+            "/_dash-update-component",
+            query_string=job,
+            json={
+                "output": output,
+                "inputs": fill(callback["inputs"]),
+                "state": fill(callback["state"]),
+                "changedPropIds": triggered or [],
+            },
+        )
+        # 204 is PreventUpdate
+        if response.status_code not in (200, 204):
+            raise RuntimeError(f"{output} returned {response.status_code}")
+        return response.get_json(silent=True) or {}
+
+    def background_callback(
+        self, output: str, values: dict, triggered: list[str] | None = None
+    ) -> dict:
+        """Starts a background callback and polls it until it returns, as the browser does
+
+        Args:
+            output (str): The callback's key in app.callback_map
+            values (dict): Input and state values keyed by "<component id>.<property>"
+            triggered (list[str] | None): The inputs that changed, defaults to none
+
+        Raises:
+            RuntimeError: If the callback fails
+        """
+        started = self.callback(output, values, triggered)
+        job = {"cacheKey": started["cacheKey"], "job": started["job"]}
+        while True:
+            response = self.callback(output, values, triggered, job=job)
+            # Until the job is done, the response only has its progress
+            if not response or "response" in response:
+                return response
+            sleep(0.01)
+
+    def output_of(self, component_id: str) -> str:
+        """Returns the app.callback_map key of the callback a component's change triggers
+
+        For callbacks whose outputs allow duplicates, which Dash keys with a hash of the
+        callback.
+        """
+        for output, callback in app.callback_map.items():
+            if any(dependency["id"] == component_id for dependency in callback["inputs"]):
+                return output
+        raise KeyError(component_id)
+
+    def page(self, pathname: str, search: str = "") -> dict:
+        """Renders a page layout through the pages router"""
+        values = {"_pages_location.pathname": pathname, "_pages_location.search": search}
+        return self.callback(ROUTER, values, triggered=["_pages_location.pathname"])
+
+
+def page_key(dish: Dish) -> list:
+    return [dish.created_at.isoformat(), dish.id]
+
+
+def read_cases(db: RecipeDBAccess, client: Client, dishes: int, rng: random.Random) -> list:
+    def random_id() -> int:
+        return rng.randint(1, dishes)
+
+    def random_dish() -> Dish:
+        dish = db.get_one_by_id(Dish, random_id())
+        # The seeded ids have no gaps, and no case deletes a dish
+        assert dish is not None
+        return dish
+
+    def random_key() -> tuple:
+        dish = random_dish()
+        return dish.created_at, dish.id
+
+    def random_month() -> tuple[datetime, datetime]:
+        # A month of the seeded time span, which has its own partition
+        month = month_of(START + timedelta(seconds=rng.randrange(SPAN_SECONDS)))
+        end = next_month(month)
+        return datetime(month.year, month.month, 1), datetime(end.year, end.month, 1)
+
+    def random_change_key() -> tuple:
+        dish = random_dish()
+        return dish.updated_at, dish.id
+
+    poll_callback = client.output_of("dish-list-poll")
+    months = event_months(db)
+    listed: dict[str, dict] = {}
+
+    def list_first_page() -> None:
+        # Untimed, the poll starts from the page the list callback rendered
+        response = client.callback(LIST_CALLBACK, {"refresh-button.n_clicks": 0})
+        listed["page"] = response["response"]["dish-list-page"]["data"]
+
+    def poll_dish_list(cursor: list | None = None) -> dict:
+        page = listed["page"] if cursor is None else {**listed["page"], "cursor": cursor}
+        return client.callback(
+            poll_callback,
+            {"dish-list-poll.n_intervals": 1, "dish-list-page.data": page},
+            triggered=["dish-list-poll.n_intervals"],
+        )
+
+    def poll_random_changes() -> dict:
+        # Applies the changes after a random dish, up to DISH_CHANGE_LIMIT of them
+        updated_at, dish_id = random_change_key()
+        return poll_dish_list(cursor=[updated_at.isoformat(), dish_id])
+
+    return [
+        Case("db.get_one_by_id", lambda: db.get_one_by_id(Dish, random_id())),
+        Case(
+            "db.get_one_by_id.include",
+            lambda: db.get_one_by_id(Dish, random_id(), include=DISH_DETAIL_INCLUDE),
+        ),
+        Case("db.get_all.recipes", lambda: db.get_all(Recipe), heavy=True),
+        Case("db.get_rows.recipes", lambda: db.get_rows(RecipeSummary), heavy=True),
+        Case("db.get_all.dishes", lambda: db.get_all(Dish), heavy=True),
+        Case("db.get_rows.dishes", lambda: db.get_rows(DishSummary), heavy=True),
+        Case("db.iter_rows.dishes", lambda: sum(1 for _ in db.iter_rows(DishRow)), heavy=True),
+        Case("db.get_one_as", lambda: db.get_one_as(DishSummary, random_id())),
+        Case("db.get_dish_page.first", lambda: db.get_dish_page(limit=51)),
+        Case(
+            "db.get_dish_page.after",
+            lambda: db.get_dish_page(limit=51, after=random_key()),
+        ),
+        Case(
+            "db.get_dish_page.before",
+            lambda: db.get_dish_page(limit=51, before=random_key()),
+        ),
+        Case(
+            "db.get_dish_changes.after",
+            lambda: db.get_dish_changes(after=random_change_key()),
+        ),
+        Case("db.get_dish_change_cursor", db.get_dish_change_cursor),
+        Case(
+            "db.get_time_range.events",
+            lambda: db.get_time_range(Event, *random_month(), include=["dishes"]),
+        ),
+        Case("db.get_time_range.reviews", lambda: db.get_time_range(Review, *random_month())),
+        Case("db.similar_dishes", lambda: similar_dishes(db, random_id())),
+        Case("db.get_pool_status", db.get_pool_status),
+        Case("db.search_dishes.words", lambda: db.search_dishes("spicy chicken", limit=21)),
+        Case("db.search_dishes.typo", lambda: db.search_dishes("chiken curyy", limit=21)),
+        Case(
+            "page.dish.cold",
+            lambda: client.page(f"/dish/{random_id()}/"),
+            setup=get_dish_cache().clear,
+        ),
+        Case("page.dish.warm", lambda: client.page("/dish/1/")),
+        Case("page.edit_dish", lambda: client.page(f"/edit/dish/{random_id()}/")),
+        Case("page.list_dish", lambda: client.page("/list/dish")),
+        Case("page.search_dish", lambda: client.page("/search/dish", "?q=crispy+tofu")),
+        Case("page.add_dish", lambda: client.page("/add/dish")),
+        Case("page.analytics", lambda: client.page("/analytics")),
+        Case("page.export", lambda: client.page("/export")),
+        # The panel of the dish page that is not cached with the dish
+        Case(
+            "panel.similar_dishes",
+            lambda: make_html_similar_dishes(get_similar_dishes(random_id())),
+        ),
+        Case(
+            "callback.update_dish_list.first",
+            lambda: client.callback(LIST_CALLBACK, {"refresh-button.n_clicks": 0}),
+        ),
+        Case(
+            "callback.update_dish_list.next",
+            lambda: client.callback(
+                LIST_CALLBACK,
+                {
+                    "dish-list-next.n_clicks": 1,
+                    "dish-list-page.data": {"first": None, "last": page_key(random_dish())},
+                },
+                triggered=["dish-list-next.n_clicks"],
+            ),
+        ),
+        Case("callback.poll_dish_list.idle", poll_dish_list, setup=list_first_page),
+        Case("callback.poll_dish_list.changes", poll_random_changes, setup=list_first_page),
+        Case(
+            "callback.update_most_cooked",
+            lambda: client.callback(
+                MOST_COOKED_CALLBACK,
+                {"analytics-month.value": rng.choice(months).isoformat()},
+                triggered=["analytics-month.value"],
+            ),
+        ),
+        Case(
+            "callback.export_dishes",
+            lambda: client.background_callback(
+                EXPORT_CALLBACK,
+                {"export-button.n_clicks": 1, "export-format.value": "ndjson"},
+                triggered=["export-button.n_clicks"],
+            ),
+            heavy=True,
+        ),
+        Case(
+            "callback.update_search_results",
+            lambda: client.callback(
+                SEARCH_CALLBACK,
+                {"search-query.value": "roasted salmon", "search-offset.data": 0},
+                triggered=["search-query.value"],
+            ),
+        ),
+    ]
+
+
+def write_cases(db: RecipeDBAccess, client: Client, dishes: int, rng: random.Random) -> list:
+    def new_rows(count: int) -> list[dict]:
+        return [{"name": f"benchmark dish {rng.random()}", "notes": "notes"} for _ in range(count)]
+
+    def upsert_existing() -> Dish:
+        dish = Dish(name=f"benchmark dish {rng.random()}", notes="updated")
+        dish.id = rng.randint(1, dishes)  # IDMixin drops ids passed to the constructor
+        return db.upsert(dish)
+
+    edited: dict[str, int] = {}
+
+    def pick_edited_dish() -> None:
+        # Untimed, an editor has read the version when the edit page was loaded
+        dish_id = rng.randint(1, dishes)
+        dish = db.get_one_by_id(Dish, dish_id)
+        if dish is None:
+            raise RuntimeError(f"Dish#{dish_id} is missing, run python -m benchmarks.seed again")
+        edited.update(id=dish_id, version=int(dish.version))
+
+    def update_versioned_existing() -> Dish:
+        values = {"name": f"benchmark dish {rng.random()}", "notes": "updated"}
+        return db.update_versioned(Dish, edited["id"], edited["version"], values)
+
+    def bulk_upsert_existing() -> list[int]:
+        ids = rng.sample(range(1, dishes + 1), min(1000, dishes))
+        return db.bulk_upsert(Dish, [{"id": i, "name": f"benchmark dish {i}"} for i in ids])
+
+    return [
+        Case(
+            "callback.save_changes",
+            lambda: client.callback(
+                SAVE_CHANGES_CALLBACK,
+                {
+                    "submit-button.n_clicks": 1,
+                    "dish-name.value": f"benchmark dish {rng.random()}",
+                    "dish-notes.value": "edited",
+                    "url-edit-dish.pathname": f"/edit/dish/{edited['id']}/",
+                    "dish-version.data": edited["version"],
+                },
+                triggered=["submit-button.n_clicks"],
+            ),
+            setup=pick_edited_dish,
+        ),
+        Case(
+            "callback.update_output",
+            lambda: client.callback(
+                ADD_DISH_CALLBACK,
+                {
+                    "button-insert-dish.n_clicks": 1,
+                    "dish-name.value": f"benchmark dish {rng.random()}",
+                    "dish-notes.value": "added",
+                },
+                triggered=["button-insert-dish.n_clicks"],
+            ),
+        ),
+        Case("db.insert_one", lambda: db.insert_one(Dish(**new_rows(1)[0]))),
+        Case("db.insert_many.100", lambda: db.insert_many([Dish(**r) for r in new_rows(100)])),
+        Case("db.upsert", upsert_existing),
+        Case("db.update_versioned", update_versioned_existing, setup=pick_edited_dish),
+        Case("db.bulk_insert.1000", lambda: db.bulk_insert(Dish, new_rows(1000))),
+        Case("db.bulk_upsert.1000", bulk_upsert_existing),
+        Case(
+            "db.copy_rows.1000",
+            lambda: db.copy_rows(Dish, new_rows(1000), columns=["name", "notes"]),
+        ),
+    ]
+
+
+def server_version(db: RecipeDBAccess) -> str:
+    with db.get_session() as session:
+        return session.execute(text("SHOW server_version")).scalar_one()
+
+
+def run_suite(db: RecipeDBAccess, patterns: list[str], repeat: int) -> dict[str, dict]:
+    """Runs every case whose name matches one of the patterns
+
+    Args:
+        db (RecipeDBAccess): The seeded test database
+        patterns (list[str]): fnmatch patterns of the case names to run
+        repeat (int): The number of samples per case
+
+    Returns:
+        dict[str, dict]: The timings of each case, keyed by case name
+    """
+    with db.get_session() as session:
+        dishes = session.execute(select(func.max(Dish.id))).scalar_one() or 0
+    if dishes == 0:
+        raise RuntimeError("The database is empty, run python -m benchmarks.seed first")
+
+    rng = random.Random(0)
+    client = Client()
+    results = {}
+    for case in read_cases(db, client, dishes, rng) + write_cases(db, client, dishes, rng):
+        if not any(fnmatch(case.name, pattern) for pattern in patterns):
+            continue
+        if case.heavy:
+            results[case.name] = measure(case.run, repeat=1, warmup=0, setup=case.setup)
+        else:
+            results[case.name] = measure(case.run, repeat=repeat, setup=case.setup)
+        print(f"{case.name:<36} {results[case.name]['median_ms']:>10.3f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="10k")
+    parser.add_argument("--seed", action="store_true", help="reseed the database first")
+    parser.add_argument("--repeat", type=int, default=20, help="samples per case")
+    parser.add_argument("--cases", nargs="+", default=["*"], help="case name patterns")
+    parser.add_argument("--output", type=Path, help="defaults to results/<revision>-<scale>.json")
+    args = parser.parse_args()
+
+    _db = get_benchmark_db()
+    if args.seed:
+        seed(_db, dishes=SCALES[args.scale])
+
+    _revision = git_revision()
+    _report = {
+        "revision": _revision,
+        "scale": args.scale,
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "postgres": server_version(_db),
+        "repeat": args.repeat,
+        "cases": run_suite(_db, patterns=args.cases, repeat=args.repeat),
+    }
+    output = args.output or RESULTS_DIR / f"{_revision}-{args.scale}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(_report, indent=2) + "\n")
+    print(f"Results written to {output}")
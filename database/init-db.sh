@@ -7,4 +7,11 @@ psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" < /t
 
 # Substitute the test environment variables and execute the SQL script
 envsubst < /docker-entrypoint-initdb.d/init-test-db.sql.template > /tmp/init-test-db.sql
-psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "postgres" < /tmp/init-test-db.sql
\ No newline at end of file
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "postgres" < /tmp/init-test-db.sql
+# Let the replicas of the replica profile, see replica-entrypoint.sh, stream the WAL
+if [ -n "$REPLICATION_PASSWORD" ]; then
+    psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "postgres" <<-SQL
+        CREATE ROLE replicator WITH REPLICATION LOGIN PASSWORD '$REPLICATION_PASSWORD';
+SQL
+    echo "host replication replicator all scram-sha-256" >> "$PGDATA/pg_hba.conf"
+fi
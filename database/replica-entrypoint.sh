@@ -0,0 +1,15 @@
+#!/bin/bash
+set -e
+
+# Clone the primary on the first start, -R makes the clone a standby that streams its WAL
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    until PGPASSWORD="$REPLICATION_PASSWORD" pg_basebackup --host=db --username=replicator \
+        --pgdata="$PGDATA" --wal-method=stream --write-recovery-conf --progress; do
+        echo "Waiting for the primary"
+        rm -rf "${PGDATA:?}"/*
+        sleep 2
+    done
+    chmod 0700 "$PGDATA"
+fi
+
+exec docker-entrypoint.sh postgres
@@ -0,0 +1,50 @@
+"""Refreshes the analytics summary tables of the configured database, e.g. from cron
+
+python -m database.analytics refresh
+python -m database.analytics refresh --dish-id 12 --dish-id 40
+python -m database.analytics refresh --every 300
+
+With --every, the summaries are refreshed in full at start and then every that many seconds,
+until the process is stopped. This is how the analytics-refresh service of
+docker-compose.yml keeps the /analytics page current, since events and reviews are written
+without refreshing them.
+"""
+
+import argparse
+import logging
+from time import perf_counter, sleep
+
+from database.analytics.summaries import refresh_summaries
+from database.utils.connection import RecipeDBAccess
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refreshes the analytics summary tables")
+    parser.add_argument("command", choices=["refresh"])
+    parser.add_argument(
+        "--dish-id",
+        type=int,
+        action="append",
+        dest="dish_ids",
+        help="only refresh these dishes, can be repeated",
+    )
+    parser.add_argument(
+        "--every", type=float, help="refresh again every this many seconds, until stopped"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    db = RecipeDBAccess.from_env()
+    while True:
+        start = perf_counter()
+        try:
+            refresh_summaries(db, dish_ids=args.dish_ids)
+        except Exception:
+            if args.every is None:
+                raise
+            # The next run tries again, e.g. once the database is back
+            logging.exception("Refreshing the summaries failed")
+        else:
+            print(f"Refreshed the summaries in {perf_counter() - start:.2f}s", flush=True)
+        if args.every is None:
+            break
+        sleep(max(args.every - (perf_counter() - start), 0))
@@ -0,0 +1,151 @@
+from datetime import date
+from typing import Iterable, Sequence, Type
+
+from sqlalchemy import Date, Row, Select, Table, cast, delete, distinct, func, insert, select
+
+from database.schema.models import (
+    Base,
+    Dish,
+    DishMonthlyEvents,
+    DishReviewers,
+    Event,
+    EventDish,
+    EventTypeSummary,
+    PeopleReview,
+    Review,
+)
+from database.utils.connection import RecipeDBAccess
+
+SUMMARY_MODELS: list[Type[Base]] = [DishMonthlyEvents, EventTypeSummary, DishReviewers]
+
+_event_month = cast(func.date_trunc("month", Event.started_at), Date)
+# Joined on the partition key too, so PostgreSQL joins the tables month by month
+_event_join = (EventDish.event_id == Event.id) & (EventDish.event_started_at == Event.started_at)
+_review_join = (PeopleReview.review_id == Review.id) & (
+    PeopleReview.review_created_at == Review.created_at
+)
+
+
+def _summary_queries() -> dict[Type[Base], Select]:
+    """Returns the aggregate that fills each summary table"""
+    return {
+        DishMonthlyEvents: select(EventDish.dish_id, _event_month, func.count()).join(
+            Event, _event_join
+        )
+        # Events whose start is unknown are at -infinity
+        .where(func.isfinite(Event.started_at)).group_by(EventDish.dish_id, _event_month),
+        EventTypeSummary: select(Event.type, func.count(distinct(EventDish.dish_id)), func.count())
+        .join(Event, _event_join)
+        .where(Event.type.is_not(None))
+        .group_by(Event.type),
+        DishReviewers: select(
+            Review.dish_id,
+            func.count(distinct(Review.id)),
+            func.count(distinct(PeopleReview.people_id)),
+        )
+        .outerjoin(PeopleReview, _review_join)
+        .where(Review.dish_id.is_not(None))
+        .group_by(Review.dish_id),
+    }
+
+
+def _dish_id_column(query: Select):
+    return next((column for column in query.selected_columns if column.key == "dish_id"), None)
+
+
+def refresh_summaries(db: RecipeDBAccess, dish_ids: Iterable[int] | None = None) -> None:
+    """Recomputes the summary tables, for every dish or only for the given dishes
+
+    Each summary's rows are deleted and inserted again from its aggregate in one
+    transaction, so readers see either the old or the new figures, never a partial refresh.
+    Refreshes take turns, so two of them never insert the same rows.
+    Pass the dishes whose events or reviews were written for an incremental refresh, which
+    only aggregates their rows. The event type totals are not per dish and are always
+    recomputed in full, which is affordable because events are written far less often than
+    dashboards are read.
+
+    Args:
+        db (RecipeDBAccess): The database to refresh
+        dish_ids (Iterable[int] | None): The dishes to refresh, defaults to all of them
+    """
+    ids = None if dish_ids is None else sorted(set(dish_ids))
+    if ids == []:
+        return
+
+    with db.get_session() as session:
+        # Held until the commit, per schema, since the event type totals are refreshed by all
+        key = func.hashtext(f"dish_summaries:{db.schema}")
+        session.execute(select(func.pg_advisory_xact_lock(key)))
+        for model, query in _summary_queries().items():
+            table = model.__table__
+            assert isinstance(table, Table)
+            clear = delete(table)
+            dish_id = _dish_id_column(query)
+            if ids is not None and dish_id is not None:
+                clear = clear.where(table.c.dish_id.in_(ids))
+                query = query.where(dish_id.in_(ids))
+            session.execute(clear)
+            session.execute(insert(table).from_select(list(table.columns.keys()), query))
+        session.commit()
+
+
+def most_cooked_dishes(db: RecipeDBAccess, month: date, limit: int = 10) -> Sequence[Row]:
+    """Returns the dishes served at the most events in a month
+
+    Args:
+        db (RecipeDBAccess): The database to read
+        month (date): The first day of the month
+        limit (int): The maximum number of dishes to return
+
+    Returns:
+        Sequence[Row]: The (dish_id, name, events) rows, most events first
+    """
+    query = (
+        select(DishMonthlyEvents.dish_id, Dish.name, DishMonthlyEvents.events)
+        .join(Dish, Dish.id == DishMonthlyEvents.dish_id)
+        .where(DishMonthlyEvents.month == month)
+        .order_by(DishMonthlyEvents.events.desc(), DishMonthlyEvents.dish_id)
+        .limit(limit)
+    )
+    with db.get_read_session() as session:
+        return session.execute(query).all()
+
+
+def event_months(db: RecipeDBAccess) -> list[date]:
+    """Returns every month with at least one event, latest first"""
+    query = select(DishMonthlyEvents.month).distinct().order_by(DishMonthlyEvents.month.desc())
+    with db.get_read_session() as session:
+        return list(session.execute(query).scalars())
+
+
+def dishes_per_event_type(db: RecipeDBAccess) -> Sequence[Row]:
+    """Returns how many distinct dishes, and how many servings, each event type had
+
+    Returns:
+        Sequence[Row]: The (event_type, dishes, servings) rows, most dishes first
+    """
+    query = select(
+        EventTypeSummary.event_type, EventTypeSummary.dishes, EventTypeSummary.servings
+    ).order_by(EventTypeSummary.dishes.desc(), EventTypeSummary.event_type)
+    with db.get_read_session() as session:
+        return session.execute(query).all()
+
+
+def most_reviewed_dishes(db: RecipeDBAccess, limit: int = 10) -> Sequence[Row]:
+    """Returns the dishes with the most distinct reviewers
+
+    Args:
+        db (RecipeDBAccess): The database to read
+        limit (int): The maximum number of dishes to return
+
+    Returns:
+        Sequence[Row]: The (dish_id, name, reviews, reviewers) rows, most reviewers first
+    """
+    query = (
+        select(DishReviewers.dish_id, Dish.name, DishReviewers.reviews, DishReviewers.reviewers)
+        .join(Dish, Dish.id == DishReviewers.dish_id)
+        .order_by(DishReviewers.reviewers.desc(), DishReviewers.dish_id)
+        .limit(limit)
+    )
+    with db.get_read_session() as session:
+        return session.execute(query).all()
@@ -0,0 +1,31 @@
+"""Links the recipe URLs of dish notes and fetches the recipes, e.g. from cron
+
+python -m database.ingest
+python -m database.ingest --dish-id 12 --dish-id 40 --concurrency 4
+"""
+
+import argparse
+import logging
+from time import perf_counter
+
+from database.ingest.pipeline import ingest
+from database.utils.connection import RecipeDBAccess
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingests the recipes linked from dish notes")
+    parser.add_argument(
+        "--dish-id",
+        type=int,
+        action="append",
+        dest="dish_ids",
+        help="only ingest these dishes, can be repeated",
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="fetches in flight")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    start = perf_counter()
+    outcomes = ingest(
+        RecipeDBAccess.from_env(), dish_ids=args.dish_ids, concurrency=args.concurrency
+    )
+    print(f"Ingested {dict(outcomes)} in {perf_counter() - start:.2f}s")
@@ -0,0 +1,58 @@
+import asyncio
+from typing import NamedTuple, Protocol
+
+import requests
+
+USER_AGENT = "recipe-tracker/1.0 (+https://github.com/nosas/recipe-tracker)"
+
+
+class FetchResult(NamedTuple):
+    status: int
+    body: bytes = b""
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+class Fetcher(Protocol):
+    """Downloads a page, revalidating it with the validators of the previous download"""
+
+    async def fetch(self, url: str, etag: str | None, last_modified: str | None) -> FetchResult: ...
+
+
+class RequestsFetcher:
+    """Fetches pages with requests, each in a worker thread of the event loop's executor"""
+
+    def __init__(self, timeout: float = 10.0, max_bytes: int = 5_000_000):
+        """Initializes the fetcher
+
+        Args:
+            timeout (float): Seconds to wait for the connection and for each read
+            max_bytes (int): Bodies are cut off after this many bytes, recipe pages are far
+                smaller and the JSON-LD is in the head
+        """
+        self._timeout = timeout
+        self._max_bytes = max_bytes
+
+    async def fetch(self, url: str, etag: str | None, last_modified: str | None) -> FetchResult:
+        return await asyncio.to_thread(self._fetch, url, etag, last_modified)
+
+    def _fetch(self, url: str, etag: str | None, last_modified: str | None) -> FetchResult:
+        headers = {"User-Agent": USER_AGENT}
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
+
+        with requests.get(url, headers=headers, timeout=self._timeout, stream=True) as response:
+            body = b""
+            if response.status_code == 200:
+                for chunk in response.iter_content(chunk_size=65536):
+                    body += chunk
+                    if len(body) >= self._max_bytes:
+                        break
+            return FetchResult(
+                status=response.status_code,
+                body=body[: self._max_bytes],
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
@@ -0,0 +1,113 @@
+import json
+import re
+from html.parser import HTMLParser
+from typing import Any, Iterator, NamedTuple
+
+# Trailing punctuation is part of the sentence the URL was pasted into, not of the URL. A
+# parenthesis belongs to the URL when the URL has its match, e.g. /wiki/Pho_(soup)
+_URL_CHAR = r"[^\s<>\"'\]()]"
+_URL_GROUP = rf"\({_URL_CHAR}*\)"
+URL_PATTERN = re.compile(
+    rf"https?://(?:{_URL_CHAR}|{_URL_GROUP})*(?:[^\s<>\"'\].,;:!?()]|{_URL_GROUP})"
+)
+
+
+class ParsedRecipe(NamedTuple):
+    title: str | None
+    ingredients: list[str]
+    steps: list[str]
+
+
+def extract_urls(notes: str | None) -> list[str]:
+    """Returns the distinct http(s) URLs of dish notes, in the order they appear"""
+    return list(dict.fromkeys(URL_PATTERN.findall(notes or "")))
+
+
+class _RecipePageParser(HTMLParser):
+    """Collects the JSON-LD scripts and the title of an HTML page"""
+
+    def __init__(self):
+        super().__init__()
+        self.json_ld: list[str] = []
+        self.title: str | None = None
+        self._in: str | None = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "script" and dict(attrs).get("type") == "application/ld+json":
+            self._in = "json_ld"
+            self.json_ld.append("")
+        elif tag == "title" and self.title is None:
+            self._in = "title"
+            self.title = ""
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "title"):
+            self._in = None
+
+    def handle_data(self, data):
+        if self._in == "json_ld":
+            self.json_ld[-1] += data
+        elif self._in == "title":
+            self.title += data
+
+
+def parse_recipe(html: str) -> ParsedRecipe:
+    """Parses the schema.org Recipe of a page, which most recipe sites embed as JSON-LD
+
+    Args:
+        html (str): The page
+
+    Returns:
+        ParsedRecipe: The recipe's name, ingredients and steps. Pages without a Recipe only
+            have their <title>
+    """
+    parser = _RecipePageParser()
+    parser.feed(html)
+    for script in parser.json_ld:
+        try:
+            document = json.loads(script)
+        except ValueError:
+            continue
+        for node in _json_ld_nodes(document):
+            if _has_type(node, "Recipe"):
+                return ParsedRecipe(
+                    title=_text(node.get("name")),
+                    ingredients=[_text(i) for i in _as_list(node.get("recipeIngredient"))],
+                    steps=list(_steps(node.get("recipeInstructions"))),
+                )
+    title = parser.title.strip() if parser.title else None
+    return ParsedRecipe(title=title or None, ingredients=[], steps=[])
+
+
+def _json_ld_nodes(document: Any) -> Iterator[dict]:
+    if isinstance(document, list):
+        for item in document:
+            yield from _json_ld_nodes(item)
+    elif isinstance(document, dict):
+        yield document
+        yield from _json_ld_nodes(document.get("@graph", []))
+
+
+def _has_type(node: dict, name: str) -> bool:
+    return name in _as_list(node.get("@type"))
+
+
+def _as_list(value: Any) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _text(value: Any) -> str:
+    return " ".join(str(value or "").split())
+
+
+def _steps(instructions: Any) -> Iterator[str]:
+    # Plain text, HowToStep objects, or HowToSections of HowToSteps
+    for item in _as_list(instructions):
+        if isinstance(item, dict) and _has_type(item, "HowToSection"):
+            yield from _steps(item.get("itemListElement"))
+        elif isinstance(item, dict):
+            yield _text(item.get("text") or item.get("name"))
+        elif isinstance(item, str):
+            yield from (line for line in map(_text, item.splitlines()) if line)
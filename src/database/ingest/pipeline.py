@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import json
+import logging
+import zlib
+from collections import Counter
+from datetime import datetime
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import Row, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from database.ingest.fetch import Fetcher, FetchResult, RequestsFetcher
+from database.ingest.parse import extract_urls, parse_recipe
+from database.schema.models import Dish, DishRecipe, Recipe, RecipeContent
+from database.schema.read_models import DishRow
+from database.utils.bulk import batched
+from database.utils.connection import RecipeDBAccess
+
+logger = logging.getLogger(__name__)
+
+
+def encode_content(content: dict[str, Any]) -> tuple[str, bytes, int]:
+    """Serializes recipe content to its content address and compressed bytes
+
+    Returns:
+        tuple[str, bytes, int]: The SHA-256 of the canonical JSON, the zlib-compressed JSON,
+            and the uncompressed size
+    """
+    raw = json.dumps(content, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(raw).hexdigest(), zlib.compress(raw, 9), len(raw)
+
+
+def get_recipe_content(db: RecipeDBAccess, recipe_id: int) -> dict[str, Any] | None:
+    """Returns the parsed content of a recipe, None if it was never fetched"""
+    query = (
+        select(RecipeContent.data)
+        .join(Recipe, Recipe.content_hash == RecipeContent.hash)
+        .where(Recipe.id == recipe_id)
+    )
+    with db.get_session() as session:
+        data = session.execute(query).scalar_one_or_none()
+    return None if data is None else json.loads(zlib.decompress(data))
+
+
+def link_dish_recipes(
+    db: RecipeDBAccess, dish_ids: Iterable[int] | None = None, batch_size: int = 1000
+) -> list[int]:
+    """Creates a recipe for every URL in the dishes' notes, and links it to the dish
+
+    Recipes are shared by URL, so a URL pasted into several dishes is fetched once. Links
+    are only added, removing a URL from the notes keeps the dish's recipe.
+
+    Args:
+        db (RecipeDBAccess): The database
+        dish_ids (Iterable[int] | None): The dishes to read, defaults to all of them
+        batch_size (int): The number of dishes read and linked at a time
+
+    Returns:
+        list[int]: The ids of the linked recipes, new or not
+    """
+    where = [] if dish_ids is None else [Dish.id.in_(list(dish_ids))]
+    linked: dict[int, None] = {}
+    for dishes in batched(db.iter_rows(DishRow, *where, batch_size=batch_size), batch_size):
+        urls = {dish.id: extract_urls(dish.notes) for dish in dishes}
+        recipe_ids = _get_or_create_recipes(db, {url for found in urls.values() for url in found})
+        links = [
+            {"dish_id": dish_id, "recipe_id": recipe_ids[url]}
+            for dish_id, found in urls.items()
+            for url in found
+        ]
+        if links:
+            # Only key columns, so the upsert leaves existing links alone
+            db.bulk_upsert(DishRecipe, links, batch_size=batch_size)
+        linked.update((link["recipe_id"], None) for link in links)
+    return list(linked)
+
+
+def _get_or_create_recipes(db: RecipeDBAccess, urls: set[str]) -> dict[str, int]:
+    if not urls:
+        return {}
+    with db.get_session() as session:
+        existing = session.execute(select(Recipe.url, Recipe.id).where(Recipe.url.in_(urls)))
+        recipe_ids = {url: recipe_id for url, recipe_id in existing}
+    new = sorted(urls - recipe_ids.keys())
+    added_at = datetime.now()
+    ids = db.bulk_insert(Recipe, [{"url": url, "added_at": added_at} for url in new])
+    recipe_ids.update(zip(new, ids))
+    return recipe_ids
+
+
+async def fetch_recipes(
+    db: RecipeDBAccess,
+    fetcher: Fetcher,
+    recipe_ids: Sequence[int] | None = None,
+    concurrency: int = 8,
+    batch_size: int = 200,
+) -> Counter:
+    """Fetches and parses recipe pages concurrently, and stores what changed
+
+    At most `concurrency` fetches are in flight at a time. Each fetch sends the ETag and
+    Last-Modified of the previous one, so unchanged pages are answered with 304 and not
+    downloaded. Parsed contents are stored compressed and keyed by their hash, so a page
+    that was downloaded again but parses to the same content adds no row.
+
+    Args:
+        db (RecipeDBAccess): The database
+        fetcher (Fetcher): Downloads the pages, e.g. RequestsFetcher
+        recipe_ids (Sequence[int] | None): The recipes to fetch, defaults to all of them
+        concurrency (int): The maximum number of fetches in flight
+        batch_size (int): The number of recipes fetched before their results are written
+
+    Returns:
+        Counter: The number of recipes that were "changed", "unchanged" (the same content
+            again), "not_modified" (304) and "failed"
+    """
+    query = select(Recipe.id, Recipe.url, Recipe.etag, Recipe.last_modified).order_by(Recipe.id)
+    if recipe_ids is not None:
+        query = query.where(Recipe.id.in_(list(recipe_ids)))
+    with db.get_session() as session:
+        recipes = session.execute(query).all()
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(recipe: Row) -> FetchResult | None:
+        async with semaphore:
+            try:
+                return await fetcher.fetch(recipe.url, recipe.etag, recipe.last_modified)
+            except Exception as e:
+                logger.warning(f"Fetching recipe#{recipe.id} {recipe.url} failed: {e}")
+                return None
+
+    outcomes: Counter = Counter()
+    for batch in batched(recipes, batch_size):
+        results = await asyncio.gather(*(fetch(recipe) for recipe in batch))
+        outcomes.update(_store_results(db, batch, results))
+    return outcomes
+
+
+def _store_results(
+    db: RecipeDBAccess, recipes: Sequence[Row], results: Sequence[FetchResult | None]
+) -> Counter:
+    outcomes: Counter = Counter()
+    now = datetime.now()
+    with db.get_session() as session:
+        current: dict[int, str | None] = dict(
+            session.execute(
+                select(Recipe.id, Recipe.content_hash).where(
+                    Recipe.id.in_([recipe.id for recipe in recipes])
+                )
+            )
+            .tuples()
+            .all()
+        )
+        for recipe, result in zip(recipes, results):
+            if result is None or result.status not in (200, 304):
+                outcomes["failed"] += 1
+                continue
+            values: dict[str, Any] = {"fetched_at": now}
+            if result.status == 304:
+                outcomes["not_modified"] += 1
+            else:
+                page = result.body.decode("utf-8", errors="replace")
+                content_hash, data, size = encode_content(parse_recipe(page)._asdict())
+                session.execute(
+                    pg_insert(RecipeContent)
+                    .values(hash=content_hash, data=data, size=size)
+                    .on_conflict_do_nothing(index_elements=["hash"])
+                )
+                values.update(etag=result.etag, last_modified=result.last_modified)
+                if current.get(recipe.id) == content_hash:
+                    outcomes["unchanged"] += 1
+                else:
+                    outcomes["changed"] += 1
+                    values.update(content_hash=content_hash, updated_at=now)
+            session.execute(update(Recipe).where(Recipe.id == recipe.id).values(**values))
+        session.commit()
+    return outcomes
+
+
+def ingest(
+    db: RecipeDBAccess,
+    fetcher: Fetcher | None = None,
+    dish_ids: Iterable[int] | None = None,
+    concurrency: int = 8,
+) -> Counter:
+    """Links the URLs of dish notes to recipes, then fetches those recipes
+
+    Args:
+        db (RecipeDBAccess): The database
+        fetcher (Fetcher | None): Downloads the pages, defaults to a RequestsFetcher
+        dish_ids (Iterable[int] | None): The dishes to ingest, defaults to all of them, in
+            which case every recipe is revalidated, linked to a dish or not
+        concurrency (int): The maximum number of fetches in flight
+
+    Returns:
+        Counter: The fetch outcomes, see fetch_recipes
+    """
+    recipe_ids = link_dish_recipes(db, dish_ids)
+    return asyncio.run(
+        fetch_recipes(
+            db,
+            fetcher or RequestsFetcher(),
+            recipe_ids=None if dish_ids is None else recipe_ids,
+            concurrency=concurrency,
+        )
+    )
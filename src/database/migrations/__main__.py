@@ -0,0 +1,55 @@
+"""Manages the schema of the configured database
+
+python -m database.migrations status
+python -m database.migrations upgrade
+python -m database.migrations check
+python -m database.migrations partitions
+python -m database.migrations detach --before 2024-01-01
+"""
+
+import argparse
+import sys
+from datetime import date
+
+from database.migrations.checks import find_unindexed_foreign_keys
+from database.migrations.runner import MigrationRunner
+from database.utils.connection import RecipeDBAccess
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manages the schema of the recipe database")
+    parser.add_argument("command", choices=["status", "upgrade", "check", "partitions", "detach"])
+    parser.add_argument(
+        "--before",
+        type=date.fromisoformat,
+        help="detach: the first month to keep, as YYYY-MM-DD",
+    )
+    args = parser.parse_args()
+
+    if args.command == "check":
+        unindexed = find_unindexed_foreign_keys()
+        for foreign_key in unindexed:
+            print(f"Unindexed foreign key: {foreign_key}")
+        sys.exit(1 if unindexed else 0)
+
+    if args.command == "detach" and args.before is None:
+        parser.error("detach requires --before")
+
+    _db = RecipeDBAccess.from_env()
+    if args.command == "partitions":
+        # Run monthly, so the coming months have their partitions before any row reaches them
+        created = _db.ensure_partitions()
+        print(f"Created {len(created)} partition(s)")
+    elif args.command == "detach":
+        for name in _db.detach_partitions(before=args.before):
+            print(f"Detached {name}")
+    elif args.command == "upgrade":
+        # A new database is created at the latest schema, an existing one is migrated
+        _db.create_tables()
+        applied = _db.migrate()
+        print(f"Applied {len(applied)} migration(s)")
+    else:
+        runner = MigrationRunner(_db._engine)
+        applied_versions = runner.applied_versions()
+        for migration in runner.migrations:
+            state = "applied" if migration.version in applied_versions else "pending"
+            print(f"{migration.version:04d} {state:8} {migration.description}")
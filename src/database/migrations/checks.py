@@ -0,0 +1,26 @@
+from sqlalchemy import MetaData
+
+from database.schema.models import Base
+
+
+def find_unindexed_foreign_keys(metadata: MetaData = Base.metadata) -> list[str]:
+    """Finds foreign keys that no index can serve
+
+    A foreign key is covered when its columns are the leading columns of the primary key or
+    of an index. Uncovered foreign keys make joins and ON DELETE checks scan the whole table.
+
+    Args:
+        metadata (MetaData): The tables to check
+
+    Returns:
+        list[str]: The uncovered foreign keys, as "table(column, ...)"
+    """
+    unindexed = []
+    for table in metadata.sorted_tables:
+        indexed = [list(table.primary_key.columns)] + [list(i.columns) for i in table.indexes]
+        for foreign_key in table.foreign_key_constraints:
+            columns = set(foreign_key.columns)
+            if not any(set(index[: len(columns)]) == columns for index in indexed):
+                names = ", ".join(column.name for column in foreign_key.columns)
+                unindexed.append(f"{table.name}({names})")
+    return unindexed
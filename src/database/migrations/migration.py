@@ -0,0 +1,31 @@
+from typing import Sequence
+
+
+class Migration:
+    def __init__(
+        self,
+        version: int,
+        description: str,
+        statements: Sequence[str],
+        concurrent: bool = False,
+    ):
+        """Initializes the migration
+
+        Statements should be idempotent (IF NOT EXISTS, IF EXISTS), so a migration that was
+        interrupted part way can be run again.
+
+        Args:
+            version (int): The position of the migration, migrations are applied in ascending
+                order
+            description (str): What the migration changes
+            statements (Sequence[str]): The SQL statements to run, in order
+            concurrent (bool): Whether the statements must run outside a transaction, as
+                CREATE INDEX CONCURRENTLY does. Each statement is then committed on its own
+        """
+        self.version = version
+        self.description = description
+        self.statements = statements
+        self.concurrent = concurrent
+
+    def __repr__(self):
+        return f"<Migration({self.version}: {self.description})>"
@@ -0,0 +1,140 @@
+import importlib
+import pkgutil
+import re
+from typing import Sequence
+
+from sqlalchemy import Connection, Engine, Table, insert, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from database.migrations.migration import Migration
+from database.schema.models import SCHEMA, SchemaMigration
+
+VERSIONS_PACKAGE = "database.migrations.versions"
+
+# A failed CREATE INDEX CONCURRENTLY leaves an invalid index behind, which IF NOT EXISTS skips
+INVALID_INDEXES = text(
+    "SELECT index_class.relname FROM pg_index"
+    " JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid"
+    " JOIN pg_namespace ON pg_namespace.oid = index_class.relnamespace"
+    " WHERE pg_namespace.nspname = :schema AND NOT pg_index.indisvalid"
+)
+
+# Statements are written against the models' schema, which an engine may map to another one
+SCHEMA_PREFIX = re.compile(rf"\b{SCHEMA}\.")
+
+
+def load_migrations() -> list[Migration]:
+    """Loads the migration of every module in the versions package
+
+    Raises:
+        ValueError: If two migrations have the same version
+
+    Returns:
+        list[Migration]: The migrations, ordered by version
+    """
+    package = importlib.import_module(VERSIONS_PACKAGE)
+    migrations = [
+        importlib.import_module(f"{VERSIONS_PACKAGE}.{module.name}").migration
+        for module in pkgutil.iter_modules(package.__path__)
+    ]
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {VERSIONS_PACKAGE}: {sorted(versions)}")
+    return sorted(migrations, key=lambda migration: migration.version)
+
+
+class MigrationRunner:
+    """Applies schema migrations and records them in the schema_migrations table"""
+
+    def __init__(self, engine: Engine, migrations: Sequence[Migration] | None = None):
+        """Initializes the runner
+
+        Args:
+            engine (Engine): The engine of the database to migrate
+            migrations (Sequence[Migration] | None): The known migrations, defaults to
+                load_migrations()
+        """
+        self._engine = engine
+        self.migrations = list(migrations) if migrations is not None else load_migrations()
+        translate_map = engine.get_execution_options().get("schema_translate_map") or {}
+        self.schema = translate_map.get(SCHEMA, SCHEMA)
+
+    def applied_versions(self) -> set[int]:
+        """Returns the versions recorded as applied
+
+        Returns:
+            set[int]: The applied versions
+        """
+        self._ensure_version_table()
+        with self._engine.connect() as connection:
+            return set(connection.execute(select(SchemaMigration.version)).scalars())
+
+    def pending(self) -> list[Migration]:
+        """Returns the migrations that have not been applied yet
+
+        Returns:
+            list[Migration]: The pending migrations, ordered by version
+        """
+        applied = self.applied_versions()
+        return [migration for migration in self.migrations if migration.version not in applied]
+
+    def upgrade(self) -> list[Migration]:
+        """Applies every pending migration in order
+
+        Raises:
+            RuntimeError: If a concurrent migration left an invalid index behind
+
+        Returns:
+            list[Migration]: The migrations that were applied
+        """
+        pending = self.pending()
+        for migration in pending:
+            print(f"Applying migration {migration.version}: {migration.description}")
+            if migration.concurrent:
+                self._apply_concurrently(migration)
+            else:
+                with self._engine.begin() as connection:
+                    self._execute(connection, migration)
+                    self._record(connection, migration)
+        return pending
+
+    def stamp(self) -> None:
+        """Records every migration as applied, for databases created at the latest schema"""
+        self._ensure_version_table()
+        if not self.migrations:
+            return
+        values = [
+            {"version": migration.version, "description": migration.description}
+            for migration in self.migrations
+        ]
+        with self._engine.begin() as connection:
+            connection.execute(pg_insert(SchemaMigration).values(values).on_conflict_do_nothing())
+
+    def _ensure_version_table(self) -> None:
+        # Databases created before migrations existed have no schema_migrations table
+        table = SchemaMigration.__table__
+        assert isinstance(table, Table)
+        table.create(self._engine, checkfirst=True)
+
+    def _apply_concurrently(self, migration: Migration) -> None:
+        autocommit = self._engine.execution_options(isolation_level="AUTOCOMMIT")
+        with autocommit.connect() as connection:
+            self._execute(connection, migration)
+            invalid = connection.execute(INVALID_INDEXES, {"schema": self.schema}).scalars().all()
+            if invalid:
+                raise RuntimeError(
+                    f"Migration {migration.version} left invalid indexes: {', '.join(invalid)}. "
+                    "Drop them and run the migration again."
+                )
+            self._record(connection, migration)
+
+    def _execute(self, connection: Connection, migration: Migration) -> None:
+        for statement in migration.statements:
+            connection.execute(text(SCHEMA_PREFIX.sub(f"{self.schema}.", statement)))
+
+    def _record(self, connection: Connection, migration: Migration) -> None:
+        connection.execute(
+            insert(SchemaMigration).values(
+                version=migration.version, description=migration.description
+            )
+        )
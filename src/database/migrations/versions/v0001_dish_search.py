@@ -0,0 +1,21 @@
+from database.migrations.migration import Migration
+
+# Adding a stored generated column rewrites the dishes table under an exclusive lock, the
+# indexes are then built without blocking writes
+migration = Migration(
+    version=1,
+    description="Add the dish search vector, and the full-text and trigram indexes",
+    statements=[
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "ALTER TABLE recipe.dishes ADD COLUMN IF NOT EXISTS search_vector tsvector"
+        " GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(name, '')), 'A')"
+        " || setweight(to_tsvector('english', coalesce(notes, '')), 'B')"
+        ") STORED",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_dishes_search_vector"
+        " ON recipe.dishes USING gin (search_vector)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_dishes_name_trgm"
+        " ON recipe.dishes USING gin (name gin_trgm_ops)",
+    ],
+    concurrent=True,
+)
@@ -0,0 +1,20 @@
+from database.migrations.migration import Migration
+
+migration = Migration(
+    version=2,
+    description="Index foreign keys and time-ordered listings",
+    statements=[
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_reviews_dish_id ON recipe.reviews (dish_id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_event_dishes_dish_id"
+        " ON recipe.event_dishes (dish_id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_dish_recipes_recipe_id"
+        " ON recipe.dish_recipes (recipe_id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_people_reviews_review_id"
+        " ON recipe.people_reviews (review_id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_dishes_created_at_id"
+        " ON recipe.dishes (created_at, id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_events_started_at"
+        " ON recipe.events (started_at)",
+    ],
+    concurrent=True,
+)
@@ -0,0 +1,21 @@
+from database.migrations.migration import Migration
+
+# The tables are filled by python -m database.analytics refresh, which should run after this
+migration = Migration(
+    version=3,
+    description="Add the analytics summary tables",
+    statements=[
+        "CREATE TABLE IF NOT EXISTS recipe.dish_monthly_events ("
+        "dish_id INTEGER NOT NULL, month DATE NOT NULL, events INTEGER NOT NULL,"
+        " PRIMARY KEY (dish_id, month))",
+        "CREATE INDEX IF NOT EXISTS ix_dish_monthly_events_month_events"
+        " ON recipe.dish_monthly_events (month, events)",
+        "CREATE TABLE IF NOT EXISTS recipe.event_type_summary ("
+        "event_type VARCHAR(100) NOT NULL, dishes INTEGER NOT NULL, servings INTEGER NOT NULL,"
+        " PRIMARY KEY (event_type))",
+        "CREATE TABLE IF NOT EXISTS recipe.dish_reviewers ("
+        "dish_id INTEGER NOT NULL, reviews INTEGER NOT NULL, reviewers INTEGER NOT NULL,"
+        " PRIMARY KEY (dish_id))",
+        "CREATE INDEX IF NOT EXISTS ix_dish_reviewers_reviewers ON recipe.dish_reviewers (reviewers)",
+    ],
+)
@@ -0,0 +1,12 @@
+from database.migrations.migration import Migration
+
+# now() is stable, so PostgreSQL stores the default once instead of rewriting the table, and
+# every existing dish starts at the time of the migration
+migration = Migration(
+    version=4,
+    description="Track when dishes were last changed",
+    statements=[
+        "ALTER TABLE recipe.dishes"
+        " ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now()",
+    ],
+)
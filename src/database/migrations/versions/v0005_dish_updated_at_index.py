@@ -0,0 +1,11 @@
+from database.migrations.migration import Migration
+
+migration = Migration(
+    version=5,
+    description="Index the dish change feed",
+    statements=[
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_dishes_updated_at_id"
+        " ON recipe.dishes (updated_at, id)",
+    ],
+    concurrent=True,
+)
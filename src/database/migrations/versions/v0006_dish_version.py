@@ -0,0 +1,9 @@
+from database.migrations.migration import Migration
+
+migration = Migration(
+    version=6,
+    description="Version dishes for optimistic concurrency",
+    statements=[
+        "ALTER TABLE recipe.dishes ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+    ],
+)
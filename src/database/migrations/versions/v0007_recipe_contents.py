@@ -0,0 +1,16 @@
+from database.migrations.migration import Migration
+
+migration = Migration(
+    version=7,
+    description="Store fetched recipe contents",
+    statements=[
+        "CREATE TABLE IF NOT EXISTS recipe.recipe_contents ("
+        "hash VARCHAR(64) NOT NULL, data BYTEA NOT NULL, size INTEGER NOT NULL,"
+        " created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL, PRIMARY KEY (hash))",
+        "ALTER TABLE recipe.recipes ADD COLUMN IF NOT EXISTS etag TEXT,"
+        " ADD COLUMN IF NOT EXISTS last_modified TEXT,"
+        " ADD COLUMN IF NOT EXISTS fetched_at TIMESTAMP WITHOUT TIME ZONE,"
+        " ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"
+        " REFERENCES recipe.recipe_contents (hash)",
+    ],
+)
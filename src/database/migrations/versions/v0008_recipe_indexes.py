@@ -0,0 +1,12 @@
+from database.migrations.migration import Migration
+
+migration = Migration(
+    version=8,
+    description="Index recipe urls and contents",
+    statements=[
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_recipes_url ON recipe.recipes (url)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_recipes_content_hash"
+        " ON recipe.recipes (content_hash)",
+    ],
+    concurrent=True,
+)
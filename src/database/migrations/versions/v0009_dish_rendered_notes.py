@@ -0,0 +1,11 @@
+from database.migrations.migration import Migration
+
+# Existing dishes are rendered by python -m database.notes backfill, which should run after this
+migration = Migration(
+    version=9,
+    description="Store the rendered notes of dishes",
+    statements=[
+        "ALTER TABLE recipe.dishes ADD COLUMN IF NOT EXISTS notes_rendered TEXT,"
+        " ADD COLUMN IF NOT EXISTS notes_links JSONB",
+    ],
+)
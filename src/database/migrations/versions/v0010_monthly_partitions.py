@@ -0,0 +1,70 @@
+from database.migrations.migration import Migration
+
+# A table cannot be turned into a partitioned one in place, so the four tables are copied
+# aside, created again partitioned, and filled back in. The rows land in the default
+# partitions, which RecipeDBAccess.migrate() then splits into months. Times that are unknown,
+# events without a start and the reviews written before they had a time, become -infinity.
+migration = Migration(
+    version=10,
+    description="Partition events and reviews by month",
+    statements=[
+        "CREATE TEMP TABLE old_events ON COMMIT DROP AS SELECT * FROM recipe.events",
+        "CREATE TEMP TABLE old_event_dishes ON COMMIT DROP AS SELECT * FROM recipe.event_dishes",
+        "CREATE TEMP TABLE old_reviews ON COMMIT DROP AS SELECT * FROM recipe.reviews",
+        "CREATE TEMP TABLE old_people_reviews ON COMMIT DROP AS"
+        " SELECT * FROM recipe.people_reviews",
+        "DROP TABLE recipe.people_reviews, recipe.event_dishes, recipe.reviews, recipe.events",
+        # Events
+        "CREATE TABLE recipe.events (type VARCHAR(100), id SERIAL NOT NULL,"
+        " started_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),"
+        " PRIMARY KEY (id, started_at)) PARTITION BY RANGE (started_at)",
+        "CREATE TABLE recipe.events_default PARTITION OF recipe.events DEFAULT",
+        "CREATE INDEX ix_events_started_at ON recipe.events USING brin (started_at)"
+        " WITH (autosummarize = on)",
+        "CREATE TABLE recipe.event_dishes (event_id INTEGER NOT NULL,"
+        " event_started_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,"
+        " dish_id INTEGER NOT NULL REFERENCES recipe.dishes (id),"
+        " PRIMARY KEY (event_id, event_started_at, dish_id),"
+        " FOREIGN KEY (event_id, event_started_at) REFERENCES recipe.events (id, started_at))"
+        " PARTITION BY RANGE (event_started_at)",
+        "CREATE TABLE recipe.event_dishes_default PARTITION OF recipe.event_dishes DEFAULT",
+        "CREATE INDEX ix_event_dishes_dish_id ON recipe.event_dishes (dish_id)",
+        "CREATE INDEX ix_event_dishes_event_started_at ON recipe.event_dishes"
+        " USING brin (event_started_at) WITH (autosummarize = on)",
+        # Reviews
+        "CREATE TABLE recipe.reviews (dish_id INTEGER REFERENCES recipe.dishes (id),"
+        " id SERIAL NOT NULL,"
+        " created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT now(),"
+        " PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)",
+        "CREATE TABLE recipe.reviews_default PARTITION OF recipe.reviews DEFAULT",
+        "CREATE INDEX ix_reviews_dish_id ON recipe.reviews (dish_id)",
+        "CREATE INDEX ix_reviews_created_at ON recipe.reviews USING brin (created_at)"
+        " WITH (autosummarize = on)",
+        "CREATE TABLE recipe.people_reviews (people_id INTEGER NOT NULL"
+        " REFERENCES recipe.people (id), review_id INTEGER NOT NULL,"
+        " review_created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,"
+        " PRIMARY KEY (people_id, review_id, review_created_at),"
+        " FOREIGN KEY (review_id, review_created_at) REFERENCES recipe.reviews (id, created_at))"
+        " PARTITION BY RANGE (review_created_at)",
+        "CREATE TABLE recipe.people_reviews_default PARTITION OF recipe.people_reviews DEFAULT",
+        "CREATE INDEX ix_people_reviews_review_id"
+        " ON recipe.people_reviews (review_id, review_created_at)",
+        "CREATE INDEX ix_people_reviews_review_created_at ON recipe.people_reviews"
+        " USING brin (review_created_at) WITH (autosummarize = on)",
+        # The rows, with the ids they had
+        "INSERT INTO recipe.events (id, type, started_at)"
+        " SELECT id, type, coalesce(started_at, '-infinity') FROM old_events",
+        "INSERT INTO recipe.event_dishes (event_id, event_started_at, dish_id)"
+        " SELECT old.event_id, events.started_at, old.dish_id FROM old_event_dishes old"
+        " JOIN recipe.events ON events.id = old.event_id",
+        "INSERT INTO recipe.reviews (id, dish_id, created_at)"
+        " SELECT id, dish_id, '-infinity' FROM old_reviews",
+        "INSERT INTO recipe.people_reviews (people_id, review_id, review_created_at)"
+        " SELECT old.people_id, old.review_id, reviews.created_at FROM old_people_reviews old"
+        " JOIN recipe.reviews ON reviews.id = old.review_id",
+        "SELECT setval(pg_get_serial_sequence('recipe.events', 'id'),"
+        " coalesce(max(id), 1), max(id) IS NOT NULL) FROM recipe.events",
+        "SELECT setval(pg_get_serial_sequence('recipe.reviews', 'id'),"
+        " coalesce(max(id), 1), max(id) IS NOT NULL) FROM recipe.reviews",
+    ],
+)
@@ -0,0 +1,18 @@
+from database.migrations.migration import Migration
+
+# The tables are filled by python -m database.similarity build, which should run after this
+migration = Migration(
+    version=11,
+    description="Add the similar dishes index",
+    statements=[
+        "CREATE TABLE IF NOT EXISTS recipe.similarity_terms ("
+        "term TEXT NOT NULL, idf DOUBLE PRECISION NOT NULL, PRIMARY KEY (term))",
+        "CREATE TABLE IF NOT EXISTS recipe.dish_terms ("
+        "dish_id INTEGER NOT NULL, term TEXT NOT NULL, weight DOUBLE PRECISION NOT NULL,"
+        " PRIMARY KEY (dish_id, term))",
+        "CREATE INDEX IF NOT EXISTS ix_dish_terms_term_weight ON recipe.dish_terms (term, weight)",
+        "CREATE TABLE IF NOT EXISTS recipe.dish_similarity ("
+        "dish_id INTEGER NOT NULL, similar_dish_id INTEGER NOT NULL,"
+        " score DOUBLE PRECISION NOT NULL, PRIMARY KEY (dish_id, similar_dish_id))",
+    ],
+)
@@ -0,0 +1,26 @@
+"""Renders the notes of the dishes written before notes were rendered on write
+
+python -m database.notes backfill
+python -m database.notes backfill --rerender
+"""
+
+import argparse
+from time import perf_counter
+
+from database.notes.render import backfill_rendered_notes
+from database.utils.connection import RecipeDBAccess
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Renders the notes of existing dishes")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument(
+        "--rerender", action="store_true", help="render every dish, not only unrendered ones"
+    )
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    start = perf_counter()
+    rendered = backfill_rendered_notes(
+        RecipeDBAccess.from_env(), rerender=args.rerender, batch_size=args.batch_size
+    )
+    print(f"Rendered the notes of {rendered} dishes in {perf_counter() - start:.2f}s")
@@ -0,0 +1,177 @@
+import html
+import json
+import re
+from typing import Any, NamedTuple, Sequence
+from urllib.parse import urlsplit
+
+from sqlalchemy import (
+    CursorResult,
+    Integer,
+    Row,
+    Table,
+    Text,
+    cast,
+    column,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+from database.ingest.parse import URL_PATTERN
+from database.schema.models import Dish
+from database.utils.connection import RecipeDBAccess
+
+# A link destination as CommonMark reads it: <bracketed>, or bare with balanced parentheses
+_DESTINATION = r"<[^<>\n]*>|(?:[^\s()<]|\([^\s()]*\))+"
+# Spans that are already Markdown: code, reference definitions, [text](target) links and
+# <scheme:...> autolinks. Their URLs are not linked again, only checked. No span scans past
+# a "[", where the next one may start, so unmatched brackets are not rescanned from each.
+_NOTES_TOKEN = re.compile(
+    r"(?P<code>`[^`]*`)"
+    r"|(?m:^(?P<definition> {0,3}\[[^\[\]]+\]:[ \t]*\n?[ \t]*)"
+    rf"(?P<definition_target>{_DESTINATION}))"
+    rf"|(?P<link>!?\[[^\[\]]*\]\(\s*)(?P<link_target>{_DESTINATION})?"
+    r"(?P<link_end>[^()\[\]]*\))"
+    r"|(?P<autolink><[A-Za-z][A-Za-z0-9+.\-]{1,31}:[^<>\s]*>)"
+    f"|(?P<url>{URL_PATTERN.pattern})"
+)
+_ESCAPED = re.compile(r"\\([!-/:-@\[-`{-~])")
+_IGNORED = re.compile(r"[\x00-\x20\x7f]")
+_SAFE_SCHEMES = {"", "http", "https", "mailto"}
+
+
+class RenderedNotes(NamedTuple):
+    markdown: str
+    links: list[dict[str, Any]]
+
+
+def render_notes(notes: str | None) -> RenderedNotes:
+    """Renders dish notes to the Markdown shown on the dish page, and lists their links
+
+    Bare URLs become Markdown links. Links the notes already write in Markdown, inline, as
+    reference definitions or as <autolinks>, are kept unless their target has a scheme other
+    than http(s) or mailto, e.g. javascript:. The target of such a link or definition is
+    replaced by "#", and such an autolink is escaped into text. Raw HTML needs no escaping,
+    dcc.Markdown shows it as text.
+
+    Args:
+        notes (str | None): The notes as typed
+
+    Returns:
+        RenderedNotes: The Markdown, and the {"url", "host"} of every distinct http(s) link
+    """
+    urls: dict[str, None] = {}
+
+    def render(match: re.Match) -> str:
+        if match.group("code") is not None:
+            return match.group("code")
+        url = match.group("url")
+        if url is not None:
+            urls[url] = None
+            return f"[{url}]({url})"
+        if match.group("autolink") is not None:
+            target = match.group("autolink")
+        else:
+            target = match.group("definition_target") or match.group("link_target") or ""
+        url = _destination_url(target)
+        # Browsers drop control characters and spaces, e.g. from java\tscript:
+        scheme = urlsplit(_IGNORED.sub("", url)).scheme.lower()
+        if scheme in ("http", "https"):
+            urls[url] = None
+        if scheme in _SAFE_SCHEMES:
+            return match.group(0)
+        if match.group("autolink") is not None:
+            # Escaped, the autolink is shown as text
+            return "\\" + target
+        if match.group("definition") is not None:
+            return match.group("definition") + "#"
+        return match.group("link") + "#" + match.group("link_end")
+
+    markdown = _NOTES_TOKEN.sub(render, notes or "")
+    return RenderedNotes(markdown, [{"url": url, "host": urlsplit(url).hostname} for url in urls])
+
+
+def _destination_url(destination: str) -> str:
+    # The URL a browser is given: without angle brackets, and with the entities and
+    # backslash escapes decoded
+    if destination.startswith("<") and destination.endswith(">"):
+        destination = destination[1:-1]
+    return _ESCAPED.sub(r"\1", html.unescape(destination))
+
+
+def rendered_note_columns(notes: str | None) -> dict[str, Any]:
+    """Returns the rendered columns of a dish, to write along with its notes"""
+    rendered = render_notes(notes)
+    return {"notes_rendered": rendered.markdown, "notes_links": rendered.links}
+
+
+def backfill_rendered_notes(
+    db: RecipeDBAccess, rerender: bool = False, batch_size: int = 1000
+) -> int:
+    """Renders the notes of dishes written before rendering on write, in batches
+
+    Dishes are walked in id order, one transaction per batch. A dish edited since its batch
+    was read keeps the rendering of that edit, and neither its version nor its updated_at
+    moves, so editors and the change feed are not disturbed.
+
+    Args:
+        db (RecipeDBAccess): The database
+        rerender (bool): Render every dish again, e.g. after a change of render_notes,
+            instead of only those that were never rendered
+        batch_size (int): The number of dishes read and written at a time
+
+    Returns:
+        int: The number of dishes rendered
+    """
+    rendered = 0
+    last_id = 0
+    while True:
+        query = (
+            select(Dish.id, Dish.version, Dish.notes)
+            .where(Dish.id > last_id)
+            .order_by(Dish.id)
+            .limit(batch_size)
+        )
+        if not rerender:
+            query = query.where(Dish.notes_rendered.is_(None))
+        with db.get_session() as session:
+            rows = session.execute(query).all()
+            if not rows:
+                return rendered
+            # Dishes edited since the batch was read are skipped, and not counted
+            rendered += _update_rendered_notes(session, rows)
+            session.commit()
+        last_id = rows[-1].id
+
+
+def _update_rendered_notes(session: Session, rows: Sequence[Row]) -> int:
+    # One UPDATE ... FROM (VALUES ...) per batch, rather than a round trip per dish. Returns
+    # the number of dishes updated, those still at the version read.
+    rendered = values(
+        column("id", Integer),
+        column("version", Integer),
+        column("markdown", Text),
+        column("links", Text),
+        name="rendered",
+    ).data([(row.id, row.version, *_render_for_update(row.notes)) for row in rows])
+    table = Dish.__table__
+    assert isinstance(table, Table)
+    statement = (
+        update(table)
+        .where(table.c.id == rendered.c.id, table.c.version == rendered.c.version)
+        .values(
+            notes_rendered=rendered.c.markdown,
+            notes_links=cast(rendered.c.links, JSONB),
+            updated_at=table.c.updated_at,
+        )
+    )
+    result = session.execute(statement)
+    assert isinstance(result, CursorResult)
+    return result.rowcount
+
+
+def _render_for_update(notes: str | None) -> tuple[str, str]:
+    markdown, links = render_notes(notes)
+    return markdown, json.dumps(links)
@@ -1,4 +1,23 @@
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, func
+from typing import Any
+
+from sqlalchemy import (
+    DDL,
+    Computed,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    ForeignKeyConstraint,
+    Index,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Text,
+    event,
+    func,
+)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import DeclarativeBase, mapped_column, relationship
 
 from .mixins import IDMixin
@@ -8,7 +27,11 @@ SCHEMA = "recipe"
 
 class Base(DeclarativeBase):
     __abstract__ = True
-    __table_args__ = {"schema": SCHEMA}
+    # Models with indexes or constraints override it with a tuple ending in the schema
+    __table_args__: Any = {"schema": SCHEMA}
+
+    # Migrations refer to indexes by name, so index=True names must not depend on the schema
+    metadata = MetaData(naming_convention={"ix": "ix_%(table_name)s_%(column_0_N_name)s"})
 
     def __repr__(self):
         id_repr = getattr(self, "id", "No ID")
@@ -17,10 +40,44 @@ class Base(DeclarativeBase):
 
 class Dish(IDMixin, Base):
     __tablename__ = "dishes"
-
+    __table_args__ = (
+        Index("ix_dishes_created_at_id", "created_at", "id"),
+        Index("ix_dishes_updated_at_id", "updated_at", "id"),
+        Index("ix_dishes_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_dishes_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        {"schema": SCHEMA},
+    )
     name = mapped_column(Text, nullable=False)
     notes = mapped_column(Text, nullable=True)
+    # Written with the notes, see database.notes.render.render_notes
+    notes_rendered = mapped_column(Text, nullable=True)
+    notes_links = mapped_column(JSONB, nullable=True)
     created_at = mapped_column(DateTime, nullable=False, server_default=func.now())
+    # The change feed cursor, see RecipeDBAccess.get_dish_changes
+    updated_at = mapped_column(
+        DateTime, nullable=False, server_default=func.now(), onupdate=func.now()
+    )
+    # Incremented by every write, see RecipeDBAccess.update_versioned
+    version = mapped_column(Integer, nullable=False, server_default="1")
+    search_vector = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', coalesce(name, '')), 'A')"
+            " || setweight(to_tsvector('english', coalesce(notes, '')), 'B')",
+            persisted=True,
+        ),
+    )
+
+    # search_vector is maintained by PostgreSQL and only read by search queries, through
+    # dish_search_vector. Leaving it unmapped keeps it out of every ORM load and write.
+    # Flushes of a stale version, e.g. merging a dish edited elsewhere since, raise
+    # StaleDataError instead of overwriting the other edit.
+    __mapper_args__ = {"exclude_properties": ["search_vector"], "version_id_col": version}
 
     recipes = relationship("DishRecipe", back_populates="dish")
     reviews = relationship("Review", back_populates="dish")
@@ -30,18 +87,40 @@ class Dish(IDMixin, Base):
 class Recipe(IDMixin, Base):
     __tablename__ = "recipes"
 
-    url = mapped_column(Text)
+    url = mapped_column(Text, index=True)
     added_at = mapped_column(DateTime)
     updated_at = mapped_column(DateTime)
+    # Written by database.ingest. The validators are sent back on the next fetch, so an
+    # unchanged page is answered with 304 Not Modified instead of being downloaded again.
+    etag = mapped_column(Text)
+    last_modified = mapped_column(Text)
+    fetched_at = mapped_column(DateTime)
+    content_hash = mapped_column(
+        String(64), ForeignKey(f"{SCHEMA}.recipe_contents.hash"), index=True
+    )
 
     dishes = relationship("DishRecipe", back_populates="recipe")
 
 
+class RecipeContent(Base):
+    """The parsed content of a recipe page, stored once however many recipes share it"""
+
+    __tablename__ = "recipe_contents"
+
+    # The SHA-256 of the uncompressed JSON
+    hash = mapped_column(String(64), primary_key=True)
+    data = mapped_column(LargeBinary, nullable=False)
+    size = mapped_column(Integer, nullable=False)
+    created_at = mapped_column(DateTime, nullable=False, server_default=func.now())
+
+
 class DishRecipe(Base):
     __tablename__ = "dish_recipes"
 
     dish_id = mapped_column(Integer, ForeignKey(f"{SCHEMA}.dishes.id"), primary_key=True)
-    recipe_id = mapped_column(Integer, ForeignKey(f"{SCHEMA}.recipes.id"), primary_key=True)
+    recipe_id = mapped_column(
+        Integer, ForeignKey(f"{SCHEMA}.recipes.id"), primary_key=True, index=True
+    )
 
     dish = relationship("Dish", back_populates="recipes")
     recipe = relationship("Recipe", back_populates="dishes")
@@ -55,10 +134,28 @@ class Person(IDMixin, Base):
     reviews = relationship("PeopleReview", back_populates="person")
 
 
+# Events and reviews are range partitioned by month, see MONTHLY_PARTITIONS. The partition key
+# is part of every primary key and foreign key, after the id, and times that are unknown are
+# -infinity. Server defaults are fetched on insert, so children get their parent's time on
+# flush.
+
+
 class Review(IDMixin, Base):
     __tablename__ = "reviews"
+    __table_args__ = (
+        Index(
+            "ix_reviews_created_at",
+            "created_at",
+            postgresql_using="brin",
+            postgresql_with={"autosummarize": "on"},
+        ),
+        {"schema": SCHEMA, "postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    dish_id = mapped_column(Integer, ForeignKey(f"{SCHEMA}.dishes.id"))
+    dish_id = mapped_column(Integer, ForeignKey(f"{SCHEMA}.dishes.id"), index=True)
+    created_at = mapped_column(DateTime, primary_key=True, server_default=func.now(), sort_order=1)
+
+    __mapper_args__ = {"eager_defaults": True}
 
     dish = relationship("Dish", back_populates="reviews")
     people = relationship("PeopleReview", back_populates="review")
@@ -66,18 +163,44 @@ class Review(IDMixin, Base):
 
 class Event(IDMixin, Base):
     __tablename__ = "events"
+    __table_args__ = (
+        Index(
+            "ix_events_started_at",
+            "started_at",
+            postgresql_using="brin",
+            postgresql_with={"autosummarize": "on"},
+        ),
+        {"schema": SCHEMA, "postgresql_partition_by": "RANGE (started_at)"},
+    )
 
     type = mapped_column(String(100))
-    started_at = mapped_column(DateTime)
+    started_at = mapped_column(DateTime, primary_key=True, server_default=func.now(), sort_order=1)
+
+    __mapper_args__ = {"eager_defaults": True}
 
     dishes = relationship("EventDish", back_populates="event")
 
 
 class PeopleReview(Base):
     __tablename__ = "people_reviews"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["review_id", "review_created_at"],
+            [f"{SCHEMA}.reviews.id", f"{SCHEMA}.reviews.created_at"],
+        ),
+        Index("ix_people_reviews_review_id", "review_id", "review_created_at"),
+        Index(
+            "ix_people_reviews_review_created_at",
+            "review_created_at",
+            postgresql_using="brin",
+            postgresql_with={"autosummarize": "on"},
+        ),
+        {"schema": SCHEMA, "postgresql_partition_by": "RANGE (review_created_at)"},
+    )
 
     people_id = mapped_column(Integer, ForeignKey(f"{SCHEMA}.people.id"), primary_key=True)
-    review_id = mapped_column(Integer, ForeignKey(f"{SCHEMA}.reviews.id"), primary_key=True)
+    review_id = mapped_column(Integer, primary_key=True)
+    review_created_at = mapped_column(DateTime, primary_key=True)
 
     person = relationship("Person", back_populates="reviews")
     review = relationship("Review", back_populates="people")
@@ -85,9 +208,132 @@ class PeopleReview(Base):
 
 class EventDish(Base):
     __tablename__ = "event_dishes"
-
-    event_id = mapped_column(Integer, ForeignKey(f"{SCHEMA}.events.id"), primary_key=True)
-    dish_id = mapped_column(Integer, ForeignKey(f"{SCHEMA}.dishes.id"), primary_key=True)
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["event_id", "event_started_at"],
+            [f"{SCHEMA}.events.id", f"{SCHEMA}.events.started_at"],
+        ),
+        Index(
+            "ix_event_dishes_event_started_at",
+            "event_started_at",
+            postgresql_using="brin",
+            postgresql_with={"autosummarize": "on"},
+        ),
+        {"schema": SCHEMA, "postgresql_partition_by": "RANGE (event_started_at)"},
+    )
+
+    event_id = mapped_column(Integer, primary_key=True)
+    event_started_at = mapped_column(DateTime, primary_key=True)
+    dish_id = mapped_column(
+        Integer, ForeignKey(f"{SCHEMA}.dishes.id"), primary_key=True, index=True
+    )
 
     event = relationship("Event", back_populates="dishes")
     dish = relationship("Dish", back_populates="events")
+
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+
+    version = mapped_column(Integer, primary_key=True, autoincrement=False)
+    description = mapped_column(Text, nullable=False)
+    applied_at = mapped_column(DateTime, nullable=False, server_default=func.now())
+
+
+# Summary tables, rebuilt from the tables above by database.analytics.summaries rather than
+# written directly, so they need no foreign keys
+
+
+class DishMonthlyEvents(Base):
+    __tablename__ = "dish_monthly_events"
+    __table_args__ = (
+        Index("ix_dish_monthly_events_month_events", "month", "events"),
+        {"schema": SCHEMA},
+    )
+
+    dish_id = mapped_column(Integer, primary_key=True)
+    month = mapped_column(Date, primary_key=True)
+    events = mapped_column(Integer, nullable=False)
+
+
+class EventTypeSummary(Base):
+    __tablename__ = "event_type_summary"
+
+    event_type = mapped_column(String(100), primary_key=True)
+    dishes = mapped_column(Integer, nullable=False)
+    servings = mapped_column(Integer, nullable=False)
+
+
+class DishReviewers(Base):
+    __tablename__ = "dish_reviewers"
+    __table_args__ = (
+        Index("ix_dish_reviewers_reviewers", "reviewers"),
+        {"schema": SCHEMA},
+    )
+
+    dish_id = mapped_column(Integer, primary_key=True)
+    reviews = mapped_column(Integer, nullable=False)
+    reviewers = mapped_column(Integer, nullable=False)
+
+
+# The similar dishes index, rebuilt by database.similarity.neighbors, and updated there dish
+# by dish as they are written
+
+
+class SimilarityTerm(Base):
+    """A term of the dishes' TF-IDF vectors, with its inverse document frequency"""
+
+    __tablename__ = "similarity_terms"
+
+    term = mapped_column(Text, primary_key=True)
+    idf = mapped_column(Float, nullable=False)
+
+
+class DishTerm(Base):
+    """A term of a dish's TF-IDF vector, with its weight in the normalized vector"""
+
+    __tablename__ = "dish_terms"
+    __table_args__ = (
+        # The dishes that weigh the most for a term, read by an update
+        Index("ix_dish_terms_term_weight", "term", "weight"),
+        {"schema": SCHEMA},
+    )
+
+    dish_id = mapped_column(Integer, primary_key=True)
+    term = mapped_column(Text, primary_key=True)
+    weight = mapped_column(Float, nullable=False)
+
+
+class DishSimilarity(Base):
+    """One of the nearest neighbors of a dish, by the cosine similarity of their vectors"""
+
+    __tablename__ = "dish_similarity"
+
+    dish_id = mapped_column(Integer, primary_key=True)
+    similar_dish_id = mapped_column(Integer, primary_key=True)
+    score = mapped_column(Float, nullable=False)
+
+
+# The tables range partitioned by month and their partition keys, parents before children.
+# A child is partitioned by its parent's time, so both have the same months, and a month of
+# both is moved or detached together, see database.utils.partitions
+MONTHLY_PARTITIONS = {
+    "events": "started_at",
+    "event_dishes": "event_started_at",
+    "reviews": "created_at",
+    "people_reviews": "review_created_at",
+}
+
+dish_search_vector = Dish.__table__.c.search_vector
+
+# The trigram operator class of ix_dishes_name_trgm comes from the pg_trgm extension
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+# Rows of the months without a partition of their own land in a default partition, so that
+# writes never fail for want of a partition
+for _table_name in MONTHLY_PARTITIONS:
+    event.listen(
+        Base.metadata.tables[f"{SCHEMA}.{_table_name}"],
+        "after_create",
+        DDL("CREATE TABLE %(fullname)s_default PARTITION OF %(fullname)s DEFAULT"),
+    )
@@ -0,0 +1,76 @@
+"""Immutable, slotted projections of the ORM models, for read-only listings and exports
+
+A read model is a frozen dataclass whose field names are column names of its __model__.
+RecipeDBAccess.get_rows selects exactly those columns with a Core query and builds one
+read model per row, which skips the session, identity map and attribute instrumentation
+of ORM objects.
+"""
+
+from dataclasses import Field, dataclass, fields
+from datetime import datetime
+from functools import cache
+from typing import Any, ClassVar, Protocol, Type
+
+from sqlalchemy.orm import InstrumentedAttribute
+
+from database.schema.models import Base, Dish, Recipe
+
+
+class ReadModel(Protocol):
+    """A read model class, as columns_of and RecipeDBAccess.get_rows take it"""
+
+    __model__: ClassVar[Type[Base]]
+    __dataclass_fields__: ClassVar[dict[str, Field[Any]]]
+
+
+@dataclass(frozen=True, slots=True)
+class DishSummary:
+    __model__: ClassVar[Type[Base]] = Dish
+
+    id: int
+    name: str
+    created_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class DishRow:
+    __model__: ClassVar[Type[Base]] = Dish
+
+    id: int
+    name: str
+    notes: str | None
+    created_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class DishChange:
+    __model__: ClassVar[Type[Base]] = Dish
+
+    id: int
+    name: str
+    created_at: datetime
+    updated_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class RecipeSummary:
+    __model__: ClassVar[Type[Base]] = Recipe
+
+    id: int
+    url: str | None
+
+
+@cache
+def columns_of(read_model: Type[ReadModel]) -> tuple[InstrumentedAttribute, ...]:
+    """Returns the model columns of a read model, in the order of its fields
+
+    Args:
+        read_model (Type[ReadModel]): The read model class
+
+    Raises:
+        AttributeError: If a field does not name a column of the read model's __model__
+
+    Returns:
+        tuple[InstrumentedAttribute, ...]: The columns to select
+    """
+    return tuple(getattr(read_model.__model__, field.name) for field in fields(read_model))
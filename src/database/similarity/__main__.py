@@ -0,0 +1,36 @@
+"""Builds the similar dishes index of the configured database, e.g. nightly from cron
+
+python -m database.similarity build
+python -m database.similarity update --dish-id 12 --dish-id 40
+"""
+
+import argparse
+from time import perf_counter
+
+from database.similarity.neighbors import BATCH_SIZE, TOP_K, build_similarity, update_similarity
+from database.utils.connection import RecipeDBAccess
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds the similar dishes index")
+    parser.add_argument("command", choices=["build", "update"])
+    parser.add_argument(
+        "--dish-id",
+        type=int,
+        action="append",
+        dest="dish_ids",
+        default=[],
+        help="update: the dishes to update, can be repeated",
+    )
+    parser.add_argument("--top-k", type=int, default=TOP_K, help="neighbors kept per dish")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    _db = RecipeDBAccess.from_env()
+    start = perf_counter()
+    if args.command == "build":
+        indexed = build_similarity(_db, top_k=args.top_k, batch_size=args.batch_size)
+        print(f"Indexed {indexed} dishes in {perf_counter() - start:.2f}s")
+    else:
+        for dish_id in args.dish_ids:
+            update_similarity(_db, dish_id, top_k=args.top_k)
+        print(f"Updated {len(args.dish_ids)} dishes in {perf_counter() - start:.2f}s")
@@ -0,0 +1,349 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Iterable, Sequence, Type
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import Float, Row, Text, column, delete, func, insert, select, true, tuple_, values
+from sqlalchemy.orm import Session
+
+from database.ingest.parse import URL_PATTERN
+from database.schema.models import Base, Dish, DishRecipe, DishSimilarity, DishTerm, SimilarityTerm
+from database.utils.connection import RecipeDBAccess
+
+# The tables of the index, derived from the dishes and their recipes
+SIMILARITY_MODELS: list[Type[Base]] = [SimilarityTerm, DishTerm, DishSimilarity]
+
+# The neighbors kept per dish
+TOP_K = 10
+# The dishes scored against each other at a time by a build, which holds a batch_size by
+# dishes sparse matrix of scores
+BATCH_SIZE = 256
+# A word of the name counts as much as this many words of the notes
+NAME_WEIGHT = 2
+# An update scores the dishes that weigh the most for each of its terms, up to this many per
+# term, rather than every dish sharing a common word
+POSTINGS_PER_TERM = 1000
+
+_WORD = re.compile(r"[a-z][a-z0-9]+")
+_STOP_WORDS = frozenset(
+    ["and", "but", "for", "from", "into", "it", "its", "of", "on", "or", "the", "to", "with"]
+)
+
+
+def term_counts(name: str, notes: str | None, recipe_ids: Iterable[int]) -> Counter[str]:
+    """Returns the terms of a dish and how often it has them
+
+    The terms are the words of the name and notes, without their URLs, and one recipe:<id>
+    term per linked recipe, so that dishes made from the same recipe are alike.
+
+    Args:
+        name (str): The name of the dish
+        notes (str | None): The notes of the dish
+        recipe_ids (Iterable[int]): The recipes linked to the dish
+
+    Returns:
+        Counter[str]: The count of every term
+    """
+    counts: Counter[str] = Counter()
+    for word in _words(name):
+        counts[word] += NAME_WEIGHT
+    counts.update(_words(URL_PATTERN.sub(" ", notes or "")))
+    counts.update(f"recipe:{recipe_id}" for recipe_id in recipe_ids)
+    return counts
+
+
+def build_similarity(db: RecipeDBAccess, top_k: int = TOP_K, batch_size: int = BATCH_SIZE) -> int:
+    """Computes the nearest neighbors of every dish, and replaces the similarity tables
+
+    Every dish becomes a sparse TF-IDF vector of its terms, normalized, so the cosine
+    similarity of two dishes is the dot product of their vectors. The dishes are multiplied
+    by the whole matrix batch_size at a time, and the top_k scores of each row are kept.
+    The tables are replaced in one transaction, so the dish page shows either the old or
+    the new neighbors. Updates of single dishes wait while it writes, so run it when few
+    dishes are edited, e.g. nightly from cron.
+
+    Args:
+        db (RecipeDBAccess): The database
+        top_k (int): The neighbors kept per dish
+        batch_size (int): The dishes scored at a time
+
+    Returns:
+        int: The number of dishes indexed
+    """
+    dish_ids, documents = _read_documents(db)
+    terms = sorted({term for counts in documents for term in counts})
+    columns = {term: position for position, term in enumerate(terms)}
+    frequencies = _count_matrix(documents, columns)
+    # Smoothed as if one more dish had every term, so that no term weighs zero
+    document_frequency = np.bincount(frequencies.indices, minlength=len(terms))
+    idf = np.log((1 + len(dish_ids)) / (1 + document_frequency)) + 1
+    vectors = _normalize(_tf(frequencies).multiply(idf).tocsr()).astype(np.float32)
+    transposed = vectors.T.tocsr()
+
+    with db.get_session() as session:
+        _lock(session, db)
+        for model in SIMILARITY_MODELS:
+            session.execute(delete(model))
+        _insert(session, SimilarityTerm, [{"term": t, "idf": float(w)} for t, w in zip(terms, idf)])
+        for start in range(0, len(dish_ids), batch_size):
+            batch = vectors[start : start + batch_size]
+            ids = dish_ids[start : start + batch_size]
+            _insert(session, DishTerm, _term_rows(ids, batch, terms))
+            scores = (batch @ transposed).tocsr()
+            _insert(session, DishSimilarity, _neighbor_rows(start, scores, dish_ids, top_k))
+        session.commit()
+    return len(dish_ids)
+
+
+def update_similarity(db: RecipeDBAccess, dish_id: int, top_k: int = TOP_K) -> None:
+    """Recomputes the vector and neighbors of one dish, e.g. after it was written
+
+    The vector is weighted by the inverse document frequencies of the last build, terms new
+    since then by the rarest one's. It is scored against the dishes that weigh the most for
+    its terms, see POSTINGS_PER_TERM. The dish replaces the weakest neighbor of every dish
+    it now scores higher than, and is dropped by those it no longer scores against. Other
+    dishes keep their scores until the next build_similarity.
+
+    Args:
+        db (RecipeDBAccess): The database
+        dish_id (int): The dish that was written, or deleted
+        top_k (int): The neighbors kept per dish
+    """
+    with db.get_session() as session:
+        _lock(session, db)
+        session.execute(delete(DishTerm).where(DishTerm.dish_id == dish_id))
+        session.execute(delete(DishSimilarity).where(DishSimilarity.dish_id == dish_id))
+        session.execute(delete(DishSimilarity).where(DishSimilarity.similar_dish_id == dish_id))
+        weights = _dish_weights(session, dish_id)
+        if weights:
+            _insert(
+                session,
+                DishTerm,
+                [{"dish_id": dish_id, "term": t, "weight": w} for t, w in weights.items()],
+            )
+            candidates, scores = _score_postings(session, dish_id, weights)
+            best = _top(scores, top_k)
+            _insert(
+                session,
+                DishSimilarity,
+                [
+                    {
+                        "dish_id": dish_id,
+                        "similar_dish_id": int(candidates[i]),
+                        "score": float(scores[i]),
+                    }
+                    for i in best
+                ],
+            )
+            _add_reverse_neighbors(session, dish_id, candidates, scores, top_k)
+        session.commit()
+
+
+def similar_dishes(db: RecipeDBAccess, dish_id: int, limit: int = TOP_K) -> Sequence[Row]:
+    """Returns the dishes most similar to a dish
+
+    Args:
+        db (RecipeDBAccess): The database to read
+        dish_id (int): The dish
+        limit (int): The maximum number of dishes to return
+
+    Returns:
+        Sequence[Row]: The (id, name, score) rows, most similar first
+    """
+    query = (
+        select(Dish.id, Dish.name, DishSimilarity.score)
+        .join(Dish, Dish.id == DishSimilarity.similar_dish_id)
+        .where(DishSimilarity.dish_id == dish_id)
+        .order_by(DishSimilarity.score.desc(), Dish.id)
+        .limit(limit)
+    )
+    with db.get_read_session() as session:
+        return session.execute(query).all()
+
+
+def _words(text: str) -> list[str]:
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOP_WORDS]
+
+
+def _lock(session: Session, db: RecipeDBAccess) -> None:
+    # Writers of the index take turns, per schema, so they never deadlock over the same rows
+    key = func.hashtext(f"dish_similarity:{db.schema}")
+    session.execute(select(func.pg_advisory_xact_lock(key)))
+
+
+def _insert(session: Session, model: type, rows: list[dict]) -> None:
+    # An executemany of no rows would insert one row of defaults
+    if rows:
+        session.execute(insert(model), rows)
+
+
+def _read_documents(db: RecipeDBAccess) -> tuple[list[int], list[Counter[str]]]:
+    recipes = defaultdict(list)
+    for row in db.stream_rows(DishRecipe, ["dish_id", "recipe_id"], batch_size=10000):
+        recipes[row["dish_id"]].append(row["recipe_id"])
+    dish_ids, documents = [], []
+    for row in db.stream_rows(Dish, ["id", "name", "notes"], batch_size=10000):
+        dish_ids.append(row["id"])
+        documents.append(term_counts(row["name"], row["notes"], recipes.get(row["id"], ())))
+    return dish_ids, documents
+
+
+def _count_matrix(documents: Sequence[Counter[str]], columns: dict[str, int]) -> sparse.csr_matrix:
+    indptr = np.cumsum([0] + [len(counts) for counts in documents])
+    indices = np.fromiter(
+        (columns[term] for counts in documents for term in counts), np.int32, indptr[-1]
+    )
+    data = np.fromiter((n for counts in documents for n in counts.values()), np.float64, indptr[-1])
+    return sparse.csr_matrix((data, indices, indptr), shape=(len(documents), len(columns)))
+
+
+def _tf(counts: sparse.csr_matrix) -> sparse.csr_matrix:
+    # Sublinear, a word written ten times is not ten times as telling
+    weighted = counts.copy()
+    weighted.data = 1 + np.log(weighted.data)
+    return weighted
+
+
+def _normalize(vectors: sparse.csr_matrix) -> sparse.csr_matrix:
+    norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return vectors.multiply(1 / norms[:, np.newaxis]).tocsr()
+
+
+def _term_rows(ids: Sequence[int], vectors: sparse.csr_matrix, terms: list[str]) -> list[dict]:
+    rows = []
+    for row, dish_id in enumerate(ids):
+        start, end = vectors.indptr[row], vectors.indptr[row + 1]
+        for column_index, weight in zip(vectors.indices[start:end], vectors.data[start:end]):
+            rows.append({"dish_id": dish_id, "term": terms[column_index], "weight": float(weight)})
+    return rows
+
+
+def _neighbor_rows(
+    offset: int, scores: sparse.csr_matrix, dish_ids: Sequence[int], top_k: int
+) -> list[dict]:
+    # Row i of the scores is the dish at offset + i, whose score with itself is left out
+    rows = []
+    for row in range(scores.shape[0]):
+        start, end = scores.indptr[row], scores.indptr[row + 1]
+        not_self = scores.indices[start:end] != offset + row
+        others = scores.indices[start:end][not_self]
+        row_scores = scores.data[start:end][not_self]
+        for i in _top(row_scores, top_k):
+            rows.append(
+                {
+                    "dish_id": dish_ids[offset + row],
+                    "similar_dish_id": dish_ids[others[i]],
+                    "score": float(row_scores[i]),
+                }
+            )
+    return rows
+
+
+def _top(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Returns the positions of the top_k highest scores, highest first"""
+    if len(scores) > top_k:
+        positions = np.argpartition(-scores, top_k)[:top_k]
+    else:
+        positions = np.arange(len(scores))
+    return positions[np.argsort(-scores[positions], kind="stable")]
+
+
+def _dish_weights(session: Session, dish_id: int) -> dict[str, float]:
+    dish = session.execute(select(Dish.name, Dish.notes).where(Dish.id == dish_id)).first()
+    if dish is None:
+        return {}
+    recipe_ids = session.execute(
+        select(DishRecipe.recipe_id).where(DishRecipe.dish_id == dish_id)
+    ).scalars()
+    counts = term_counts(dish.name, dish.notes, recipe_ids)
+    idf = dict(
+        session.execute(
+            select(SimilarityTerm.term, SimilarityTerm.idf).where(
+                SimilarityTerm.term.in_(list(counts))
+            )
+        )
+        .tuples()
+        .all()
+    )
+    rarest = session.execute(select(func.max(SimilarityTerm.idf))).scalar() or 1.0
+    weights = {term: (1 + math.log(n)) * idf.get(term, rarest) for term, n in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+    return {term: weight / norm for term, weight in weights.items()}
+
+
+def _score_postings(
+    session: Session, dish_id: int, weights: dict[str, float]
+) -> tuple[np.ndarray, np.ndarray]:
+    # The dot products with the dishes read, from the weights of the terms they share
+    terms = values(column("term", Text), column("weight", Float), name="terms").data(
+        list(weights.items())
+    )
+    postings = (
+        select(DishTerm.dish_id, DishTerm.weight)
+        .where(DishTerm.term == terms.c.term, DishTerm.dish_id != dish_id)
+        .order_by(DishTerm.weight.desc())
+        .limit(POSTINGS_PER_TERM)
+        .lateral()
+    )
+    rows = session.execute(
+        select(postings.c.dish_id, postings.c.weight * terms.c.weight)
+        .select_from(terms)
+        .join(postings, true())
+    ).all()
+    if not rows:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float64)
+    dish_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    products = np.array([row[1] for row in rows], dtype=np.float64)
+    candidates, positions = np.unique(dish_ids, return_inverse=True)
+    return candidates, np.bincount(positions, weights=products)
+
+
+def _add_reverse_neighbors(
+    session: Session, dish_id: int, candidates: np.ndarray, scores: np.ndarray, top_k: int
+) -> None:
+    # A dish joins the neighbors of another when there is room, or it beats the weakest
+    ids = [int(candidate) for candidate in candidates]
+    weakest = {
+        row.dish_id: row
+        for row in session.execute(
+            select(
+                DishSimilarity.dish_id,
+                func.count().label("neighbors"),
+                func.min(DishSimilarity.score).label("score"),
+            )
+            .where(DishSimilarity.dish_id.in_(ids))
+            .group_by(DishSimilarity.dish_id)
+        )
+    }
+    joined = [
+        {"dish_id": other, "similar_dish_id": dish_id, "score": float(score)}
+        for other, score in zip(ids, scores)
+        if other not in weakest or weakest[other].neighbors < top_k or score > weakest[other].score
+    ]
+    _insert(session, DishSimilarity, joined)
+    if not joined:
+        return
+    ranked = (
+        select(
+            DishSimilarity.dish_id,
+            DishSimilarity.similar_dish_id,
+            func.row_number()
+            .over(
+                partition_by=DishSimilarity.dish_id,
+                order_by=(DishSimilarity.score.desc(), DishSimilarity.similar_dish_id),
+            )
+            .label("rank"),
+        )
+        .where(DishSimilarity.dish_id.in_([row["dish_id"] for row in joined]))
+        .subquery()
+    )
+    session.execute(
+        delete(DishSimilarity).where(
+            tuple_(DishSimilarity.dish_id, DishSimilarity.similar_dish_id).in_(
+                select(ranked.c.dish_id, ranked.c.similar_dish_id).where(ranked.c.rank > top_k)
+            )
+        )
+    )
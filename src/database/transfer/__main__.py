@@ -0,0 +1,35 @@
+"""Exports the configured database to files, or imports an export into it
+
+python -m database.transfer export backup/ --format parquet
+python -m database.transfer import backup/ --mode upsert
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from database.transfer.formats import FORMATS
+from database.transfer.transfer import export_database, import_database
+from database.utils.connection import RecipeDBAccess
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exports or imports the recipe database")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--format", choices=FORMATS, default="ndjson", help="export format")
+    parser.add_argument(
+        "--mode",
+        choices=["copy", "upsert"],
+        default="copy",
+        help="import with COPY into empty tables, or upsert into existing rows",
+    )
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    _db = RecipeDBAccess.from_env()
+    if args.command == "export":
+        counts = export_database(_db, args.directory, fmt=args.format, batch_size=args.batch_size)
+    else:
+        _db.create_tables()
+        counts = import_database(_db, args.directory, mode=args.mode, batch_size=args.batch_size)
+    print(json.dumps(counts, indent=2))
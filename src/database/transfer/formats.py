@@ -0,0 +1,156 @@
+import importlib
+import json
+from base64 import b64decode, b64encode
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterator, Protocol, Sequence
+
+from sqlalchemy import JSON, Column, DateTime, Integer, LargeBinary, Table
+
+
+def _import_pyarrow() -> tuple[Any, Any]:
+    # Imported on first use, pyarrow takes a tenth of a second to import, and only the
+    # Parquet format needs it
+    try:
+        return importlib.import_module("pyarrow"), importlib.import_module("pyarrow.parquet")
+    except ImportError:
+        raise ImportError("The pyarrow package is required for the Parquet format")
+
+
+class TableWriter(Protocol):
+    extension: str
+
+    def __init__(self, path: Path, table: Table, columns: Sequence[str]): ...
+
+    def write(self, rows: Sequence[dict[str, Any]]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+# Reads the rows of a file, given the table they belong to and a batch size
+TableReader = Callable[[Path, Table, int], Iterator[dict[str, Any]]]
+
+
+class NDJSONWriter:
+    """Writes rows as newline-delimited JSON, one object per row"""
+
+    extension = ".ndjson"
+
+    def __init__(self, path: Path, table: Table, columns: Sequence[str]):
+        self._file = path.open("w", encoding="utf-8")
+
+    def write(self, rows: Sequence[dict[str, Any]]) -> None:
+        self._file.writelines(json.dumps(row, default=_to_json) + "\n" for row in rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read_ndjson(path: Path, table: Table, batch_size: int) -> Iterator[dict[str, Any]]:
+    """Reads the rows of an NDJSON file, restoring the column types JSON cannot express
+
+    Datetimes are written in ISO 8601 and binary columns in base64.
+
+    Args:
+        path (Path): The file to read
+        table (Table): The table the rows belong to
+        batch_size (int): Unused, the file is read one line at a time
+
+    Yields:
+        Iterator[dict[str, Any]]: The rows, keyed by column name
+    """
+    datetime_columns = [c.name for c in table.columns if isinstance(c.type, DateTime)]
+    binary_columns = [c.name for c in table.columns if isinstance(c.type, LargeBinary)]
+    with path.open(encoding="utf-8") as file:
+        for line in file:
+            row = json.loads(line)
+            for name in datetime_columns:
+                if row.get(name) is not None:
+                    row[name] = datetime.fromisoformat(row[name])
+            for name in binary_columns:
+                if row.get(name) is not None:
+                    row[name] = b64decode(row[name])
+            yield row
+
+
+class ParquetWriter:
+    """Writes rows to a Parquet file, one row group per batch"""
+
+    extension = ".parquet"
+
+    def __init__(self, path: Path, table: Table, columns: Sequence[str]):
+        """Initializes the writer
+
+        Raises:
+            ImportError: If the pyarrow package is not installed
+        """
+        self._pa, pq = _import_pyarrow()
+        self._schema = self._pa.schema(
+            [(name, _arrow_type(self._pa, table.c[name])) for name in columns]
+        )
+        self._json_columns = [name for name in columns if isinstance(table.c[name].type, JSON)]
+        self._writer = pq.ParquetWriter(str(path), self._schema)
+
+    def write(self, rows: Sequence[dict[str, Any]]) -> None:
+        if self._json_columns:
+            # Parquet has no type for arbitrary JSON, it is stored as text
+            rows = [
+                {**row, **{name: _dump_json(row[name]) for name in self._json_columns}}
+                for row in rows
+            ]
+        self._writer.write_table(self._pa.Table.from_pylist(list(rows), schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def read_parquet(path: Path, table: Table, batch_size: int) -> Iterator[dict[str, Any]]:
+    """Reads the rows of a Parquet file, batch_size rows at a time
+
+    Args:
+        path (Path): The file to read
+        table (Table): The table the rows belong to
+        batch_size (int): The number of rows decoded at a time
+
+    Raises:
+        ImportError: If the pyarrow package is not installed
+
+    Yields:
+        Iterator[dict[str, Any]]: The rows, keyed by column name
+    """
+    _, pq = _import_pyarrow()
+    json_columns = [c.name for c in table.columns if isinstance(c.type, JSON)]
+    for batch in pq.ParquetFile(str(path)).iter_batches(batch_size=batch_size):
+        for row in batch.to_pylist():
+            for name in json_columns:
+                if row.get(name) is not None:
+                    row[name] = json.loads(row[name])
+            yield row
+
+
+FORMATS: dict[str, tuple[type[TableWriter], TableReader]] = {
+    "ndjson": (NDJSONWriter, read_ndjson),
+    "parquet": (ParquetWriter, read_parquet),
+}
+
+
+def _to_json(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (bytes, memoryview)):
+        return b64encode(value).decode("ascii")
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _dump_json(value: Any) -> str | None:
+    return None if value is None else json.dumps(value)
+
+
+def _arrow_type(pa: Any, column: Column) -> Any:
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column.type, LargeBinary):
+        return pa.binary()
+    return pa.string()
@@ -0,0 +1,145 @@
+import json
+from pathlib import Path
+from typing import Callable, Type
+
+from sqlalchemy import Table
+
+from database.analytics.summaries import SUMMARY_MODELS, refresh_summaries
+from database.schema.models import Base, SchemaMigration
+from database.similarity.neighbors import SIMILARITY_MODELS, build_similarity
+from database.transfer.formats import FORMATS
+from database.utils.bulk import batched
+from database.utils.connection import RecipeDBAccess
+
+MANIFEST = "manifest.json"
+
+
+def transfer_models() -> list[Type[Base]]:
+    """Returns the models whose rows are exported, parents before children
+
+    The schema_migrations table describes the schema rather than the data, so the importing
+    database keeps its own. The summary tables and the similar dishes index are derived data,
+    rebuilt after an import.
+    """
+    models = {mapper.local_table: mapper.class_ for mapper in Base.registry.mappers}
+    skipped = {SchemaMigration, *SUMMARY_MODELS, *SIMILARITY_MODELS}
+    return [
+        models[table]
+        for table in Base.metadata.sorted_tables
+        if table in models and models[table] not in skipped
+    ]
+
+
+def transfer_columns(table: Table) -> list[str]:
+    """Returns the columns that are exported, every column but the generated ones"""
+    return [column.name for column in table.columns if column.computed is None]
+
+
+def export_database(
+    db: RecipeDBAccess,
+    directory: Path,
+    fmt: str = "ndjson",
+    batch_size: int = 10000,
+    progress: Callable[[int, int], None] | None = None,
+) -> dict[str, int]:
+    """Exports every table to one file per table, in constant memory
+
+    Rows are streamed from a server-side cursor and written batch_size rows at a time. Every
+    table is read in one snapshot, see RecipeDBAccess.snapshot, so rows written during the
+    export are left out of every table rather than some, and children never reference a
+    parent missing from the export. A manifest.json with the format, the columns and the row
+    counts is written last.
+
+    Args:
+        db (RecipeDBAccess): The database to export
+        directory (Path): The directory to write to, created if missing
+        fmt (str): ndjson, or parquet if pyarrow is installed
+        batch_size (int): The number of rows fetched and written at a time
+        progress (Callable[[int, int], None] | None): Called after each table with the
+            number of tables exported so far and the total
+
+    Returns:
+        dict[str, int]: The number of rows exported from each table
+    """
+    writer_type, _ = FORMATS[fmt]
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest: dict = {"format": fmt, "tables": []}
+    counts = {}
+    models = transfer_models()
+    with db.snapshot() as connection:
+        for done, model in enumerate(models, start=1):
+            table = model.__table__
+            assert isinstance(table, Table)
+            columns = transfer_columns(table)
+            path = directory / f"{table.name}{writer_type.extension}"
+            writer = writer_type(path, table, columns)
+            rows = 0
+            try:
+                stream = db.stream_rows(model, columns, batch_size, connection=connection)
+                for batch in batched(stream, batch_size):
+                    writer.write(batch)
+                    rows += len(batch)
+            finally:
+                writer.close()
+            counts[table.name] = rows
+            manifest["tables"].append({"name": table.name, "columns": columns, "rows": rows})
+            if progress is not None:
+                progress(done, len(models))
+
+    (directory / MANIFEST).write_text(json.dumps(manifest, indent=2) + "\n")
+    return counts
+
+
+def import_database(
+    db: RecipeDBAccess, directory: Path, mode: str = "copy", batch_size: int = 10000
+) -> dict[str, int]:
+    """Loads an export into the database, parents before children
+
+    Each table is loaded batch_size rows at a time, one transaction per batch. The id
+    sequences are then moved past the imported ids, the summary tables are refreshed and the
+    similar dishes index is rebuilt.
+
+    Args:
+        db (RecipeDBAccess): The database to load into, its tables must exist
+        directory (Path): The directory written by export_database
+        mode (str): copy loads with COPY into empty tables, upsert merges into existing
+            rows by primary key
+        batch_size (int): The number of rows read and loaded at a time
+
+    Raises:
+        ValueError: If the mode is unknown, or the export has a table this schema lacks
+
+    Returns:
+        dict[str, int]: The number of rows imported into each table
+    """
+    if mode not in ("copy", "upsert"):
+        raise ValueError(f"Unknown import mode: {mode}")
+
+    manifest = json.loads((directory / MANIFEST).read_text())
+    writer_type, read = FORMATS[manifest["format"]]
+    exported = {entry["name"]: entry for entry in manifest["tables"]}
+    models = {model.__tablename__: model for model in transfer_models()}
+    unknown = exported.keys() - models.keys()
+    if unknown:
+        raise ValueError(f"Unknown tables in export: {', '.join(sorted(unknown))}")
+
+    counts = {}
+    for name, model in models.items():
+        if name not in exported:
+            continue
+        table = model.__table__
+        assert isinstance(table, Table)
+        columns = exported[name]["columns"]
+        rows = read(directory / f"{name}{writer_type.extension}", table, batch_size)
+        counts[name] = 0
+        for batch in batched(rows, batch_size):
+            if mode == "copy":
+                db.copy_rows(model, batch, columns=columns)
+            else:
+                db.bulk_upsert(model, batch, batch_size=batch_size)
+            counts[name] += len(batch)
+
+    db.sync_sequences()
+    refresh_summaries(db)
+    build_similarity(db)
+    return counts
@@ -0,0 +1,165 @@
+from os import register_at_fork
+from threading import Lock
+from typing import Sequence, Type
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from database.utils.connection import ENTRY, ENTRY_HAS_ID, Credentials, EngineOptions
+
+
+class AsyncRecipeDBAccess:
+    """Class for accessing the recipe database from asyncio code
+
+    The asynchronous counterpart of RecipeDBAccess, built on SQLAlchemy's asyncio extension
+    and the asyncpg driver. Queries await the database instead of blocking a thread, so a
+    single event loop can serve many slow queries concurrently.
+
+    This class is a singleton, and should be accessed by calling
+    AsyncRecipeDBAccess.get_instance(). The engine's connections belong to the event loop
+    that opened them, so call dispose() before the loop is closed. Forked child processes
+    drop the inherited connections and open their own.
+    """
+
+    _instance = None
+    _instance_lock = Lock()
+
+    def __init__(self, credentials: Credentials, engine_options: EngineOptions | None = None):
+        """Initializes the database connection
+
+        Args:
+            credentials (Credentials): The credentials for the database
+            engine_options (EngineOptions | None): The engine and pool options, defaults to
+                EngineOptions()
+        """
+        self._credentials = credentials
+        self._engine_options = engine_options or EngineOptions()
+        username = credentials.username
+        password = credentials.password
+        host = credentials.host
+        db = credentials.db
+
+        print(f"Connecting to {db} database (asyncio)")
+        self._engine = create_async_engine(
+            f"postgresql+asyncpg://{username}:{password}@{host}/{db}",
+            echo=False,
+            execution_options={"schema_translate_map": credentials.schema_translate_map},
+            **self._engine_options.engine_kwargs(driver="asyncpg"),
+        )
+        # Expiring on commit would make the next attribute access an implicit, blocking load
+        self._Session = async_sessionmaker(bind=self._engine, expire_on_commit=False)
+
+    @classmethod
+    def from_env(cls: Type["AsyncRecipeDBAccess"]) -> "AsyncRecipeDBAccess":
+        """Returns an instance of the class using environment variables
+
+        Returns:
+            AsyncRecipeDBAccess: An instance of the class
+        """
+        if cls._instance is not None:
+            return cls._instance
+        credentials = Credentials.from_env()
+        return cls.get_instance(credentials=credentials, engine_options=EngineOptions.from_env())
+
+    @classmethod
+    def get_instance(
+        cls: Type["AsyncRecipeDBAccess"],
+        credentials: Credentials,
+        engine_options: EngineOptions | None = None,
+    ) -> "AsyncRecipeDBAccess":
+        """Returns the singleton instance of the class
+
+        Args:
+            credentials (Credentials): The credentials for the database
+            engine_options (EngineOptions | None): The engine and pool options, only used when
+                the instance is created
+
+        Returns:
+            AsyncRecipeDBAccess: The singleton instance of the class
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(credentials=credentials, engine_options=engine_options)
+        return cls._instance
+
+    @classmethod
+    def _after_fork_in_child(cls) -> None:
+        cls._instance_lock = Lock()
+        if cls._instance is not None:
+            # Dropping the pool without closing its connections needs no event loop
+            cls._instance._engine.sync_engine.dispose(close=False)
+
+    def get_session(self) -> AsyncSession:
+        """Returns a session for the database
+
+        Returns:
+            AsyncSession: A session for the database
+        """
+        return self._Session()
+
+    async def dispose(self) -> None:
+        """Closes every pooled connection of the engine"""
+        await self._engine.dispose()
+
+    async def insert_one(self, obj: ENTRY) -> None:
+        """Inserts a single object into the database
+
+        Args:
+            obj (ENTRY): The object to insert
+        """
+        async with self.get_session() as session:
+            session.add(obj)
+            await session.commit()
+
+    async def insert_many(self, objs: Sequence[ENTRY]) -> None:
+        """Inserts multiple objects into the database
+
+        Args:
+            objs (Sequence[Type[ENTRY]]): The objects to insert
+        """
+        async with self.get_session() as session:
+            session.add_all(objs)
+            await session.commit()
+
+    async def upsert(self, obj: ENTRY) -> ENTRY:
+        """Inserts or updates an object in the database
+
+        Args:
+            obj (ENTRY): The object to insert or update
+        """
+        async with self.get_session() as session:
+            obj = await session.merge(obj)
+            await session.commit()
+            await session.refresh(obj)
+            return obj
+
+    async def get_one_by_id(self, obj_type: Type[ENTRY_HAS_ID], obj_id: int) -> ENTRY_HAS_ID | None:
+        """Gets a single object from the database by id
+
+        Args:
+            obj_type (Type[ENTRY_HAS_ID]): The type of object to get
+            obj_id (int): The id of the object to get
+
+        Returns:
+            ENTRY_HAS_ID | None: The object if it exists, otherwise None
+        """
+        async with self.get_session() as session:
+            result = await session.execute(select(obj_type).where(obj_type.id == obj_id))
+            return result.scalar_one_or_none()
+
+    async def get_all(self, obj_type: Type[ENTRY]) -> Sequence[ENTRY]:
+        """Gets all objects of a given type from the database
+
+        Args:
+            obj_type (Type[ENTRY]): The type of object to get
+
+        Returns:
+            Sequence[ENTRY]: All objects of the given type
+        """
+        async with self.get_session() as session:
+            result = await session.execute(select(obj_type))
+            return result.scalars().all()
+
+
+register_at_fork(after_in_child=AsyncRecipeDBAccess._after_fork_in_child)
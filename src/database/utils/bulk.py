@@ -0,0 +1,95 @@
+import json
+from datetime import date, datetime
+from itertools import islice
+from typing import Any, Iterable, Iterator, Mapping, Sequence
+
+
+def batched(rows: Iterable[Any], batch_size: int) -> Iterator[list[Any]]:
+    """Splits an iterable into lists of at most batch_size items, without materializing it
+
+    Args:
+        rows (Iterable[Any]): The items to split
+        batch_size (int): The maximum number of items per batch
+
+    Raises:
+        ValueError: If batch_size is less than 1
+
+    Yields:
+        Iterator[list[Any]]: The batches, in order
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    iterator = iter(rows)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def to_csv_field(value: Any) -> str:
+    """Formats a value as a field of PostgreSQL's COPY CSV format
+
+    Every non-null value is quoted, so an empty string stays distinguishable from NULL,
+    which is written as an unquoted empty field.
+
+    Args:
+        value (Any): The value to format
+
+    Returns:
+        str: The CSV field
+    """
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    elif isinstance(value, (bytes, memoryview)):
+        value = "\\x" + bytes(value).hex()  # bytea's hex input format
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class CSVRowStream:
+    """Read-only file-like object that renders rows as COPY CSV on demand
+
+    psycopg2's copy_expert pulls from this with read(size), so only the rows needed to fill
+    the next chunk are held in memory, whatever the size of the import.
+    """
+
+    def __init__(self, rows: Iterable[Mapping[str, Any]], columns: Sequence[str]):
+        """Initializes the stream
+
+        Args:
+            rows (Iterable[Mapping[str, Any]]): The rows to render, keyed by column name
+            columns (Sequence[str]): The columns to write, in the order of the COPY statement
+        """
+        self._rows = iter(rows)
+        self._columns = columns
+        self._buffer = ""
+        self.rowcount = 0
+
+    def read(self, size: int = -1) -> str:
+        while (size < 0 or len(self._buffer) < size) and self._render_next():
+            pass
+
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def readline(self, size: int = -1) -> str:
+        # Not called by copy_expert, but part of the file interface it accepts
+        while "\n" not in self._buffer and self._render_next():
+            pass
+
+        end = self._buffer.find("\n") + 1 or len(self._buffer)
+        if 0 <= size < end:
+            end = size
+        line, self._buffer = self._buffer[:end], self._buffer[end:]
+        return line
+
+    def _render_next(self) -> bool:
+        row = next(self._rows, None)
+        if row is None:
+            return False
+        self._buffer += ",".join(to_csv_field(row.get(c)) for c in self._columns) + "\n"
+        self.rowcount += 1
+        return True
@@ -0,0 +1,168 @@
+import pickle
+from collections import OrderedDict
+from os import getenv
+from threading import Lock
+from time import monotonic
+from typing import Any, Protocol, Type
+
+try:
+    import redis
+except ImportError:  # redis is only needed for the shared backend
+    redis = None
+
+
+class Cache(Protocol):
+    def get(self, key: str) -> Any | None: ...
+
+    def set(self, key: str, value: Any) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class TTLCache:
+    """Thread-safe in-process cache that evicts the least recently used entry when full
+
+    Entries also expire ttl seconds after they were set. None cannot be cached, because get
+    returns None for a miss.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        """Initializes the cache
+
+        Args:
+            maxsize (int): The maximum number of entries
+            ttl (float): Seconds an entry is served for after it was set
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCache:
+    """Cache backed by a Redis-compatible server, shared by every worker process
+
+    Values are pickled, and expire after ttl seconds. Size is bounded by the server's
+    maxmemory policy rather than by this class.
+    """
+
+    def __init__(self, url: str, ttl: float = 300, prefix: str = "recipe:"):
+        """Initializes the cache
+
+        Args:
+            url (str): The server URL, e.g. redis://localhost:6379/0
+            ttl (float): Seconds an entry is served for after it was set
+            prefix (str): Prefix for every key, to share a server with other applications
+
+        Raises:
+            ImportError: If the redis package is not installed
+        """
+        if redis is None:
+            raise ImportError("The redis package is required for a Redis cache backend")
+        self.ttl = ttl
+        self._prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Any | None:
+        value = self._client.get(self._prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        self._client.set(self._prefix + key, pickle.dumps(value), px=int(self.ttl * 1000))
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self._prefix + key)
+
+    def clear(self) -> None:
+        keys = list(self._client.scan_iter(match=self._prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
+
+
+class CacheOptions:
+    def __init__(self, name: str, size: int = 1024, ttl: float = 300.0, redis_url: str = ""):
+        """Initializes the cache options
+
+        Args:
+            name (str): The cache name, e.g. DISH, which prefixes its Redis keys
+            size (int): The maximum number of entries of the in-process cache
+            ttl (float): Seconds after which an entry expires
+            redis_url (str): The Redis server of the shared cache, empty for an in-process
+                cache
+        """
+        self.name = name
+        self.size = size
+        self.ttl = ttl
+        self.redis_url = redis_url
+
+    @classmethod
+    def from_env(cls: Type["CacheOptions"], name: str) -> "CacheOptions":
+        """Returns the options of a cache configured by environment variables
+
+        {NAME}_CACHE_REDIS_URL selects the Redis backend, otherwise the cache is in-process and
+        bounded by {NAME}_CACHE_SIZE. {NAME}_CACHE_TTL sets the expiry in seconds.
+
+        Args:
+            name (str): The cache name, e.g. DISH
+
+        Returns:
+            CacheOptions: An instance of the class
+        """
+        return cls(
+            name=name,
+            size=int(getenv(f"{name}_CACHE_SIZE", "1024")),
+            ttl=float(getenv(f"{name}_CACHE_TTL", "300")),
+            redis_url=getenv(f"{name}_CACHE_REDIS_URL", ""),
+        )
+
+    def create_cache(self) -> Cache:
+        """Returns a new, empty cache with these options"""
+        if self.redis_url != "":
+            return RedisCache(
+                url=self.redis_url, ttl=self.ttl, prefix=f"recipe:{self.name.lower()}:"
+            )
+        return TTLCache(maxsize=self.size, ttl=self.ttl)
+
+
+def cache_from_env(name: str) -> Cache:
+    """Returns a cache configured by environment variables, see CacheOptions.from_env
+
+    Args:
+        name (str): The cache name, e.g. DISH
+
+    Returns:
+        Cache: The configured cache
+    """
+    return CacheOptions.from_env(name).create_cache()
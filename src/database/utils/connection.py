@@ -1,14 +1,81 @@
-from os import getenv
-from typing import Sequence, Type, TypeVar
+import atexit
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime
+from os import getenv, register_at_fork
+from threading import Lock
+from typing import (
+    Any,
+    ContextManager,
+    Iterable,
+    Iterator,
+    Mapping,
+    Sequence,
+    Type,
+    TypeVar,
+    cast,
+)
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, sessionmaker
+from psycopg2.extensions import connection as psycopg2_connection
+from sqlalchemy import (
+    ColumnDefault,
+    ColumnElement,
+    Connection,
+    Engine,
+    Row,
+    Select,
+    Table,
+    create_engine,
+    func,
+    insert,
+    inspect,
+    literal,
+    or_,
+    select,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, joinedload, selectinload, sessionmaker
+from sqlalchemy.orm.interfaces import LoaderOption
+from sqlalchemy.schema import CreateSchema
 
-from database.schema.models import Base, Dish, Recipe
+from database.migrations.migration import Migration
+from database.migrations.runner import MigrationRunner
+from database.schema.models import (
+    MONTHLY_PARTITIONS,
+    SCHEMA,
+    Base,
+    Dish,
+    Event,
+    Recipe,
+    Review,
+    dish_search_vector,
+)
+from database.schema.read_models import DishChange, DishSummary, ReadModel, columns_of
+from database.utils.bulk import CSVRowStream, batched
+from database.utils.metrics import QueryInstrumentation
+from database.utils.partitions import (
+    MONTHS_AHEAD,
+    create_partitions,
+    default_months,
+    detach_partitions,
+    month_of,
+    next_month,
+)
+from database.utils.pool import MeteredQueuePool
+from database.utils.replicas import ROUND_ROBIN, Replica, ReplicaSet, read_from_primary
+
+# Minimum pg_trgm word similarity for a fuzzy name match, the extension's default is 0.6
+SEARCH_WORD_SIMILARITY = 0.4
 
 ENTRY = TypeVar("ENTRY", Dish, Recipe)
 ENTRY_HAS_ID = TypeVar("ENTRY_HAS_ID", Dish, Recipe)
+READ_MODEL = TypeVar("READ_MODEL", bound=ReadModel)
+TIMED = TypeVar("TIMED", Event, Review)
+DishPageKey = tuple[datetime, int]
+DishChangeKey = tuple[datetime, int]
 
 
 class Credentials:
@@ -19,6 +86,8 @@ class Credentials:
         host: str,
         db: str,
         is_production: bool,
+        schema: str = SCHEMA,
+        replica_hosts: Sequence[str] = (),
     ):
         """Initializes the credentials
 
@@ -28,6 +97,10 @@ class Credentials:
             host (str): Host to connect to
             db (str): Database to connect to
             is_production (bool): Whether or not the credentials are for production
+            schema (str): Schema the tables are in, e.g. one per test worker. Defaults to the
+                schema of the models
+            replica_hosts (Sequence[str]): Hosts, as host or host:port, of read replicas of
+                the database, which share its name, username and password
         """
 
         try:
@@ -44,6 +117,8 @@ class Credentials:
         self.password = password
         self.host = host
         self.db = db
+        self.schema = schema
+        self.replica_hosts = list(replica_hosts)
         self._is_production = is_production
 
     @classmethod
@@ -63,6 +138,10 @@ class Credentials:
         )
         host = getenv("TEST_POSTGRES_HOST" if not is_production else "POSTGRES_HOST", "")
         db = getenv("TEST_POSTGRES_DB" if not is_production else "POSTGRES_DB", "")
+        schema = getenv("TEST_POSTGRES_SCHEMA" if not is_production else "POSTGRES_SCHEMA", "")
+        replica_hosts = getenv(
+            "TEST_POSTGRES_REPLICA_HOSTS" if not is_production else "POSTGRES_REPLICA_HOSTS", ""
+        )
 
         return cls(
             username=username,
@@ -70,6 +149,8 @@ class Credentials:
             host=host,
             db=db,
             is_production=is_production,
+            schema=schema or SCHEMA,
+            replica_hosts=[host.strip() for host in replica_hosts.split(",") if host.strip()],
         )
 
     @classmethod
@@ -100,61 +181,325 @@ class Credentials:
     def is_production(self) -> bool:
         return self._is_production is True
 
+    @property
+    def schema_translate_map(self) -> dict[str, str] | None:
+        """The engine option that points the models' schema at this one, if they differ"""
+        return None if self.schema == SCHEMA else {SCHEMA: self.schema}
+
+
+class EngineOptions:
+    def __init__(
+        self,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: int = 30,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False,
+        statement_timeout: int = 0,
+        stream_results: bool = False,
+        replica_strategy: str = ROUND_ROBIN,
+        replica_check_interval: int = 5,
+        replica_connect_timeout: int = 2,
+    ):
+        """Initializes the engine and connection pool options
+
+        Args:
+            pool_size (int): Number of connections kept open in the pool
+            max_overflow (int): Number of connections allowed on top of pool_size
+            pool_timeout (int): Seconds to wait for a connection before giving up
+            pool_recycle (int): Seconds after which a connection is replaced, -1 to never
+            pool_pre_ping (bool): Whether to test connections for liveness on checkout
+            statement_timeout (int): Milliseconds before the server cancels a statement, 0 to
+                never
+            stream_results (bool): Whether unbounded reads such as get_all use server-side
+                cursors instead of buffering the whole result in the client
+            replica_strategy (str): How reads pick a replica, round_robin or
+                least_connections
+            replica_check_interval (int): Seconds between health checks of a replica
+            replica_connect_timeout (int): Seconds to wait for a replica to accept a
+                connection, before it is taken out of rotation
+        """
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_recycle = pool_recycle
+        self.pool_pre_ping = pool_pre_ping
+        self.statement_timeout = statement_timeout
+        self.stream_results = stream_results
+        self.replica_strategy = replica_strategy
+        self.replica_check_interval = replica_check_interval
+        self.replica_connect_timeout = replica_connect_timeout
+
+    @classmethod
+    def from_env(cls: Type["EngineOptions"]) -> "EngineOptions":
+        """Returns an instance of the class using environment variables
+
+        Unset variables fall back to the defaults of the constructor.
+
+        Raises:
+            ValueError: If a numeric environment variable is not an integer
+
+        Returns:
+            EngineOptions: An instance of the class
+        """
+        load_dotenv()
+
+        defaults = cls()
+        return cls(
+            pool_size=_getenv_int("POSTGRES_POOL_SIZE", defaults.pool_size),
+            max_overflow=_getenv_int("POSTGRES_MAX_OVERFLOW", defaults.max_overflow),
+            pool_timeout=_getenv_int("POSTGRES_POOL_TIMEOUT", defaults.pool_timeout),
+            pool_recycle=_getenv_int("POSTGRES_POOL_RECYCLE", defaults.pool_recycle),
+            pool_pre_ping=getenv("POSTGRES_POOL_PRE_PING", "False") == "True",
+            statement_timeout=_getenv_int("POSTGRES_STATEMENT_TIMEOUT", defaults.statement_timeout),
+            stream_results=getenv("POSTGRES_STREAM_RESULTS", "False") == "True",
+            replica_strategy=getenv("POSTGRES_REPLICA_STRATEGY", "") or defaults.replica_strategy,
+            replica_check_interval=_getenv_int(
+                "POSTGRES_REPLICA_CHECK_INTERVAL", defaults.replica_check_interval
+            ),
+            replica_connect_timeout=_getenv_int(
+                "POSTGRES_REPLICA_CONNECT_TIMEOUT", defaults.replica_connect_timeout
+            ),
+        )
+
+    def engine_kwargs(self, driver: str = "psycopg2") -> dict[str, Any]:
+        """Returns the keyword arguments for create_engine
+
+        Args:
+            driver (str): The DBAPI driver, psycopg2 or asyncpg, which take the statement
+                timeout in different connect arguments
+
+        Returns:
+            dict[str, Any]: The pool and connect options
+        """
+        kwargs: dict[str, Any] = {
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.pool_timeout,
+            "pool_recycle": self.pool_recycle,
+            "pool_pre_ping": self.pool_pre_ping,
+        }
+        if self.statement_timeout > 0 and driver == "asyncpg":
+            kwargs["connect_args"] = {
+                "server_settings": {"statement_timeout": str(self.statement_timeout)}
+            }
+        elif self.statement_timeout > 0:
+            kwargs["connect_args"] = {"options": f"-c statement_timeout={self.statement_timeout}"}
+        return kwargs
+
+
+def _getenv_int(name: str, default: int) -> int:
+    value = getenv(name, "")
+    if value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}")
+
+
+class VersionConflictError(Exception):
+    """Raised when a versioned update finds that the row was changed or deleted since it was
+    read"""
+
+    def __init__(self, obj_type: Type[Base], obj_id: int, version: int, current: int | None):
+        """Initializes the error
+
+        Args:
+            obj_type (Type[Base]): The model of the row
+            obj_id (int): The id of the row
+            version (int): The version the update expected
+            current (int | None): The version of the row now, None if it was deleted
+        """
+        state = "was deleted" if current is None else f"is now at version {current}"
+        super().__init__(f"{obj_type.__name__}#{obj_id} {state}, expected version {version}")
+        self.obj_id = obj_id
+        self.version = version
+        self.current = current
+
 
 class RecipeDBAccess:
     """Class for accessing the recipe database
 
     This class is a singleton, and should be accessed by calling
-    RecipeDBAccess.get_instance().
+    RecipeDBAccess.get_instance(). The instance is safe to share between threads, and its
+    pooled connections are dropped in forked child processes, which open their own. bind()
+    runs it on a connection managed by the caller instead, e.g. a test's transaction.
 
     Requires a username and password for the database.
     """
 
     _instance = None
+    _instance_lock = Lock()
 
-    def __init__(self, credentials: Credentials):
+    def __init__(self, credentials: Credentials, engine_options: EngineOptions | None = None):
         """Initializes the database connection
 
         Args:
             credentials (Credentials): The credentials for the database
+            engine_options (EngineOptions | None): The engine and pool options, defaults to
+                EngineOptions()
         """
         self._credentials = credentials
-        username = credentials.username
-        password = credentials.password
-        host = credentials.host
-        db = credentials.db
-
-        print(f"Connecting to {db} database")
-        self._engine = create_engine(
-            f"postgresql+psycopg2://{username}:{password}@{host}/{db}",
-            echo=False,
-        )
+        self._engine_options = engine_options or EngineOptions()
+
+        print(f"Connecting to {credentials.db} database")
+        self._engine = self._create_engine(credentials.host)
+        self._replicas: ReplicaSet | None = None
+        if credentials.replica_hosts:
+            print(f"Reading from replicas {', '.join(credentials.replica_hosts)}")
+            self._replicas = ReplicaSet(
+                [
+                    Replica(host, self._create_engine(host, replica=True))
+                    for host in credentials.replica_hosts
+                ],
+                strategy=self._engine_options.replica_strategy,
+                check_interval=self._engine_options.replica_check_interval,
+            )
         self._Session = sessionmaker(bind=self._engine)
+        self._bound: Connection | None = None
 
     @classmethod
     def from_env(cls: Type["RecipeDBAccess"]) -> "RecipeDBAccess":
         """Returns an instance of the class using environment variables
 
+        The environment is only read, and .env only loaded, until the instance exists.
+
         Returns:
             RecipeDBAccess: An instance of the class
         """
+        if cls._instance is not None:
+            return cls._instance
         credentials = Credentials.from_env()
-        return cls.get_instance(credentials=credentials)
+        return cls.get_instance(credentials=credentials, engine_options=EngineOptions.from_env())
 
     @classmethod
-    def get_instance(cls: Type["RecipeDBAccess"], credentials: Credentials) -> "RecipeDBAccess":
+    def get_instance(
+        cls: Type["RecipeDBAccess"],
+        credentials: Credentials,
+        engine_options: EngineOptions | None = None,
+    ) -> "RecipeDBAccess":
         """Returns the singleton instance of the class
 
         Args:
             credentials (Credentials): The credentials for the database
+            engine_options (EngineOptions | None): The engine and pool options, only used when
+                the instance is created
 
         Returns:
             RecipeDBAccess: The singleton instance of the class
         """
         if cls._instance is None:
-            cls._instance = cls(credentials=credentials)
+            with cls._instance_lock:
+                # Another thread may have created the instance while this one waited
+                if cls._instance is None:
+                    cls._instance = cls(credentials=credentials, engine_options=engine_options)
         return cls._instance
 
+    @classmethod
+    def reset_instance(cls: Type["RecipeDBAccess"]) -> None:
+        """Disposes of the singleton instance, the next get_instance creates a new one
+
+        For settings reloads, which may change the credentials or the engine options.
+        """
+        with cls._instance_lock:
+            if cls._instance is not None:
+                cls._instance.dispose()
+                cls._instance = None
+
+    @classmethod
+    def _after_fork_in_child(cls) -> None:
+        # The lock may have been held by another thread of the parent when it forked
+        cls._instance_lock = Lock()
+        if cls._instance is not None:
+            cls._instance.dispose(close=False)
+
+    @classmethod
+    def _dispose_instance(cls) -> None:
+        if cls._instance is not None:
+            cls._instance.dispose()
+
+    def dispose(self, close: bool = True) -> None:
+        """Releases every pooled connection, new connections are opened on demand
+
+        Args:
+            close (bool): Whether to close the connections. A forked child must pass False,
+                because its inherited connections are still in use by the parent process,
+                and closing them would end the parent's sessions
+        """
+        self._engine.dispose(close=close)
+        if self._replicas is not None:
+            self._replicas.dispose(close=close)
+
+    @property
+    def schema(self) -> str:
+        """The schema the tables are in"""
+        return self._credentials.schema
+
+    @contextmanager
+    def bind(self, connection: Connection) -> Iterator["RecipeDBAccess"]:
+        """Runs every session and query of the instance on a connection managed by the caller
+
+        Sessions join the connection's transaction with a SAVEPOINT, so their commits only
+        release it, and rolling the transaction back discards everything written while bound.
+        This is how tests are isolated without recreating the tables. Schema changes, i.e.
+        create_tables, drop_tables and migrate, still use connections of their own.
+
+        The connection is not safe to share between threads, so neither is a bound instance.
+
+        Args:
+            connection (Connection): The connection, usually in a transaction begun by the
+                caller
+
+        Raises:
+            RuntimeError: If the instance is already bound
+
+        Yields:
+            Iterator[RecipeDBAccess]: The instance, until the binding ends
+        """
+        if self._bound is not None:
+            raise RuntimeError("RecipeDBAccess is already bound to a connection")
+        self._bound = connection
+        self._Session = sessionmaker(bind=connection, join_transaction_mode="create_savepoint")
+        try:
+            yield self
+        finally:
+            self._bound = None
+            self._Session = sessionmaker(bind=self._engine)
+
+    def get_pool_status(self) -> dict[str, Any]:
+        """Returns the current state of the connection pool
+
+        Returns:
+            dict[str, Any]: The pool size, the checked out, idle and overflow connection counts,
+                and the checkout wait statistics since the engine was created. With replicas,
+                also their health and checked out connections
+        """
+        pool = self._engine.pool
+        assert isinstance(pool, MeteredQueuePool)
+        status = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": self._engine_options.max_overflow,
+            **pool.metrics.snapshot(),
+        }
+        if self._replicas is not None:
+            status["replicas"] = self._replicas.status()
+        return status
+
+    def instrument(self, instrumentation: QueryInstrumentation) -> None:
+        """Records the latency and row count of every statement this instance executes
+
+        Args:
+            instrumentation (QueryInstrumentation): Where the statements are recorded
+        """
+        instrumentation.attach(self._engine)
+        if self._replicas is not None:
+            for replica in self._replicas.replicas:
+                instrumentation.attach(replica.engine)
+
     def get_session(self) -> Session:
         """Returns a session for the database
 
@@ -163,11 +508,93 @@ class RecipeDBAccess:
         """
         return self._Session()
 
+    def get_read_session(self) -> Session:
+        """Returns a session for reads, on a replica if there are healthy ones
+
+        Replicas lag behind the primary, so reads that must see a write just made belong in
+        a use_primary() block, or in a session from get_session.
+
+        Returns:
+            Session: A session for reads only
+        """
+        if self._bound is not None:
+            return self._Session()
+        return self._Session(bind=self._read_engine())
+
     def create_tables(self) -> None:
-        """Creates the tables in the database"""
+        """Creates the tables in the database
+
+        A database created from scratch already has the latest schema, so every migration is
+        recorded as applied. Existing tables are left as they are, run migrate() to bring them
+        up to date.
+        """
+        is_new = not inspect(self._engine).has_table(Dish.__tablename__, schema=self.schema)
+        with self._engine.begin() as connection:
+            connection.execute(CreateSchema(self.schema, if_not_exists=True))
         Base.metadata.create_all(self._engine)
+        if is_new:
+            MigrationRunner(self._engine).stamp()
+            self.ensure_partitions()
         print("Tables created")
 
+    def migrate(self) -> list[Migration]:
+        """Applies the pending schema migrations, then creates the missing partitions
+
+        Returns:
+            list[Migration]: The migrations that were applied
+        """
+        applied = MigrationRunner(self._engine).upgrade()
+        self.ensure_partitions()
+        return applied
+
+    def ensure_partitions(
+        self, start: date | None = None, months_ahead: int = MONTHS_AHEAD
+    ) -> list[str]:
+        """Creates the monthly partitions of the events and reviews that are missing
+
+        The months from start through months_ahead after the current one get a partition,
+        and so does every month with rows in a default partition, whose rows are moved into
+        it. Run it monthly, e.g. with python -m database.migrations partitions, so that rows
+        are written straight to their month's partition.
+
+        Args:
+            start (date | None): The first month, defaults to the current one
+            months_ahead (int): The number of months after the current one
+
+        Returns:
+            list[str]: The names of the partitions created
+        """
+        month = month_of(start or datetime.now())
+        last = month_of(datetime.now())
+        for _ in range(months_ahead):
+            last = next_month(last)
+        with self.get_session() as session:
+            months = default_months(session.connection(), self.schema)
+            while month <= last:
+                months.add(month)
+                month = next_month(month)
+            created = create_partitions(session.connection(), self.schema, months)
+            session.commit()
+        return created
+
+    def detach_partitions(self, before: date) -> list[str]:
+        """Detaches the monthly partitions of the events and reviews before a month
+
+        The rows of those months are no longer read or written through the partitioned
+        tables, and the detached tables can be archived and dropped. See
+        database.utils.partitions.detach_partitions
+
+        Args:
+            before (date): The first month to keep
+
+        Returns:
+            list[str]: The names of the tables detached
+        """
+        with self.get_session() as session:
+            detached = detach_partitions(session.connection(), self.schema, month_of(before))
+            session.commit()
+        return detached
+
     def drop_tables(self, force: bool = False) -> None:
         """Drops the tables in the database"""
         if force:
@@ -207,27 +634,622 @@ class RecipeDBAccess:
             session.refresh(obj)
             return obj
 
-    def get_one_by_id(self, obj_type: Type[ENTRY_HAS_ID], obj_id: int) -> ENTRY_HAS_ID | None:
+    def update_versioned(
+        self,
+        obj_type: Type[ENTRY_HAS_ID],
+        obj_id: int,
+        version: int,
+        values: Mapping[str, Any],
+    ) -> ENTRY_HAS_ID:
+        """Updates a row if it is still at the version it was read at, in one statement
+
+        Runs UPDATE ... WHERE id = :id AND version = :version RETURNING, and increments the
+        version, so there is no SELECT before or after the write. Of two concurrent edits of
+        the same version, the second one fails instead of overwriting the first.
+
+        Args:
+            obj_type (Type[ENTRY_HAS_ID]): The model, it must have a version_id_col
+            obj_id (int): The id of the row to update
+            version (int): The version the caller read
+            values (Mapping[str, Any]): The new column values, keyed by attribute name
+
+        Raises:
+            ValueError: If the model is not versioned
+            VersionConflictError: If the row is at another version or no longer exists
+
+        Returns:
+            ENTRY_HAS_ID: The updated object, detached
+        """
+        version_column = inspect(obj_type).version_id_col
+        if version_column is None:
+            raise ValueError(f"{obj_type.__name__} has no version column")
+
+        statement = (
+            update(obj_type)
+            .where(obj_type.id == obj_id, version_column == version)
+            .values({**values, version_column: version_column + 1})
+            .returning(obj_type)
+        )
+        with self.get_session() as session:
+            obj = session.execute(statement).scalar_one_or_none()
+            if obj is None:
+                # Only failed updates pay for the second round trip
+                current = session.execute(
+                    select(version_column).where(obj_type.id == obj_id)
+                ).scalar_one_or_none()
+                raise VersionConflictError(obj_type, obj_id, version, current)
+            # Keep the returned values, which the commit would expire
+            session.expunge(obj)
+            session.commit()
+            return obj
+
+    def get_one_by_id(
+        self,
+        obj_type: Type[ENTRY_HAS_ID],
+        obj_id: int,
+        include: Sequence[str] = (),
+    ) -> ENTRY_HAS_ID | None:
         """Gets a single object from the database by id
 
         Args:
             obj_type (Type[ENTRY_HAS_ID]): The type of object to get
             obj_id (int): The id of the object to get
+            include (Sequence[str]): Dotted relationship paths to load with the object, e.g.
+                ["recipes.recipe", "reviews.people.person"]. See eager_load_options
 
         Returns:
             ENTRY_HAS_ID | None: The object if it exists, otherwise None
         """
-        with self.get_session() as session:
-            return session.query(obj_type).filter(obj_type.id == obj_id).one_or_none()
+        with self.get_read_session() as session:
+            query = session.query(obj_type).filter(obj_type.id == obj_id)
+            if include:
+                query = query.options(*eager_load_options(obj_type, include))
+            return query.one_or_none()
 
-    def get_all(self, obj_type: Type[ENTRY]) -> Sequence[ENTRY]:
+    def get_all(self, obj_type: Type[ENTRY], include: Sequence[str] = ()) -> Sequence[ENTRY]:
         """Gets all objects of a given type from the database
 
         Args:
             obj_type (Type[ENTRY]): The type of object to get
+            include (Sequence[str]): Dotted relationship paths to load with the objects, e.g.
+                ["recipes.recipe", "reviews.people.person"]. See eager_load_options
 
         Returns:
             Sequence[ENTRY]: All objects of the given type
         """
+        with self.get_read_session() as session:
+            query = session.query(obj_type)
+            if include:
+                query = query.options(*eager_load_options(obj_type, include))
+            if self._engine_options.stream_results:
+                query = query.execution_options(stream_results=True)
+            return query.all()
+
+    def get_time_range(
+        self,
+        obj_type: Type[TIMED],
+        start: datetime,
+        end: datetime,
+        include: Sequence[str] = (),
+        limit: int | None = None,
+    ) -> Sequence[TIMED]:
+        """Gets the events or reviews of a time range, most recent first
+
+        The range is a condition on the partition key, so only the partitions of the months
+        it overlaps are read.
+
+        Args:
+            obj_type (Type[TIMED]): Event or Review
+            start (datetime): The start of the range, included
+            end (datetime): The end of the range, excluded
+            include (Sequence[str]): Dotted relationship paths to load with the objects, see
+                eager_load_options
+            limit (int | None): The maximum number of objects, defaults to all of them
+
+        Raises:
+            ValueError: If the model is not partitioned by time
+
+        Returns:
+            Sequence[TIMED]: The objects, most recent first
+        """
+        key_name = MONTHLY_PARTITIONS.get(obj_type.__tablename__)
+        if key_name is None:
+            raise ValueError(f"{obj_type.__name__} is not partitioned by time")
+        key = getattr(obj_type, key_name)
+        query = (
+            select(obj_type)
+            .where(key >= start, key < end)
+            .order_by(key.desc(), obj_type.id.desc())
+            .limit(limit)
+        )
+        if include:
+            query = query.options(*eager_load_options(obj_type, include))
+        with self.get_read_session() as session:
+            return session.execute(query).scalars().all()
+
+    def get_rows(
+        self,
+        read_model: Type[READ_MODEL],
+        *where: ColumnElement[bool],
+        order_by: Sequence[Any] = (),
+        limit: int | None = None,
+    ) -> list[READ_MODEL]:
+        """Gets rows as read models, selecting only the read model's columns
+
+        The rows are built from a Core query, without a session, so they cost a fraction of
+        the memory and time of the ORM objects returned by get_all.
+
+        Args:
+            read_model (Type[READ_MODEL]): The read model to build, e.g. DishSummary
+            *where (ColumnElement[bool]): Filters, e.g. Dish.created_at >= since
+            order_by (Sequence[Any]): The columns or expressions to order by
+            limit (int | None): The maximum number of rows to return
+
+        Returns:
+            list[READ_MODEL]: One read model per row
+        """
+        query = self._select_rows(read_model, where, order_by)
+        if limit is not None:
+            query = query.limit(limit)
+        with self._connect(read=True) as conn:
+            return [read_model(*row) for row in conn.execute(query)]
+
+    def iter_rows(
+        self,
+        read_model: Type[READ_MODEL],
+        *where: ColumnElement[bool],
+        order_by: Sequence[Any] = (),
+        batch_size: int = 1000,
+    ) -> Iterator[READ_MODEL]:
+        """Streams rows as read models through a server-side cursor
+
+        Only batch_size rows are held in memory at a time, whatever the size of the table.
+        The connection is held until the iterator is exhausted or closed.
+
+        Args:
+            read_model (Type[READ_MODEL]): The read model to build, e.g. DishRow
+            *where (ColumnElement[bool]): Filters, e.g. Dish.created_at >= since
+            order_by (Sequence[Any]): The columns or expressions to order by
+            batch_size (int): The number of rows fetched per round trip
+
+        Yields:
+            Iterator[READ_MODEL]: One read model per row
+        """
+        query = self._select_rows(read_model, where, order_by)
+        with self._connect(read=True) as conn:
+            # Per statement, Connection.execution_options would also change a bound connection
+            for row in conn.execute(query, execution_options={"yield_per": batch_size}):
+                yield read_model(*row)
+
+    def stream_rows(
+        self,
+        obj_type: Type[Base],
+        columns: Sequence[str],
+        batch_size: int = 1000,
+        connection: Connection | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Streams every row of a table, ordered by primary key, through a server-side cursor
+
+        Args:
+            obj_type (Type[Base]): The model whose table is read
+            columns (Sequence[str]): The columns to select
+            batch_size (int): The number of rows fetched per round trip
+            connection (Connection | None): The connection to read on, e.g. from snapshot(),
+                defaults to one of its own
+
+        Yields:
+            Iterator[dict[str, Any]]: The rows, keyed by column name
+        """
+        table = _table_of(obj_type)
+        query = select(*(table.c[name] for name in columns)).order_by(*table.primary_key)
+        with (
+            nullcontext(connection) if connection is not None else self._connect(read=True)
+        ) as conn:
+            result = conn.execute(query, execution_options={"yield_per": batch_size})
+            for row in result.mappings():
+                yield dict(row)
+
+    @contextmanager
+    def snapshot(self) -> Iterator[Connection]:
+        """Yields a read-only connection whose reads all see the database at one instant
+
+        The connection is in a REPEATABLE READ transaction, so rows written while it reads
+        table after table, e.g. for an export, are not seen. Unlike SERIALIZABLE, this is
+        also available on a replica.
+
+        Yields:
+            Iterator[Connection]: The connection, until the transaction ends
+        """
+        if self._bound is not None:
+            # Already in the caller's transaction
+            yield self._bound
+            return
+        with self._read_engine().connect() as conn:
+            conn = conn.execution_options(
+                isolation_level="REPEATABLE READ", postgresql_readonly=True
+            )
+            with conn.begin():
+                yield conn
+
+    def get_one_as(self, read_model: Type[READ_MODEL], obj_id: int) -> READ_MODEL | None:
+        """Gets a single row by id as a read model
+
+        Args:
+            read_model (Type[READ_MODEL]): The read model to build, e.g. DishSummary
+            obj_id (int): The id of the row to get
+
+        Returns:
+            READ_MODEL | None: The read model if the row exists, otherwise None
+        """
+        rows = self.get_rows(read_model, read_model.__model__.id == obj_id)  # type: ignore
+        return rows[0] if rows else None
+
+    def get_dish_page(
+        self,
+        limit: int,
+        after: DishPageKey | None = None,
+        before: DishPageKey | None = None,
+    ) -> list[DishSummary]:
+        """Gets a page of dishes using keyset pagination on (created_at, id)
+
+        Only the id, name and created_at columns are selected, so the notes are never loaded.
+        The last row of a page is the `after` key of the next page, and the first row is the
+        `before` key of the previous page.
+
+        Args:
+            limit (int): The maximum number of dishes to return
+            after (DishPageKey | None): Only return dishes after this (created_at, id) key
+            before (DishPageKey | None): Only return dishes before this (created_at, id) key
+
+        Raises:
+            ValueError: If both after and before are given
+
+        Returns:
+            list[DishSummary]: The dishes of the page, ordered by (created_at, id)
+        """
+        if after is not None and before is not None:
+            raise ValueError("Only one of after and before can be given")
+
+        page_key = tuple_(Dish.created_at, Dish.id)
+        if before is not None:
+            # Walk backwards from the key, then flip the rows back into ascending order
+            rows = self.get_rows(
+                DishSummary,
+                page_key < tuple_(*map(literal, before)),
+                order_by=[Dish.created_at.desc(), Dish.id.desc()],
+                limit=limit,
+            )
+            return rows[::-1]
+
+        where = [] if after is None else [page_key > tuple_(*map(literal, after))]
+        return self.get_rows(DishSummary, *where, order_by=[Dish.created_at, Dish.id], limit=limit)
+
+    def get_dish_changes(
+        self, after: DishChangeKey | None = None, limit: int = 100
+    ) -> list[DishChange]:
+        """Gets the dishes created or updated since a cursor, oldest change first
+
+        This is a change feed keyed on (updated_at, id): the key of the last change returned
+        is the cursor of the next call, so a poller only reads the dishes that changed, however
+        many there are in total. updated_at is the start of the writing transaction, so a write
+        that commits after a later-started one has been read is only seen if its own
+        transaction is short, which holds for the single-dish writes of the app.
+
+        Args:
+            after (DishChangeKey | None): Only return changes after this (updated_at, id) key,
+                defaults to every dish
+            limit (int): The maximum number of changes to return
+
+        Returns:
+            list[DishChange]: The changed dishes, ordered by (updated_at, id)
+        """
+        where = (
+            []
+            if after is None
+            else [tuple_(Dish.updated_at, Dish.id) > tuple_(*map(literal, after))]
+        )
+        return self.get_rows(DishChange, *where, order_by=[Dish.updated_at, Dish.id], limit=limit)
+
+    def get_dish_change_cursor(self) -> DishChangeKey | None:
+        """Gets the (updated_at, id) key of the latest dish change
+
+        Read it before reading the dishes themselves, and pass it to get_dish_changes to only
+        get the changes made since.
+
+        Returns:
+            DishChangeKey | None: The key, or None if there are no dishes
+        """
+        rows = self.get_rows(DishChange, order_by=[Dish.updated_at.desc(), Dish.id.desc()], limit=1)
+        return (rows[0].updated_at, rows[0].id) if rows else None
+
+    def search_dishes(
+        self,
+        query: str,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Sequence[Row[tuple[int, str, float]]]:
+        """Searches dishes by full-text match on name and notes, and fuzzy match on name
+
+        A dish matches when its search vector matches the query in web search syntax (quoted
+        phrases, "or", -excluded words), or when the query is trigram-similar to a word of its
+        name, which catches typos. Both conditions are served by GIN indexes.
+
+        Args:
+            query (str): The search text
+            limit (int): The maximum number of dishes to return
+            offset (int): The number of ranked dishes to skip
+
+        Returns:
+            Sequence[Row[tuple[int, str, float]]]: The (id, name, rank) rows, full-text matches
+                first, each group ordered by rank
+        """
+        ts_query = func.websearch_to_tsquery("english", query)
+        text_match = dish_search_vector.bool_op("@@")(ts_query)
+        # Names are weighted above notes in the search vector
+        rank = func.ts_rank(dish_search_vector, ts_query) + func.word_similarity(query, Dish.name)
+        statement = (
+            select(Dish.id, Dish.name, rank.label("rank"))
+            .where(or_(text_match, literal(query).bool_op("<%")(Dish.name)))
+            # Full-text matches come before dishes that only have a similar name
+            .order_by(text_match.desc(), rank.desc(), Dish.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        with self.get_read_session() as session:
+            session.execute(
+                select(
+                    func.set_config(
+                        "pg_trgm.word_similarity_threshold", str(SEARCH_WORD_SIMILARITY), True
+                    )
+                )
+            )
+            return session.execute(statement).all()
+
+    def bulk_insert(
+        self,
+        obj_type: Type[Base],
+        rows: Iterable[Mapping[str, Any]],
+        batch_size: int = 1000,
+    ) -> list[Any]:
+        """Inserts rows with multi-row INSERT ... RETURNING statements
+
+        Unlike insert_many, no ORM objects are built or reloaded: each batch is sent as one
+        INSERT ... VALUES statement that only returns the primary keys. Every batch is
+        committed on its own, so rows can be streamed from a generator.
+
+        Args:
+            obj_type (Type[Base]): The model whose table the rows are inserted into
+            rows (Iterable[Mapping[str, Any]]): The rows, keyed by column name
+            batch_size (int): The number of rows per statement and transaction
+
+        Returns:
+            list[Any]: The primary keys of the inserted rows, in input order, as tuples for
+                tables with a composite primary key
+        """
+        table = _table_of(obj_type)
+        statement = insert(table).returning(*table.primary_key, sort_by_parameter_order=True)
+        return self._execute_batches(table, statement, rows, batch_size)
+
+    def bulk_upsert(
+        self,
+        obj_type: Type[Base],
+        rows: Iterable[Mapping[str, Any]],
+        batch_size: int = 1000,
+    ) -> list[Any]:
+        """Inserts or updates rows with INSERT ... ON CONFLICT DO UPDATE statements
+
+        Rows whose primary key already exists are updated in place with the columns present
+        in the row, without the SELECT and refresh round trips of upsert. A batch must not
+        contain the same primary key twice.
+
+        Args:
+            obj_type (Type[Base]): The model whose table the rows are upserted into
+            rows (Iterable[Mapping[str, Any]]): The rows, keyed by column name. Every row must
+                have the same keys
+            batch_size (int): The number of rows per statement and transaction
+
+        Returns:
+            list[Any]: The primary keys of the upserted rows, in input order, as tuples for
+                tables with a composite primary key
+        """
+        table = _table_of(obj_type)
+        primary_key = [column.name for column in table.primary_key]
+        ids: list[Any] = []
+        for batch in batched(rows, batch_size):
+            statement = pg_insert(table)
+            update_columns = {
+                name: statement.excluded[name] for name in batch[0] if name not in primary_key
+            }
+            if update_columns:
+                # ON CONFLICT DO UPDATE skips the columns' onupdate defaults, e.g. updated_at,
+                # and the version counter the ORM maintains
+                update_columns.update(_onupdate_defaults(table, exclude=update_columns))
+                version_column = inspect(obj_type).version_id_col
+                if version_column is not None and version_column.name not in update_columns:
+                    update_columns[version_column.name] = version_column + 1
+            if update_columns:
+                statement = statement.on_conflict_do_update(
+                    index_elements=primary_key, set_=update_columns
+                )
+            else:
+                statement = statement.on_conflict_do_nothing(index_elements=primary_key)
+            returning = statement.returning(*table.primary_key, sort_by_parameter_order=True)
+            ids.extend(self._execute_batches(table, returning, batch, batch_size))
+        return ids
+
+    def copy_rows(
+        self,
+        obj_type: Type[Base],
+        rows: Iterable[Mapping[str, Any]],
+        columns: Sequence[str],
+    ) -> int:
+        """Streams rows into a table with PostgreSQL's COPY ... FROM STDIN
+
+        COPY is the fastest way to load rows, but returns no ids, so it suits restores where
+        the ids are part of the data. Call sync_sequences afterwards in that case.
+
+        Args:
+            obj_type (Type[Base]): The model whose table the rows are copied into
+            rows (Iterable[Mapping[str, Any]]): The rows, keyed by column name
+            columns (Sequence[str]): The columns to copy, missing keys are copied as NULL
+
+        Returns:
+            int: The number of rows copied
+        """
+        table = _table_of(obj_type)
+        unknown = set(columns) - set(table.columns.keys())
+        if unknown:
+            raise ValueError(f"Unknown columns for {table.name}: {', '.join(sorted(unknown))}")
+
+        stream = CSVRowStream(rows=rows, columns=columns)
+        with self.get_session() as session:
+            # COPY is specific to psycopg2, whose connection the pool proxies
+            dbapi_connection = cast(
+                psycopg2_connection, session.connection().connection.dbapi_connection
+            )
+            with dbapi_connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY {self._fullname(table)} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                    stream,
+                )
+            session.commit()
+        return stream.rowcount
+
+    def sync_sequences(self) -> None:
+        """Moves every id sequence past the largest id in its table
+
+        Rows written with explicit ids, e.g. by copy_rows or bulk_insert, do not advance the
+        sequences, so the next generated id would collide without this.
+        """
         with self.get_session() as session:
-            return session.query(obj_type).all()
+            for table in Base.metadata.sorted_tables:
+                if "id" not in table.columns or not table.c.id.autoincrement:
+                    continue
+                max_id = session.execute(select(func.max(table.c.id))).scalar()
+                session.execute(
+                    text("SELECT setval(pg_get_serial_sequence(:table, 'id'), :value, :called)"),
+                    {
+                        "table": self._fullname(table),
+                        "value": max_id or 1,
+                        "called": max_id is not None,
+                    },
+                )
+            session.commit()
+
+    def _create_engine(self, host: str, replica: bool = False) -> Engine:
+        credentials = self._credentials
+        kwargs = self._engine_options.engine_kwargs()
+        if replica:
+            # A replica that is down must fail fast, the read then goes to the primary
+            kwargs["connect_args"] = {
+                **kwargs.get("connect_args", {}),
+                "connect_timeout": self._engine_options.replica_connect_timeout,
+            }
+        return create_engine(
+            f"postgresql+psycopg2://{credentials.username}:{credentials.password}"
+            f"@{host}/{credentials.db}",
+            echo=False,
+            poolclass=MeteredQueuePool,
+            execution_options={"schema_translate_map": credentials.schema_translate_map},
+            **kwargs,
+        )
+
+    def _read_engine(self) -> Engine:
+        if self._replicas is None or read_from_primary.get():
+            return self._engine
+        return self._replicas.choose() or self._engine
+
+    def _connect(self, read: bool = False) -> ContextManager[Connection]:
+        # A bound connection belongs to the caller, and is left open
+        if self._bound is not None:
+            return nullcontext(self._bound)
+        return (self._read_engine() if read else self._engine).connect()
+
+    def _fullname(self, table: Table) -> str:
+        # SQL strings are not schema translated like statements are
+        translate_map = self._credentials.schema_translate_map or {}
+        assert table.schema is not None
+        return f"{translate_map.get(table.schema, table.schema)}.{table.name}"
+
+    def _select_rows(
+        self,
+        read_model: Type[ReadModel],
+        where: Sequence[ColumnElement[bool]],
+        order_by: Sequence[Any],
+    ) -> Select:
+        return select(*columns_of(read_model)).where(*where).order_by(*order_by)
+
+    def _execute_batches(
+        self,
+        table: Table,
+        statement: Any,
+        rows: Iterable[Mapping[str, Any]],
+        batch_size: int,
+    ) -> list[Any]:
+        ids: list[Any] = []
+        for batch in batched(rows, batch_size):
+            with self.get_session() as session:
+                result = session.execute(statement, batch)
+                ids.extend(row[0] if len(row) == 1 else tuple(row) for row in result)
+                session.commit()
+        return ids
+
+
+# Forked workers, e.g. gunicorn with preload_app, must not share the parent's connections
+register_at_fork(after_in_child=RecipeDBAccess._after_fork_in_child)
+atexit.register(RecipeDBAccess._dispose_instance)
+
+
+def eager_load_options(obj_type: Type[Base], include: Sequence[str]) -> list[LoaderOption]:
+    """Builds loader options that load relationship paths together with their parent query
+
+    Each path is a dot-separated chain of relationship names starting at obj_type. Collections
+    are loaded with one SELECT ... WHERE IN per level (selectinload) and many-to-one links are
+    joined into that SELECT (joinedload), so the number of statements depends on the paths,
+    not on the number of rows. The loaded relationships stay usable after the session closes.
+
+    Args:
+        obj_type (Type[Base]): The model the paths start at
+        include (Sequence[str]): The relationship paths, e.g. ["reviews.people.person"]
+
+    Raises:
+        ValueError: If a path names a relationship that does not exist
+
+    Returns:
+        list[LoaderOption]: The options to pass to Query.options or Select.options
+    """
+    options: list[LoaderOption] = []
+    for path in include:
+        model = obj_type
+        option: Any = None
+        for name in path.split("."):
+            relationship = inspect(model).relationships.get(name)
+            if relationship is None:
+                raise ValueError(f"{model.__name__} has no relationship {name!r} in {path!r}")
+            attribute = getattr(model, name)
+            if option is None:
+                option = selectinload(attribute) if relationship.uselist else joinedload(attribute)
+            elif relationship.uselist:
+                option = option.selectinload(attribute)
+            else:
+                option = option.joinedload(attribute)
+            model = relationship.mapper.class_
+        assert option is not None
+        options.append(option)
+    return options
+
+
+def _onupdate_defaults(table: Table, exclude: Iterable[str]) -> dict[str, Any]:
+    return {
+        column.name: column.onupdate.arg
+        for column in table.columns
+        if isinstance(column.onupdate, ColumnDefault)
+        and column.onupdate.is_clause_element
+        and column.name not in exclude
+    }
+
+
+def _table_of(obj_type: Type[Base]) -> Table:
+    table = obj_type.__table__
+    assert isinstance(table, Table)
+    return table
@@ -0,0 +1,245 @@
+import logging
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from threading import Lock
+from time import perf_counter
+from typing import Any
+
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import ExceptionContext
+
+logger = logging.getLogger(__name__)
+
+# Seconds, from 1 ms to 5 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500, 1000, 10000)
+
+LabelSet = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """Thread-safe histogram with fixed bucket bounds, in the Prometheus style"""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        """Initializes the histogram
+
+        Args:
+            buckets (tuple[float, ...]): The inclusive upper bounds of the buckets, ascending
+        """
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)  # The last bucket is +Inf
+        self._sum = 0.0
+        self._lock = Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(self.buckets, value)] += 1
+            self._sum += value
+
+    def snapshot(self) -> dict[str, Any]:
+        """Returns the cumulative bucket counts, the observation count and their sum
+
+        Returns:
+            dict[str, Any]: {"buckets": [(upper bound, count)], "count": int, "sum": float}
+        """
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative = []
+        running = 0
+        for bound, count in zip([*self.buckets, float("inf")], counts):
+            running += count
+            cumulative.append((bound, running))
+        return {"buckets": cumulative, "count": running, "sum": total}
+
+
+class MetricsRegistry:
+    """Named, labelled counters and histograms that render as Prometheus text"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._help: dict[str, tuple[str, str]] = {}
+        self._counters: dict[str, dict[LabelSet, float]] = {}
+        self._histograms: dict[str, dict[LabelSet, Histogram]] = {}
+
+    def counter(self, name: str, help_text: str) -> None:
+        """Declares a counter, so it is rendered even before its first increment"""
+        with self._lock:
+            self._help[name] = ("counter", help_text)
+            self._counters.setdefault(name, {})
+
+    def histogram(self, name: str, help_text: str) -> None:
+        """Declares a histogram, so it is rendered even before its first observation"""
+        with self._lock:
+            self._help[name] = ("histogram", help_text)
+            self._histograms.setdefault(name, {})
+
+    def increment(self, name: str, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        **labels: str,
+    ) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def get_counter(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(tuple(sorted(labels.items())), 0)
+
+    def get_histogram(self, name: str, **labels: str) -> dict[str, Any] | None:
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(tuple(sorted(labels.items())))
+        return None if histogram is None else histogram.snapshot()
+
+    def render_prometheus(self) -> str:
+        """Returns every metric in the Prometheus text exposition format, version 0.0.4
+
+        Returns:
+            str: The exposition, one sample per line
+        """
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+            help_texts = dict(self._help)
+
+        lines = []
+        for name in sorted(counters.keys() | histograms.keys()):
+            metric_type, help_text = help_texts.get(
+                name, ("counter" if name in counters else "histogram", "")
+            )
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in sorted(counters.get(name, {}).items()):
+                lines.append(f"{name}{format_labels(labels)} {value:g}")
+            for labels, histogram in sorted(histograms.get(name, {}).items()):
+                snapshot = histogram.snapshot()
+                for bound, count in snapshot["buckets"]:
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', le),))} {count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {snapshot['sum']:g}")
+                lines.append(f"{name}_count{format_labels(labels)} {snapshot['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels: LabelSet) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+@dataclass
+class RequestStats:
+    """The statements executed while serving one request"""
+
+    statements: int = 0
+    rows: int = 0
+    seconds: float = 0.0
+
+
+# Set by the web layer for the duration of a request, None outside of one
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+def statement_kind(statement: str) -> str:
+    """Returns the statement's leading keyword, e.g. SELECT, to label its metrics by"""
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+
+class QueryInstrumentation:
+    """Records the latency and row count of every statement an engine executes
+
+    Statements slower than the threshold are logged with their SQL and kept in a short
+    in-memory slow log. When a RequestStats is set in current_request, the statement is
+    also counted against that request.
+    """
+
+    def __init__(
+        self, registry: MetricsRegistry, slow_threshold: float = 0.1, slow_log_size: int = 100
+    ):
+        """Initializes the instrumentation
+
+        Args:
+            registry (MetricsRegistry): Where the metrics are recorded
+            slow_threshold (float): Seconds after which a statement is logged as slow
+            slow_log_size (int): The number of slow statements kept for slow_log()
+        """
+        self.registry = registry
+        self.slow_threshold = slow_threshold
+        self._slow: deque[dict[str, Any]] = deque(maxlen=slow_log_size)
+        registry.histogram("recipe_db_statement_duration_seconds", "Statement execution time")
+        registry.counter("recipe_db_statements_total", "Statements executed")
+        registry.counter("recipe_db_rows_total", "Rows returned or affected by statements")
+        registry.counter("recipe_db_slow_statements_total", "Statements over the slow threshold")
+
+    def attach(self, engine: Engine) -> None:
+        """Starts recording the statements of an engine
+
+        Args:
+            engine (Engine): The engine to instrument
+        """
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+    def detach(self, engine: Engine) -> None:
+        event.remove(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.remove(engine, "handle_error", self._handle_error)
+
+    def slow_log(self) -> list[dict[str, Any]]:
+        """Returns the most recent slow statements, oldest first"""
+        return list(self._slow)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # A stack, because a statement can execute another one, e.g. a sequence default
+        conn.info.setdefault("query_start_time", []).append(perf_counter())
+
+    def _handle_error(self, context: ExceptionContext) -> None:
+        # A failed statement never reaches after_cursor_execute, so its start time is dropped
+        # here, or the pooled connection would keep it and time later statements from it.
+        # Without an execution context, the statement failed before before_cursor_execute.
+        if context.connection is None or context.execution_context is None:
+            return
+        start_times = context.connection.info.get("query_start_time")
+        if start_times:
+            start_times.pop()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = perf_counter() - conn.info["query_start_time"].pop()
+        kind = statement_kind(statement)
+        # -1 when the driver cannot tell, e.g. for server-side cursors
+        rows = max(cursor.rowcount, 0)
+
+        self.registry.observe("recipe_db_statement_duration_seconds", seconds, kind=kind)
+        self.registry.increment("recipe_db_statements_total", kind=kind)
+        self.registry.increment("recipe_db_rows_total", rows, kind=kind)
+
+        stats = current_request.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.rows += rows
+            stats.seconds += seconds
+
+        if seconds >= self.slow_threshold:
+            self.registry.increment("recipe_db_slow_statements_total", kind=kind)
+            self._slow.append({"seconds": round(seconds, 6), "rows": rows, "statement": statement})
+            logger.warning("Slow statement (%.1f ms, %d rows): %s", seconds * 1000, rows, statement)
@@ -0,0 +1,158 @@
+import re
+from datetime import date, datetime
+from typing import Iterable
+
+from sqlalchemy import Connection, text
+
+from database.schema.models import MONTHLY_PARTITIONS
+
+# Months after the current one whose partitions are created before any row is written to them
+MONTHS_AHEAD = 3
+
+PARTITIONS = text(
+    "SELECT child.relname FROM pg_inherits"
+    " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+    " WHERE pg_inherits.inhparent = to_regclass(:parent)"
+)
+# A foreign key to a partitioned table has a derived constraint per partition, which goes
+# with it
+FOREIGN_KEYS = text(
+    "SELECT conname FROM pg_constraint"
+    " WHERE conrelid = to_regclass(:table) AND contype = 'f' AND conparentid = 0"
+)
+# A serial id's default depends on the partitioned table's sequence
+DEFAULTS = text(
+    "SELECT attname FROM pg_attrdef"
+    " JOIN pg_attribute ON attrelid = adrelid AND attnum = adnum"
+    " WHERE adrelid = to_regclass(:table)"
+)
+
+
+def month_of(when: date | datetime) -> date:
+    """Returns the first day of the month of a date or time"""
+    return date(when.year, when.month, 1)
+
+
+def next_month(month: date) -> date:
+    """Returns the first day of the month after the given one"""
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    """Returns the name of a table's partition of a month, e.g. events_2024_01"""
+    return f"{table}_{month:%Y_%m}"
+
+
+def partition_months(connection: Connection, schema: str, table: str) -> set[date]:
+    """Returns the months that have a partition of their own
+
+    Args:
+        connection (Connection): A connection to the database
+        schema (str): The schema of the tables
+        table (str): A table of MONTHLY_PARTITIONS
+
+    Returns:
+        set[date]: The first day of every month with a partition
+    """
+    pattern = re.compile(rf"{table}_(\d{{4}})_(\d{{2}})")
+    names = connection.execute(PARTITIONS, {"parent": f"{schema}.{table}"}).scalars()
+    matches = (pattern.fullmatch(name) for name in names)
+    return {date(int(m.group(1)), int(m.group(2)), 1) for m in matches if m is not None}
+
+
+def default_months(connection: Connection, schema: str) -> set[date]:
+    """Returns the months with rows in the default partitions, which need a partition"""
+    months: set[date] = set()
+    for table, key in MONTHLY_PARTITIONS.items():
+        rows = connection.execute(
+            text(
+                f"SELECT DISTINCT date_trunc('month', {key})::date"
+                f" FROM {schema}.{table}_default WHERE isfinite({key})"
+            )
+        )
+        months.update(rows.scalars())
+    return months
+
+
+def create_partitions(connection: Connection, schema: str, months: Iterable[date]) -> list[str]:
+    """Creates the missing partitions of the given months, for every partitioned table
+
+    A partition cannot be created while the default partition holds rows of its month, so
+    those rows are moved into the new partition. Children are taken out before their parents
+    and put back after them, so no foreign key is ever left dangling. Run it in a transaction.
+
+    Args:
+        connection (Connection): A connection to the database, in a transaction
+        schema (str): The schema of the tables
+        months (Iterable[date]): The first day of every month to create
+
+    Returns:
+        list[str]: The names of the partitions created
+    """
+    existing = {table: partition_months(connection, schema, table) for table in MONTHLY_PARTITIONS}
+    created = []
+    for month in sorted(set(months)):
+        missing = [table for table in MONTHLY_PARTITIONS if month not in existing[table]]
+        bounds = f"FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+        for table in reversed(missing):
+            key = MONTHLY_PARTITIONS[table]
+            connection.execute(
+                text(
+                    f"CREATE TEMP TABLE moved_{table} AS WITH moved AS ("
+                    f"DELETE FROM {schema}.{table}_default"
+                    f" WHERE {key} >= :start AND {key} < :end RETURNING *"
+                    ") SELECT * FROM moved"
+                ),
+                {"start": month, "end": next_month(month)},
+            )
+        for table in missing:
+            name = partition_name(table, month)
+            connection.execute(
+                text(
+                    f"CREATE TABLE {schema}.{name} PARTITION OF {schema}.{table} FOR VALUES {bounds}"
+                )
+            )
+            connection.execute(text(f"INSERT INTO {schema}.{table} SELECT * FROM moved_{table}"))
+            connection.execute(text(f"DROP TABLE moved_{table}"))
+            created.append(name)
+    return created
+
+
+def detach_partitions(connection: Connection, schema: str, before: date) -> list[str]:
+    """Detaches the partitions of the months before the given one, for every table
+
+    Each partition becomes a table of its own, e.g. to archive with pg_dump and drop. Its
+    foreign keys are dropped, since a detached child would otherwise keep its parent's month
+    from being detached, and keep the dishes it references from being deleted. So are its
+    column defaults, which would keep the partitioned table from being dropped. Detaching only
+    changes the catalog, and checks that no attached row references the detached parent rows.
+
+    Args:
+        connection (Connection): A connection to the database, in a transaction
+        schema (str): The schema of the tables
+        before (date): The first month to keep
+
+    Returns:
+        list[str]: The names of the partitions detached
+    """
+    detached = []
+    for table in reversed(MONTHLY_PARTITIONS):
+        for month in sorted(partition_months(connection, schema, table)):
+            if month >= before:
+                continue
+            name = partition_name(table, month)
+            connection.execute(
+                text(f"ALTER TABLE {schema}.{table} DETACH PARTITION {schema}.{name}")
+            )
+            foreign_keys = connection.execute(FOREIGN_KEYS, {"table": f"{schema}.{name}"})
+            for foreign_key in foreign_keys.scalars().all():
+                connection.execute(
+                    text(f'ALTER TABLE {schema}.{name} DROP CONSTRAINT "{foreign_key}"')
+                )
+            defaults = connection.execute(DEFAULTS, {"table": f"{schema}.{name}"})
+            for column_name in defaults.scalars().all():
+                connection.execute(
+                    text(f'ALTER TABLE {schema}.{name} ALTER COLUMN "{column_name}" DROP DEFAULT')
+                )
+            detached.append(name)
+    return detached
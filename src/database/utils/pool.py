@@ -0,0 +1,71 @@
+from threading import Lock
+from time import perf_counter
+from typing import Any, cast
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import ConnectionPoolEntry, QueuePool
+
+
+class PoolMetrics:
+    """Thread-safe counters for how long connection checkouts wait on the pool"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_checkout(self, wait: float, timed_out: bool = False) -> None:
+        """Records a single checkout attempt
+
+        Args:
+            wait (float): Seconds spent waiting for a connection
+            timed_out (bool): Whether the checkout gave up after pool_timeout
+        """
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Returns a copy of the counters
+
+        Returns:
+            dict[str, Any]: Checkout and timeout counts, and the mean and max wait in seconds
+        """
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "checkout_wait_mean": self.total_wait / attempts if attempts else 0.0,
+                "checkout_wait_max": self.max_wait,
+            }
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records checkout wait times in a PoolMetrics"""
+
+    def __init__(self, *args, metrics: PoolMetrics | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = metrics or PoolMetrics()
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = perf_counter()
+        try:
+            entry = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_checkout(perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_checkout(perf_counter() - start)
+        return entry
+
+    def recreate(self) -> "MeteredQueuePool":
+        # Engine.dispose() swaps in a recreated pool, keep the history across it
+        pool = cast(MeteredQueuePool, super().recreate())
+        pool.metrics = self.metrics
+        return pool
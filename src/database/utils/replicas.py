@@ -0,0 +1,159 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import count
+from threading import Lock
+from time import monotonic
+from typing import Any, Iterator, Sequence
+
+from sqlalchemy import Engine, event, text
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+ROUND_ROBIN = "round_robin"
+LEAST_CONNECTIONS = "least_connections"
+STRATEGIES = (ROUND_ROBIN, LEAST_CONNECTIONS)
+
+# Set while reads must see the caller's own writes, e.g. just after a user saved a dish
+read_from_primary: ContextVar[bool] = ContextVar("read_from_primary", default=False)
+
+
+@contextmanager
+def use_primary() -> Iterator[None]:
+    """Sends the reads inside the block to the primary, instead of a replica that may lag"""
+    token = read_from_primary.set(True)
+    try:
+        yield
+    finally:
+        read_from_primary.reset(token)
+
+
+class Replica:
+    """A replica's engine, and whether it passed its last health check"""
+
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self.healthy = True
+        # Never checked, the first read probes it before using it
+        self.checked_at = float("-inf")
+        self.error: str | None = None
+
+    @property
+    def checked_out(self) -> int:
+        """The number of the replica's pooled connections in use"""
+        pool = self.engine.pool
+        assert isinstance(pool, QueuePool)
+        return pool.checkedout()
+
+
+class ReplicaSet:
+    """Picks the replica engine for each read, among those that pass their health checks
+
+    A replica is taken out of rotation when a statement on it loses its connection, or when
+    a health check fails. Health checks run lazily: every check_interval seconds, the read
+    that picks a replica first probes each replica with SELECT 1, so a replica that is back
+    rejoins the rotation without a background thread, which forked workers would not inherit.
+    """
+
+    def __init__(
+        self,
+        replicas: Sequence[Replica],
+        strategy: str = ROUND_ROBIN,
+        check_interval: float = 5.0,
+    ):
+        """Initializes the replica set
+
+        Args:
+            replicas (Sequence[Replica]): The replicas
+            strategy (str): round_robin, or least_connections to pick the replica with the
+                fewest checked out connections
+            check_interval (float): Seconds between health checks of a replica
+
+        Raises:
+            ValueError: If the strategy is unknown
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown replica strategy {strategy!r}, expected one of {STRATEGIES}")
+        self.replicas = list(replicas)
+        self.strategy = strategy
+        self.check_interval = check_interval
+        self._lock = Lock()
+        self._turn = count()
+        for replica in self.replicas:
+            event.listen(replica.engine, "handle_error", self._on_error(replica))
+
+    def choose(self) -> Engine | None:
+        """Returns the engine of the replica for the next read
+
+        Returns:
+            Engine | None: The engine, or None if no replica is healthy and the read must go
+                to the primary
+        """
+        self._check_due()
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        if self.strategy == LEAST_CONNECTIONS:
+            return min(healthy, key=lambda replica: replica.checked_out).engine
+        return healthy[next(self._turn) % len(healthy)].engine
+
+    def check_health(self) -> None:
+        """Probes every replica now, and updates the rotation"""
+        for replica in self.replicas:
+            self._check(replica)
+
+    def status(self) -> list[dict[str, Any]]:
+        """Returns the health and the checked out connections of every replica"""
+        return [
+            {
+                "name": replica.name,
+                "healthy": replica.healthy,
+                "error": replica.error,
+                "checked_out": replica.checked_out,
+            }
+            for replica in self.replicas
+        ]
+
+    def dispose(self, close: bool = True) -> None:
+        """Releases the pooled connections of every replica, see RecipeDBAccess.dispose"""
+        for replica in self.replicas:
+            replica.engine.dispose(close=close)
+
+    def _check_due(self) -> None:
+        now = monotonic()
+        with self._lock:
+            # Claim the due checks, so that concurrent reads do not probe the same replica
+            due = [r for r in self.replicas if now - r.checked_at >= self.check_interval]
+            for replica in due:
+                replica.checked_at = now
+        for replica in due:
+            self._check(replica)
+
+    def _check(self, replica: Replica) -> None:
+        try:
+            with replica.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except Exception as e:
+            self._mark(replica, healthy=False, error=str(e).splitlines()[0])
+        else:
+            self._mark(replica, healthy=True)
+
+    def _mark(self, replica: Replica, healthy: bool, error: str | None = None) -> None:
+        if replica.healthy != healthy:
+            if healthy:
+                logger.info(f"Replica {replica.name} is back in rotation")
+            else:
+                logger.warning(f"Replica {replica.name} taken out of rotation: {error}")
+        replica.healthy = healthy
+        replica.error = error
+        replica.checked_at = monotonic()
+
+    def _on_error(self, replica: Replica):
+        def handle_error(context) -> None:
+            # A failed connect comes without a connection, and is not flagged as a disconnect
+            if context.is_disconnect or context.connection is None:
+                self._mark(replica, healthy=False, error=str(context.original_exception))
+
+        return handle_error
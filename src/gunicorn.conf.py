@@ -0,0 +1,41 @@
+"""gunicorn settings for the Dash app, see tracker/wsgi.py
+
+WEB_CONCURRENCY sets the number of worker processes and WEB_THREADS the threads per
+worker. Each worker has its own connection pool of POSTGRES_POOL_SIZE connections, plus
+overflow, so keep workers * (pool size + max overflow) under PostgreSQL's max_connections.
+
+The dish and callback caches are in-process unless DISH_CACHE_REDIS_URL and
+CALLBACK_CACHE_REDIS_URL are set. A worker only invalidates its own in-process cache, so the
+others would keep serving a dish as it was before an edit. More than one worker therefore
+requires both caches on Redis, and without them the default is a single worker.
+"""
+
+from multiprocessing import cpu_count
+from os import getenv
+
+from dotenv import load_dotenv
+
+from database.utils.cache import CacheOptions
+
+load_dotenv()
+
+shared_caches = all(CacheOptions.from_env(name).redis_url for name in ("DISH", "CALLBACK"))
+
+bind = f"0.0.0.0:{getenv('PORT', '8050')}"
+workers = int(getenv("WEB_CONCURRENCY", str(cpu_count() * 2 + 1 if shared_caches else 1)))
+if workers > 1 and not shared_caches:
+    raise RuntimeError(
+        f"WEB_CONCURRENCY={workers} needs shared caches, set DISH_CACHE_REDIS_URL and"
+        " CALLBACK_CACHE_REDIS_URL, or run a single worker"
+    )
+threads = int(getenv("WEB_THREADS", "4"))
+worker_class = "gthread"
+timeout = int(getenv("WEB_TIMEOUT", "60"))
+graceful_timeout = 30
+
+# Import the app, and migrate the database, once in the master rather than in every worker.
+# The forked workers drop the inherited connections, see RecipeDBAccess._after_fork_in_child
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
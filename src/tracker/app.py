@@ -3,15 +3,29 @@ import sys
 
 import dash
 from dash import Dash, dcc, html
+from flask import jsonify, request, send_from_directory
 
 logging.basicConfig(level=logging.INFO)
 
 logger = logging.getLogger(__name__)
 
 sys.path.append(".")  # Adds higher directory to python modules path.
-from database.utils.connection import RecipeDBAccess
+from tracker.background import background_callback_manager, export_directory
+from tracker.instrumentation import setup_instrumentation
+from tracker.read_your_writes import setup_read_your_writes
+from tracker.settings import get_db, get_settings
 
-app = Dash(__name__, use_pages=True, suppress_callback_exceptions=True)
+# Read once, before the pages are registered, see tracker.settings
+settings = get_settings()
+
+app = Dash(
+    __name__,
+    use_pages=True,
+    suppress_callback_exceptions=True,
+    background_callback_manager=background_callback_manager(
+        directory=settings.background_cache_dir, result_ttl=settings.background_result_ttl
+    ),
+)
 app.layout = html.Div(
     [
         html.H1("Multi-page app with Dash Pages"),
@@ -26,13 +40,51 @@ app.layout = html.Div(
     ]
 )
 
+if settings.credentials.replica_hosts:
+    setup_read_your_writes(app, settings.read_your_writes_seconds)
+
+if settings.instrumentation:
+    setup_instrumentation(
+        app,
+        get_db(),
+        slow_query_ms=settings.slow_query_ms,
+        slow_callback_ms=settings.slow_callback_ms,
+    )
+
+
+@app.server.route("/internal/pool")
+def pool_status():
+    """Reports connection pool usage, for sizing POSTGRES_POOL_SIZE/POSTGRES_MAX_OVERFLOW"""
+    return jsonify(get_db().get_pool_status())
+
+
+@app.server.route("/api/search/dish")
+def search_dish():
+    """Ranked dish search, ?q=<query>&limit=<int>&offset=<int>"""
+    # PostgreSQL rejects a negative LIMIT or OFFSET
+    rows = get_db().search_dishes(
+        query=request.args.get("q", ""),
+        limit=max(min(request.args.get("limit", 20, type=int), 100), 0),
+        offset=max(request.args.get("offset", 0, type=int), 0),
+    )
+    return jsonify([{"id": row.id, "name": row.name, "rank": row.rank} for row in rows])
+
+
+@app.server.route("/export/<name>")
+def export_archive(name: str):
+    """Streams an archive written by the export page, from the disk rather than memory"""
+    return send_from_directory(
+        export_directory(settings.background_cache_dir), name, as_attachment=True
+    )
+
 
 if __name__ == "__main__":
-    _db = RecipeDBAccess.from_env()
+    _db = get_db()
     if _db._credentials.is_production:
         logging.info("Using production database")
     else:
         logging.info("Using test database")
     _db.create_tables()
+    _db.migrate()
     app.run_server(host="0.0.0.0", debug=True)
     # _db.drop_tables(force=True)
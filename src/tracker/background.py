@@ -0,0 +1,61 @@
+from pathlib import Path
+from tempfile import gettempdir
+from time import time
+
+import diskcache
+from dash import DiskcacheManager
+
+DEFAULT_DIRECTORY = Path(gettempdir()) / "recipe-jobs"
+
+
+def background_callback_manager(directory: str = "", result_ttl: int = 3600) -> DiskcacheManager:
+    """Returns the manager that runs background callbacks
+
+    Each background callback runs in its own process, so it never holds a web worker while
+    it works. Its progress and result are exchanged through a disk cache, which every worker
+    of the app must share.
+
+    Args:
+        directory (str): The directory of the disk cache, defaults to one in the temporary
+            directory
+        result_ttl (int): Seconds the results are kept
+
+    Returns:
+        DiskcacheManager: The manager, for Dash(background_callback_manager=...)
+    """
+    cache = diskcache.Cache(directory or str(DEFAULT_DIRECTORY))
+    return DiskcacheManager(cache, expire=result_ttl)
+
+
+def export_directory(directory: str = "") -> Path:
+    """Returns the directory of the export archives, inside the background callbacks' disk cache
+
+    Archives are written there by the export page's background callback and read from there
+    by the app's /export/<name> route, so every worker of the app must share it too.
+
+    Args:
+        directory (str): The directory of the disk cache, defaults to one in the temporary
+            directory
+
+    Returns:
+        Path: The directory, which may not exist yet
+    """
+    return Path(directory or DEFAULT_DIRECTORY) / "exports"
+
+
+def prune_exports(directory: Path, max_age: float) -> list[Path]:
+    """Deletes the export archives written more than max_age seconds ago
+
+    Args:
+        directory (Path): The directory of the export archives
+        max_age (float): Seconds an archive is kept, like a background callback's result
+
+    Returns:
+        list[Path]: The archives deleted
+    """
+    expired = [
+        archive for archive in directory.glob("*.zip") if time() - archive.stat().st_mtime > max_age
+    ]
+    for archive in expired:
+        archive.unlink(missing_ok=True)
+    return expired
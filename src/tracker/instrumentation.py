@@ -0,0 +1,173 @@
+"""Opt-in latency and statement metrics for the Dash app
+
+Set INSTRUMENTATION=True to record every SQL statement and Dash callback. The aggregates
+are served at /internal/metrics in the Prometheus text format, and the latest slow
+statements and callbacks at /internal/slow. SLOW_QUERY_MS and SLOW_CALLBACK_MS set the
+thresholds above which a statement or a callback is logged with a warning.
+"""
+
+import logging
+from collections import deque
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable
+
+import flask
+from dash import Dash
+from dash.exceptions import PreventUpdate
+
+from database.utils.connection import RecipeDBAccess
+from database.utils.metrics import (
+    COUNT_BUCKETS,
+    MetricsRegistry,
+    QueryInstrumentation,
+    RequestStats,
+    current_request,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CallbackInstrumentation:
+    """Records the latency and failures of Dash callbacks"""
+
+    def __init__(
+        self, registry: MetricsRegistry, slow_threshold: float = 0.5, slow_log_size: int = 100
+    ):
+        """Initializes the instrumentation
+
+        Args:
+            registry (MetricsRegistry): Where the metrics are recorded
+            slow_threshold (float): Seconds after which a callback is logged as slow
+            slow_log_size (int): The number of slow callbacks kept for slow_log()
+        """
+        self.registry = registry
+        self.slow_threshold = slow_threshold
+        self._slow: deque[dict[str, Any]] = deque(maxlen=slow_log_size)
+        registry.histogram("recipe_dash_callback_duration_seconds", "Callback execution time")
+        registry.counter("recipe_dash_callback_errors_total", "Callbacks that raised")
+        registry.counter("recipe_dash_slow_callbacks_total", "Callbacks over the slow threshold")
+
+    def wrap(self, func: Callable, name: str) -> Callable:
+        """Returns func wrapped to record each call under the given callback name"""
+
+        @wraps(func)
+        def instrumented(*args, **kwargs):
+            if flask.has_request_context():
+                flask.g.callback_name = name
+            stats = current_request.get()
+            statements_before = stats.statements if stats is not None else 0
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except PreventUpdate:
+                raise
+            except Exception:
+                self.registry.increment("recipe_dash_callback_errors_total", callback=name)
+                raise
+            finally:
+                seconds = perf_counter() - start
+                self.registry.observe(
+                    "recipe_dash_callback_duration_seconds", seconds, callback=name
+                )
+                if seconds >= self.slow_threshold:
+                    statements = stats.statements - statements_before if stats else None
+                    self._record_slow(name, seconds, statements)
+
+        instrumented.__instrumented__ = True  # type: ignore[attr-defined]
+        return instrumented
+
+    def instrument(self, callback_map: dict[str, dict[str, Any]]) -> int:
+        """Wraps every callback of a callback map that is not wrapped yet
+
+        Args:
+            callback_map (dict[str, dict[str, Any]]): Dash.callback_map, or dash's global map
+
+        Returns:
+            int: The number of callbacks wrapped by this call
+        """
+        wrapped = 0
+        for callback in callback_map.values():
+            # Clientside callbacks run in the browser and have no Python function
+            func = callback.get("callback")
+            if func is None or getattr(func, "__instrumented__", False):
+                continue
+            callback["callback"] = self.wrap(func, name=f"{func.__module__}.{func.__name__}")
+            wrapped += 1
+        return wrapped
+
+    def slow_log(self) -> list[dict[str, Any]]:
+        """Returns the most recent slow callbacks, oldest first"""
+        return list(self._slow)
+
+    def _record_slow(self, name: str, seconds: float, statements: int | None) -> None:
+        self.registry.increment("recipe_dash_slow_callbacks_total", callback=name)
+        self._slow.append(
+            {"callback": name, "seconds": round(seconds, 6), "statements": statements}
+        )
+        logger.warning(
+            "Slow callback %s (%.1f ms, %s statements)", name, seconds * 1000, statements
+        )
+
+
+def setup_instrumentation(
+    app: Dash, db: RecipeDBAccess, slow_query_ms: float = 100, slow_callback_ms: float = 500
+) -> MetricsRegistry:
+    """Instruments the database engine, the callbacks and the requests of the app
+
+    Args:
+        app (Dash): The Dash app, before it serves its first request
+        db (RecipeDBAccess): The database whose statements are recorded
+        slow_query_ms (float): Statements slower than this are logged
+        slow_callback_ms (float): Callbacks slower than this are logged
+
+    Returns:
+        MetricsRegistry: The registry the metrics are recorded in
+    """
+    registry = MetricsRegistry()
+    queries = QueryInstrumentation(registry, slow_threshold=slow_query_ms / 1000)
+    callbacks = CallbackInstrumentation(registry, slow_threshold=slow_callback_ms / 1000)
+    db.instrument(queries)
+    registry.histogram("recipe_request_statements", "Statements executed per request")
+    registry.histogram("recipe_request_db_seconds", "Time spent in statements per request")
+
+    server = app.server
+
+    @server.before_request
+    def start_request():
+        # Dash copies the dash.callback registrations into app.callback_map on the first
+        # request, in its own before_request hook, which runs before this one
+        callbacks.instrument(app.callback_map)
+        flask.g.request_stats_token = current_request.set(RequestStats())
+
+    @server.after_request
+    def finish_request(response: flask.Response) -> flask.Response:
+        stats = current_request.get()
+        if stats is None:
+            return response
+        rule = flask.request.url_rule
+        route = flask.g.get("callback_name") or (rule.rule if rule else "unmatched")
+        registry.observe("recipe_request_statements", stats.statements, COUNT_BUCKETS, route=route)
+        registry.observe("recipe_request_db_seconds", stats.seconds, route=route)
+        response.headers["Server-Timing"] = (
+            f'db;dur={stats.seconds * 1000:.1f};desc="{stats.statements} statements"'
+        )
+        return response
+
+    @server.teardown_request
+    def end_request(exc: BaseException | None) -> None:
+        token = flask.g.pop("request_stats_token", None)
+        if token is not None:
+            current_request.reset(token)
+
+    @server.route("/internal/metrics")
+    def metrics():
+        return flask.Response(
+            registry.render_prometheus(), mimetype="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+    @server.route("/internal/slow")
+    def slow():
+        return flask.jsonify({"statements": queries.slow_log(), "callbacks": callbacks.slow_log()})
+
+    return registry
@@ -1,5 +1,5 @@
 import dash
-from dash import dcc, html
+from dash import dcc, html, no_update
 from dash.dependencies import Input, Output, State
 
 from database.schema.models import Dish
@@ -15,23 +15,23 @@ def layout():
             make_html_dish_form(),
             html.Button("Insert Dish", id="button-insert-dish", n_clicks=0),
             html.Div(id="output-state"),
+            # Navigates to the new dish without reloading the app, see update_output
+            dcc.Location(id="url-add-dish", refresh="callback-nav"),
         ]
     )
 
 
 @dash.callback(
-    Output("output-state", "children"),
+    [Output("url-add-dish", "href"), Output("output-state", "children")],
     [Input("button-insert-dish", "n_clicks")],
     [State("dish-name", "value"), State("dish-notes", "value")],
+    prevent_initial_call=True,
 )
 def update_output(n_clicks, dish_name, dish_notes):
-    if n_clicks > 0:
-        dish = Dish(name=dish_name, notes=dish_notes)
+    dish = Dish(name=dish_name, notes=dish_notes)
 
-        try:
-            new_dish = upsert_dish(dish=dish)
-            return dcc.Location(href=f"/dish/{new_dish.id}", id="redirect-get-dish")
-        except Exception as e:
-            return f"Error: {e}"
-
-    return ""
+    try:
+        new_dish = upsert_dish(dish=dish)
+        return f"/dish/{new_dish.id}", no_update
+    except Exception as e:
+        return no_update, f"Error: {e}"
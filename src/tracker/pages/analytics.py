@@ -0,0 +1,77 @@
+from datetime import date
+
+import dash
+import plotly.graph_objects as go
+from dash import dcc, html
+from dash.dependencies import Input, Output
+
+from database.analytics.summaries import (
+    dishes_per_event_type,
+    event_months,
+    most_cooked_dishes,
+    most_reviewed_dishes,
+)
+from tracker.settings import get_db
+
+dash.register_page(__name__, path="/analytics")
+
+
+def bar_chart(labels: list, values: list, title: str) -> go.Figure:
+    figure = go.Figure(go.Bar(x=labels, y=values))
+    figure.update_layout(title=title, margin={"t": 40, "b": 40})
+    return figure
+
+
+@dash.callback(
+    Output("analytics-most-cooked", "figure"),
+    Input("analytics-month", "value"),
+)
+def update_most_cooked(month):
+    if month is None:
+        return bar_chart([], [], "Most cooked dishes")
+    rows = most_cooked_dishes(get_db(), date.fromisoformat(month))
+    return bar_chart(
+        [row.name for row in rows],
+        [row.events for row in rows],
+        f"Most cooked dishes in {date.fromisoformat(month):%B %Y}",
+    )
+
+
+def layout():
+    # Every figure is read from the summary tables, which are small and pre-aggregated, so
+    # the page costs a few index lookups however many events and reviews there are
+    db = get_db()
+    months = [month.isoformat() for month in event_months(db)]
+    event_types = dishes_per_event_type(db)
+    reviewed = most_reviewed_dishes(db)
+    return html.Div(
+        [
+            html.H1("Analytics"),
+            dcc.Dropdown(
+                id="analytics-month",
+                options=[
+                    {"label": f"{date.fromisoformat(month):%B %Y}", "value": month}
+                    for month in months
+                ],
+                value=months[0] if months else None,
+                clearable=False,
+            ),
+            dcc.Graph(id="analytics-most-cooked"),
+            dcc.Graph(
+                id="analytics-event-types",
+                figure=bar_chart(
+                    [row.event_type for row in event_types],
+                    [row.dishes for row in event_types],
+                    "Dishes per event type",
+                ),
+            ),
+            dcc.Graph(
+                id="analytics-most-reviewed",
+                figure=bar_chart(
+                    [row.name for row in reviewed],
+                    [row.reviewers for row in reviewed],
+                    "Most reviewed dishes",
+                ),
+            ),
+        ]
+    )
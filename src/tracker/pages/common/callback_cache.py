@@ -0,0 +1,98 @@
+import hashlib
+import inspect
+import json
+from functools import wraps
+from typing import Any, Callable, Sequence
+from uuid import uuid4
+
+from dash import ctx
+from dash.exceptions import MissingCallbackContextException
+
+from database.utils.cache import Cache
+from tracker.settings import Settings, get_settings, on_reload
+
+_callback_cache: Cache | None = None
+
+DISH_GENERATION_KEY = "generation:dishes"
+
+
+def get_callback_cache() -> Cache:
+    global _callback_cache
+    if _callback_cache is None:
+        _callback_cache = get_settings().callback_cache.create_cache()
+    return _callback_cache
+
+
+@on_reload
+def _drop_callback_cache(settings: Settings) -> None:
+    global _callback_cache
+    _callback_cache = None
+
+
+def get_generation(key: str) -> str:
+    """Returns the current generation of a data set, starting one if there is none
+
+    Memoized results are keyed by the generation of the data they read, so starting a new
+    generation invalidates all of them at once.
+    """
+    cache = get_callback_cache()
+    generation = cache.get(key)
+    if generation is None:
+        generation = uuid4().hex
+        cache.set(key, generation)
+    return generation
+
+
+def new_generation(key: str) -> None:
+    # A random token rather than a counter, so concurrent writers never need a
+    # read-modify-write and every write is guaranteed to change the generation
+    get_callback_cache().set(key, uuid4().hex)
+
+
+def memoize_callback(
+    generation_key: str, ignore: Sequence[str] = ()
+) -> Callable[[Callable], Callable]:
+    """Caches a callback's outputs by its arguments, the input that triggered it, and the
+    generation of the data it reads
+
+    Apply it below @dash.callback. The outputs must be picklable when the cache is shared
+    through Redis.
+
+    Args:
+        generation_key (str): The data set the callback reads, e.g. DISH_GENERATION_KEY
+        ignore (Sequence[str]): Parameters left out of the key. n_clicks counters only
+            matter through the triggered input, and would make every click a miss
+
+    Returns:
+        Callable[[Callable], Callable]: The decorator
+    """
+
+    def decorator(func: Callable) -> Callable:
+        name = f"{func.__module__}.{func.__qualname__}"
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def memoized(*args: Any) -> Any:
+            bound = signature.bind(*args).arguments
+            keyed = {name: value for name, value in bound.items() if name not in ignore}
+            arguments = json.dumps([_triggered_id(), keyed], sort_keys=True, default=str)
+            digest = hashlib.sha256(arguments.encode()).hexdigest()
+            key = f"callback:{name}:{get_generation(generation_key)}:{digest}"
+
+            cache = get_callback_cache()
+            outputs = cache.get(key)
+            if outputs is None:
+                outputs = func(*args)
+                cache.set(key, outputs)
+            return outputs
+
+        return memoized
+
+    return decorator
+
+
+def _triggered_id() -> Any:
+    try:
+        return ctx.triggered_id
+    except MissingCallbackContextException:  # Called directly, outside of a callback
+        return None
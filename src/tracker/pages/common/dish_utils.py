@@ -1,10 +1,31 @@
 import re
-from typing import Optional
+from typing import NamedTuple, Optional, Sequence
 
-from dash import dcc, html
+from dash import Patch, dcc, html
 
+from database.notes.render import render_notes, rendered_note_columns
 from database.schema.models import Dish
-from database.utils.connection import RecipeDBAccess
+from database.schema.read_models import DishChange
+from database.similarity.neighbors import similar_dishes, update_similarity
+from database.utils.cache import Cache
+from database.utils.connection import DishChangeKey, DishPageKey
+from database.utils.replicas import use_primary
+from tracker.pages.common.callback_cache import DISH_GENERATION_KEY, new_generation
+from tracker.read_your_writes import mark_write
+from tracker.settings import Settings, get_db, get_settings, on_reload
+
+_dish_cache: Cache | None = None
+
+# How often the dish list asks for changes, see tracker.pages.list.dish
+DISH_LIST_POLL_MS = 5000
+
+# Relationships shown on the dish detail page, loaded with the dish in a fixed number of queries
+DISH_DETAIL_INCLUDE = ["recipes.recipe", "reviews.people.person"]
+
+
+class CachedDish(NamedTuple):
+    dish: Dish
+    notes_markdown: str
 
 
 def make_html_dish_header(dish: Dish) -> html.H1:
@@ -19,6 +40,31 @@ def make_html_dish_header(dish: Dish) -> html.H1:
     )
 
 
+def make_html_dish_recipes(dish: Dish) -> html.Div:
+    if not dish.recipes:
+        return html.Div()
+    urls = [dish_recipe.recipe.url for dish_recipe in dish.recipes]
+    return html.Div([html.H3("Recipes"), html.Ul([html.Li(html.A(url, href=url)) for url in urls])])
+
+
+def make_html_dish_reviewers(dish: Dish) -> html.Div:
+    names = sorted({pr.person.name for review in dish.reviews for pr in review.people})
+    if not names:
+        return html.Div()
+    return html.Div([html.H3("Reviewed by"), html.Ul([html.Li(name) for name in names])])
+
+
+def make_html_similar_dishes(similar: Sequence) -> html.Div:
+    if not similar:
+        return html.Div()
+    links = [html.Li(dcc.Link(row.name, href=f"/dish/{row.id}")) for row in similar]
+    return html.Div([html.H3("Similar dishes"), html.Ul(links)], id="similar-dishes")
+
+
+def make_html_dish_not_found(dish_id) -> html.H1:
+    return html.H1(f"Dish#{dish_id} not found")
+
+
 def make_html_dish_form(dish: Optional[Dish] = None) -> html.Div:
     return html.Div(
         [
@@ -56,9 +102,60 @@ def make_html_dish_form(dish: Optional[Dish] = None) -> html.Div:
     )
 
 
-def get_dish_by_id(dish_id):
-    db_access = RecipeDBAccess.from_env()
-    return db_access.get_one_by_id(obj_type=Dish, obj_id=dish_id)
+def get_dish_by_id(dish_id, include: Sequence[str] = ()):
+    db_access = get_db()
+    return db_access.get_one_by_id(obj_type=Dish, obj_id=dish_id, include=include)
+
+
+def get_similar_dishes(dish_id):
+    # One lookup of the precomputed neighbors, see database.similarity.neighbors
+    db_access = get_db()
+    return similar_dishes(db_access, dish_id=int(dish_id))
+
+
+def get_dish_cache() -> Cache:
+    global _dish_cache
+    if _dish_cache is None:
+        _dish_cache = get_settings().dish_cache.create_cache()
+    return _dish_cache
+
+
+@on_reload
+def _drop_dish_cache(settings: Settings) -> None:
+    global _dish_cache
+    _dish_cache = None
+
+
+def render_dish_notes(notes: Optional[str]) -> str:
+    # Turn bare URLs into Markdown links
+    return render_notes(notes).markdown
+
+
+def get_cached_dish(dish_id) -> CachedDish | None:
+    """Read-through cache of a dish and its rendered notes, for the read-only views"""
+    key = f"dish:{int(dish_id)}"
+    cached = get_dish_cache().get(key)
+    if cached is None:
+        # Every user is served from the cache, so it is filled from the primary, a lagging
+        # replica would keep an old version of the dish cached until its next change
+        with use_primary():
+            dish = get_dish_by_id(dish_id, include=DISH_DETAIL_INCLUDE)
+        if dish is None:
+            return None
+        # Dishes are rendered on write, only those written before that and not backfilled yet
+        # are rendered here
+        notes_markdown = dish.notes_rendered
+        if notes_markdown is None:
+            notes_markdown = render_dish_notes(dish.notes)
+        cached = CachedDish(dish=dish, notes_markdown=notes_markdown)
+        get_dish_cache().set(key, cached)
+    return cached
+
+
+def invalidate_dish(dish_id) -> None:
+    get_dish_cache().delete(f"dish:{int(dish_id)}")
+    # Listings and search results may include the dish too
+    new_generation(DISH_GENERATION_KEY)
 
 
 def get_dish_id_from_pathname(pathname) -> str | None:
@@ -68,24 +165,117 @@ def get_dish_id_from_pathname(pathname) -> str | None:
     return res.group(1)
 
 
-def handle_no_dish_id() -> html.Div:
+def make_html_dish_list() -> html.Div:
     return html.Div(
         [
             html.H1("List of Dishes"),
             html.Button("Refresh", id="refresh-button"),
             html.Div(id="dish-list"),
+            html.Button("Previous", id="dish-list-prev", disabled=True),
+            html.Button("Next", id="dish-list-next", disabled=True),
+            dcc.Store(id="dish-list-page"),
+            dcc.Interval(id="dish-list-poll", interval=DISH_LIST_POLL_MS),
         ]
     )
 
 
-def get_dish_list():
-    db_access = RecipeDBAccess.from_env()
-    dishes = db_access.get_all(Dish)
-    return dishes
+def make_html_dish_list_item(dish) -> html.Li:
+    return html.Li(html.A(dish.name, href=f"/dish/{dish.id}"))
+
+
+def display_dish_list(dishes) -> html.Ul:
+    return html.Ul([make_html_dish_list_item(dish) for dish in dishes])
+
+
+def patch_dish_list(
+    ids: Sequence[int],
+    changes: Sequence[DishChange],
+    append_after: Optional[DishPageKey],
+    room: int,
+) -> tuple[Patch, list[DishChange], bool]:
+    """Builds a Patch of a list rendered by display_dish_list from the dishes that changed
+
+    Listed dishes are replaced in place. Dishes created after the last listed one are
+    appended while there is room, since the list is ordered by (created_at, id).
+
+    Args:
+        ids (Sequence[int]): The ids of the listed dishes, in list order
+        changes (Sequence[DishChange]): The changed dishes, see RecipeDBAccess.get_dish_changes
+        append_after (Optional[DishPageKey]): The (created_at, id) key of the last listed
+            dish, None if the list is empty
+        room (int): The number of dishes that may be appended
+
+    Returns:
+        tuple[Patch, list[DishChange], bool]: The patch, the appended dishes, and whether a new dish was
+            left out for lack of room
+    """
+    items = Patch()
+    positions = {dish_id: position for position, dish_id in enumerate(ids)}
+    appended: list[DishChange] = []
+    overflow = False
+    for dish in changes:
+        if dish.id in positions:
+            items["props"]["children"][positions[dish.id]] = make_html_dish_list_item(dish)
+        elif append_after is None or (dish.created_at, dish.id) > append_after:
+            if len(appended) < room:
+                items["props"]["children"].append(make_html_dish_list_item(dish))
+                appended.append(dish)
+                append_after = (dish.created_at, dish.id)
+            else:
+                overflow = True
+    return items, appended, overflow
+
+
+def handle_no_dish_id() -> html.Div:
+    return make_html_dish_list()
+
+
+def get_dish_page(
+    limit: int,
+    after: Optional[DishPageKey] = None,
+    before: Optional[DishPageKey] = None,
+):
+    db_access = get_db()
+    return db_access.get_dish_page(limit=limit, after=after, before=before)
+
+
+def get_dish_changes(after: Optional[DishChangeKey] = None, limit: int = 100):
+    db_access = get_db()
+    return db_access.get_dish_changes(after=after, limit=limit)
+
+
+def get_dish_change_cursor():
+    db_access = get_db()
+    return db_access.get_dish_change_cursor()
+
+
+def search_dishes(query: str, limit: int, offset: int = 0):
+    db_access = get_db()
+    return db_access.search_dishes(query=query, limit=limit, offset=offset)
+
+
+def update_dish(dish_id, version: int, name: str, notes: Optional[str]) -> Dish:
+    """Saves an edit of a dish, unless the dish was changed since it was read
+
+    Raises:
+        VersionConflictError: If the dish is no longer at the given version
+    """
+    db_access = get_db()
+    values = {"name": name, "notes": notes, **rendered_note_columns(notes)}
+    dish = db_access.update_versioned(Dish, int(dish_id), version, values)
+    invalidate_dish(dish.id)
+    update_similarity(db_access, dish.id)
+    mark_write()
+    return dish
 
 
 def upsert_dish(dish: Dish) -> Dish:
     # Function to update the dish in the database
-    db_access = RecipeDBAccess.from_env()
+    for column, value in rendered_note_columns(dish.notes).items():
+        setattr(dish, column, value)
+    db_access = get_db()
     new_dish = db_access.upsert(obj=dish)
+    invalidate_dish(new_dish.id)
+    update_similarity(db_access, new_dish.id)
+    mark_write()
     return new_dish
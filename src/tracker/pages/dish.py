@@ -1,49 +1,46 @@
-import re
-from typing import Optional
+from typing import Optional, Sequence
 
 import dash
 from dash import dcc, html
-from dash.dependencies import Input, Output, State
 
 from database.schema.models import Dish
 from tracker.pages.common.dish_utils import (
-    get_dish_by_id,
-    get_dish_id_from_pathname,
+    get_cached_dish,
+    get_similar_dishes,
     handle_no_dish_id,
     make_html_dish_header,
+    make_html_dish_not_found,
+    make_html_dish_recipes,
+    make_html_dish_reviewers,
+    make_html_similar_dishes,
 )
 
 dash.register_page(__name__, path="/dish/", path_template="/dish/<dish_id>/")
 
 
-def display_dish_info(dish: Dish) -> html.Div:
-    notes_with_links = re.sub(r"(https?://\S+)", r"[\1](\1)", dish.notes)
+def display_dish_info(dish: Dish, notes_markdown: str, similar: Sequence = ()) -> html.Div:
     return html.Div(
         [
             make_html_dish_header(dish=dish),
-            html.Button("Edit", id="edit-button", n_clicks=0),
-            dcc.Markdown(notes_with_links),
-            dcc.Location(id="url-get-dish", refresh=True),
-            html.Div(id="redirect-div-edit-dish"),
+            # A link navigates in the browser, without a callback to the server
+            dcc.Link(html.Button("Edit"), href=f"/edit/dish/{dish.id}", id="edit-link"),
+            dcc.Markdown(notes_markdown),
+            make_html_dish_recipes(dish=dish),
+            make_html_dish_reviewers(dish=dish),
+            make_html_similar_dishes(similar),
         ]
     )
 
 
-@dash.callback(
-    Output("redirect-div-edit-dish", "children"),
-    Input("edit-button", "n_clicks"),
-    State("url-get-dish", "pathname"),
-)
-def redirect_to_edit_page(n_clicks, pathname):
-    if n_clicks > 0:
-        dish_id = get_dish_id_from_pathname(pathname)
-        return dcc.Location(href=f"/edit/dish/{dish_id}", id="redirect-edit-dish")
-    return ""
-
-
 def layout(dish_id: Optional[int] = None):
     if dish_id is None:
         return handle_no_dish_id()
 
-    dish = get_dish_by_id(dish_id=dish_id)
-    return display_dish_info(dish=dish)
+    cached = get_cached_dish(dish_id=dish_id)
+    if cached is None:
+        return make_html_dish_not_found(dish_id)
+    return display_dish_info(
+        dish=cached.dish,
+        notes_markdown=cached.notes_markdown,
+        similar=get_similar_dishes(dish_id),
+    )
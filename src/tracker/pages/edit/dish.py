@@ -1,17 +1,20 @@
 from typing import Optional
 
 import dash
-from dash import dcc, html
+from dash import dcc, html, no_update
 from dash.dependencies import Input, Output, State
 
 from database.schema.models import Dish
+from database.utils.connection import VersionConflictError
+from database.utils.replicas import use_primary
 from tracker.pages.common.dish_utils import (
     get_dish_by_id,
     get_dish_id_from_pathname,
     handle_no_dish_id,
     make_html_dish_form,
     make_html_dish_header,
-    upsert_dish,
+    make_html_dish_not_found,
+    update_dish,
 )
 
 # Register the edit page
@@ -24,42 +27,53 @@ def display_edit_dish_info(dish: Dish) -> html.Div:
             make_html_dish_header(dish=dish),
             make_html_dish_form(dish=dish),
             html.Button("Save Changes", id="submit-button", n_clicks=0),
-            dcc.Location(id="url-edit-dish", refresh=True),
-            html.Div(id="redirect-div-get-dish"),
+            # Navigates back to the dish without reloading the app, see save_changes
+            dcc.Location(id="url-edit-dish", refresh="callback-nav"),
+            # The version the form was filled from, saving fails if the dish has moved on
+            dcc.Store(id="dish-version", data=dish.version),
+            html.Div(id="save-dish-error"),
         ]
     )
 
 
 @dash.callback(
-    Output("redirect-div-get-dish", "children"),
+    [Output("url-edit-dish", "href"), Output("save-dish-error", "children")],
     Input("submit-button", "n_clicks"),
     [
         State("dish-name", "value"),
         State("dish-notes", "value"),
         State("url-edit-dish", "pathname"),
+        State("dish-version", "data"),
     ],
+    prevent_initial_call=True,
 )
-def save_changes(n_clicks, name, notes, pathname):
-    if n_clicks > 0:
-        dish_id = get_dish_id_from_pathname(pathname)
-        dish = get_dish_by_id(dish_id)
-        dish.name = name
-        dish.notes = notes
-
-        try:
-            upsert_dish(dish)
-            # Redirect back to the dish detail page
-            return dcc.Location(href=f"/dish/{dish_id}", id="redirect-get-dish")
-        except Exception as e:
-            print(e)
-            return html.Div("Error updating dish")
+def save_changes(n_clicks, name, notes, pathname, version):
+    dish_id = get_dish_id_from_pathname(pathname)
 
-    return ""
+    try:
+        update_dish(dish_id, version, name=name, notes=notes)
+        # Back to the dish detail page
+        return f"/dish/{dish_id}", no_update
+    except VersionConflictError as e:
+        if e.current is None:
+            return no_update, html.Div("This dish has been deleted")
+        return no_update, html.Div(
+            "This dish was changed by someone else since you opened it. Reload the page"
+            " to see their changes, your edits have not been saved."
+        )
+    except Exception as e:
+        print(e)
+        return no_update, html.Div("Error updating dish")
 
 
 def layout(dish_id: Optional[int] = None):
     if dish_id is None:
         return handle_no_dish_id()
 
-    dish = get_dish_by_id(dish_id)
+    # The form is saved against the version it was filled from, so it is read from the
+    # primary rather than the cache or a replica, which may hold an older version
+    with use_primary():
+        dish = get_dish_by_id(dish_id)
+    if dish is None:
+        return make_html_dish_not_found(dish_id)
     return display_edit_dish_info(dish)
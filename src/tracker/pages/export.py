@@ -0,0 +1,71 @@
+import shutil
+from datetime import date
+from pathlib import Path
+from secrets import token_hex
+from tempfile import TemporaryDirectory
+
+import dash
+from dash import dcc, html
+from dash.dependencies import Input, Output, State
+
+from database.transfer.formats import FORMATS
+from database.transfer.transfer import export_database
+from tracker.background import export_directory, prune_exports
+from tracker.settings import get_db, get_settings
+
+dash.register_page(__name__, path="/export")
+
+
+@dash.callback(
+    Output("export-status", "children"),
+    Input("export-button", "n_clicks"),
+    State("export-format", "value"),
+    background=True,
+    running=[
+        (Output("export-button", "disabled"), True, False),
+        (Output("export-progress", "style"), {"visibility": "visible"}, {"visibility": "hidden"}),
+    ],
+    progress=[Output("export-progress", "value"), Output("export-progress", "max")],
+    prevent_initial_call=True,
+)
+def export_dishes(set_progress, n_clicks, fmt):
+    # Runs in a background process. The archive is left on disk and streamed by the app's
+    # /export/<name> route, instead of being sent through the callback in memory.
+    settings = get_settings()
+    exports = export_directory(settings.background_cache_dir)
+    exports.mkdir(parents=True, exist_ok=True)
+    prune_exports(exports, max_age=settings.background_result_ttl)
+    with TemporaryDirectory() as directory:
+        try:
+            counts = export_database(
+                get_db(),
+                Path(directory) / "export",
+                fmt=fmt,
+                progress=lambda done, total: set_progress((done, total)),
+            )
+        except ImportError as e:
+            return str(e)
+        # The random suffix keeps other users from guessing the archive's link
+        name = f"recipe-export-{date.today()}-{token_hex(8)}"
+        archive = Path(shutil.make_archive(str(exports / name), "zip", Path(directory) / "export"))
+    return [
+        f"Exported {sum(counts.values())} rows from {len(counts)} tables. ",
+        html.A("Download", href=f"/export/{archive.name}"),
+    ]
+
+
+def layout():
+    return html.Div(
+        [
+            html.H1("Export"),
+            dcc.Dropdown(
+                id="export-format",
+                options=list(FORMATS),
+                value="ndjson",
+                clearable=False,
+            ),
+            html.Button("Export", id="export-button", n_clicks=0),
+            html.Progress(id="export-progress", value="0", style={"visibility": "hidden"}),
+            html.Div(id="export-status"),
+        ]
+    )
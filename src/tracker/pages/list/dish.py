@@ -1,30 +1,126 @@
+from datetime import datetime
+
 import dash
-from dash import html
-from dash.dependencies import Input, Output
+from dash import ctx
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 
-from tracker.pages.common.dish_utils import get_dish_list
+from database.utils.connection import DishChangeKey, DishPageKey
+from tracker.pages.common.callback_cache import DISH_GENERATION_KEY, memoize_callback
+from tracker.pages.common.dish_utils import (
+    display_dish_list,
+    get_dish_change_cursor,
+    get_dish_changes,
+    get_dish_page,
+    make_html_dish_list,
+    patch_dish_list,
+)
 
 dash.register_page(__name__, path="/list/dish")
 
+DISH_PAGE_SIZE = 50
+# The most changes applied per poll, any others are applied by the next polls
+DISH_CHANGE_LIMIT = 100
+
+
+def encode_page_key(dish) -> list:
+    return [dish.created_at.isoformat(), dish.id]
+
+
+def decode_page_key(key: list) -> DishPageKey:
+    created_at, dish_id = key
+    return datetime.fromisoformat(created_at), dish_id
+
+
+def encode_change_key(key: DishChangeKey | None) -> list | None:
+    return None if key is None else [key[0].isoformat(), key[1]]
+
 
-def display_dish_list(dishes):
-    return html.Ul([html.Li(html.A(dish.name, href=f"/dish/{dish.id}")) for dish in dishes])
+def decode_change_key(key: list | None) -> DishChangeKey | None:
+    return None if key is None else (datetime.fromisoformat(key[0]), key[1])
 
 
 @dash.callback(
-    Output("dish-list", "children"),
-    [Input("refresh-button", "n_clicks")],
+    [
+        Output("dish-list", "children"),
+        Output("dish-list-page", "data"),
+        Output("dish-list-prev", "disabled"),
+        Output("dish-list-next", "disabled"),
+    ],
+    [
+        Input("refresh-button", "n_clicks"),
+        Input("dish-list-prev", "n_clicks"),
+        Input("dish-list-next", "n_clicks"),
+    ],
+    [State("dish-list-page", "data")],
 )
-def update_dish_list(n_clicks):
-    dishes = get_dish_list()
-    return display_dish_list(dishes)
+@memoize_callback(DISH_GENERATION_KEY, ignore=["refresh_clicks", "prev_clicks", "next_clicks"])
+def update_dish_list(refresh_clicks, prev_clicks, next_clicks, page):
+    after = before = None
+    if page is not None and page["last"] is not None and ctx.triggered_id == "dish-list-next":
+        after = decode_page_key(page["last"])
+    elif page is not None and page["first"] is not None and ctx.triggered_id == "dish-list-prev":
+        before = decode_page_key(page["first"])
+
+    # Read the cursor first, so a change made while the page is read is polled again
+    cursor = get_dish_change_cursor()
+    # Fetch one extra row to find out whether there is another page in that direction
+    dishes = get_dish_page(limit=DISH_PAGE_SIZE + 1, after=after, before=before)
+    has_more = len(dishes) > DISH_PAGE_SIZE
+    if before is not None:
+        dishes = dishes[-DISH_PAGE_SIZE:]
+        has_prev, has_next = has_more, True
+    else:
+        dishes = dishes[:DISH_PAGE_SIZE]
+        has_prev, has_next = after is not None, has_more
+
+    page = {
+        "first": encode_page_key(dishes[0]) if dishes else None,
+        "last": encode_page_key(dishes[-1]) if dishes else None,
+        "ids": [dish.id for dish in dishes],
+        "cursor": encode_change_key(cursor),
+        "has_next": has_next,
+    }
+    return display_dish_list(dishes), page, not has_prev, not has_next
+
+
+@dash.callback(
+    [
+        Output("dish-list", "children", allow_duplicate=True),
+        Output("dish-list-page", "data", allow_duplicate=True),
+        Output("dish-list-next", "disabled", allow_duplicate=True),
+    ],
+    Input("dish-list-poll", "n_intervals"),
+    State("dish-list-page", "data"),
+    prevent_initial_call=True,
+)
+def poll_dish_list(n_intervals, page):
+    """Applies the dish changes made since the page was read, instead of reading it again
+
+    Only the changed list items are sent, as a Patch of the rendered list, and a poll
+    without changes sends nothing.
+    """
+    if page is None:
+        raise PreventUpdate
+    changes = get_dish_changes(after=decode_change_key(page["cursor"]), limit=DISH_CHANGE_LIMIT)
+    if not changes:
+        raise PreventUpdate
+
+    has_next = page["has_next"]
+    last = None if page["last"] is None else decode_page_key(page["last"])
+    # New dishes sort after every listed dish, so only the last page has room for them
+    room = 0 if has_next else DISH_PAGE_SIZE - len(page["ids"])
+    items, appended, overflow = patch_dish_list(page["ids"], changes, last, room)
+
+    page = {
+        "first": page["first"] or (encode_page_key(appended[0]) if appended else None),
+        "last": encode_page_key(appended[-1]) if appended else page["last"],
+        "ids": page["ids"] + [dish.id for dish in appended],
+        "cursor": encode_change_key((changes[-1].updated_at, changes[-1].id)),
+        "has_next": has_next or overflow,
+    }
+    return items, page, not page["has_next"]
 
 
 def layout():
-    return html.Div(
-        [
-            html.H1("List of Dishes"),
-            html.Button("Refresh", id="refresh-button"),
-            html.Div(id="dish-list"),
-        ]
-    )
+    return make_html_dish_list()
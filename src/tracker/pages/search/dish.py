@@ -0,0 +1,67 @@
+from typing import Optional
+
+import dash
+from dash import ctx, dcc, html
+from dash.dependencies import Input, Output, State
+
+from tracker.pages.common.callback_cache import DISH_GENERATION_KEY, memoize_callback
+from tracker.pages.common.dish_utils import display_dish_list, search_dishes
+
+dash.register_page(__name__, path="/search/dish")
+
+SEARCH_PAGE_SIZE = 20
+
+
+@dash.callback(
+    [
+        Output("search-results", "children"),
+        Output("search-offset", "data"),
+        Output("search-prev", "disabled"),
+        Output("search-next", "disabled"),
+    ],
+    [
+        Input("search-query", "value"),
+        Input("search-button", "n_clicks"),
+        Input("search-prev", "n_clicks"),
+        Input("search-next", "n_clicks"),
+    ],
+    [State("search-offset", "data")],
+)
+@memoize_callback(DISH_GENERATION_KEY, ignore=["search_clicks", "prev_clicks", "next_clicks"])
+def update_search_results(query, search_clicks, prev_clicks, next_clicks, offset):
+    if not query:
+        return html.Div(), 0, True, True
+
+    if ctx.triggered_id == "search-next":
+        offset += SEARCH_PAGE_SIZE
+    elif ctx.triggered_id == "search-prev":
+        offset = max(offset - SEARCH_PAGE_SIZE, 0)
+    else:
+        offset = 0
+
+    # Fetch one extra row to find out whether there is a next page
+    dishes = search_dishes(query=query, limit=SEARCH_PAGE_SIZE + 1, offset=offset)
+    has_next = len(dishes) > SEARCH_PAGE_SIZE
+    if not dishes:
+        return html.Div("No dishes found"), offset, offset == 0, True
+    return display_dish_list(dishes[:SEARCH_PAGE_SIZE]), offset, offset == 0, not has_next
+
+
+def layout(q: Optional[str] = None):
+    return html.Div(
+        [
+            html.H1("Search Dishes"),
+            dcc.Input(
+                id="search-query",
+                type="search",
+                placeholder="Search dish names and notes",
+                debounce=True,
+                value=q or "",
+            ),
+            html.Button("Search", id="search-button", n_clicks=0),
+            html.Div(id="search-results"),
+            html.Button("Previous", id="search-prev", disabled=True),
+            html.Button("Next", id="search-next", disabled=True),
+            dcc.Store(id="search-offset", data=0),
+        ]
+    )
@@ -0,0 +1,57 @@
+"""Read-your-writes for the reads the database sends to replicas
+
+Replicas lag behind the primary, so a user who just saved a dish could be shown the dish as
+it was. After a write, the user's reads go to the primary for READ_YOUR_WRITES_SECONDS. The
+deadline is kept in a cookie, because their next request may be served by another worker.
+"""
+
+from math import ceil
+from time import time
+
+import flask
+from dash import Dash
+
+from database.utils.replicas import read_from_primary
+
+COOKIE = "recipe_primary_until"
+
+
+def mark_write() -> None:
+    """Sends the current user's reads to the primary for a while, call it after a write"""
+    if flask.has_request_context():
+        read_from_primary.set(True)
+        flask.g.wrote = True
+
+
+def setup_read_your_writes(app: Dash, seconds: float) -> None:
+    """Keeps the reads of users who wrote recently on the primary
+
+    Args:
+        app (Dash): The Dash app, before it serves its first request
+        seconds (float): How long after a write the user's reads stay on the primary
+    """
+    server = app.server
+
+    @server.before_request
+    def read_own_writes():
+        deadline = flask.request.cookies.get(COOKIE, 0.0, type=float)
+        flask.g.read_from_primary = read_from_primary.set(deadline > time())
+
+    @server.after_request
+    def remember_write(response: flask.Response) -> flask.Response:
+        if flask.g.get("wrote"):
+            response.set_cookie(
+                COOKIE,
+                str(time() + seconds),
+                max_age=ceil(seconds),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    @server.teardown_request
+    def forget_write(exception):
+        # Threads serve one request after another, the next one must not inherit the flag
+        token = flask.g.pop("read_from_primary", None)
+        if token is not None:
+            read_from_primary.reset(token)
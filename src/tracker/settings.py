@@ -0,0 +1,157 @@
+"""Settings of the Dash app, resolved once per process
+
+The settings are read from the environment, and .env, the first time they are needed,
+normally while tracker.app is imported, and are kept until reload_settings() is called.
+Pages and routes get the database from get_db() instead of RecipeDBAccess.from_env(), so a
+request never reads the environment.
+"""
+
+from os import getenv
+from threading import Lock
+from typing import Callable, Type
+
+from dotenv import load_dotenv
+
+from database.utils.cache import CacheOptions
+from database.utils.connection import Credentials, EngineOptions, RecipeDBAccess
+
+ReloadHook = Callable[["Settings"], None]
+
+_settings: "Settings | None" = None
+_settings_lock = Lock()
+_reload_hooks: list[ReloadHook] = []
+
+
+class Settings:
+    def __init__(
+        self,
+        credentials: Credentials,
+        engine_options: EngineOptions | None = None,
+        dish_cache: CacheOptions | None = None,
+        callback_cache: CacheOptions | None = None,
+        background_cache_dir: str = "",
+        background_result_ttl: int = 3600,
+        instrumentation: bool = False,
+        slow_query_ms: float = 100,
+        slow_callback_ms: float = 500,
+        read_your_writes_seconds: float = 10,
+    ):
+        """Initializes the settings
+
+        Args:
+            credentials (Credentials): The credentials for the database
+            engine_options (EngineOptions | None): The engine and pool options, defaults to
+                EngineOptions()
+            dish_cache (CacheOptions | None): The cache of dishes shown on the dish pages
+            callback_cache (CacheOptions | None): The cache of memoized callbacks
+            background_cache_dir (str): The disk cache of background callbacks, see
+                tracker.background
+            background_result_ttl (int): Seconds background callback results are kept
+            instrumentation (bool): Whether statements and callbacks are measured, see
+                tracker.instrumentation
+            slow_query_ms (float): Statements slower than this are logged
+            slow_callback_ms (float): Callbacks slower than this are logged
+            read_your_writes_seconds (float): How long after a write a user's reads stay on
+                the primary, when there are replicas, see tracker.read_your_writes
+        """
+        self.credentials = credentials
+        self.engine_options = engine_options or EngineOptions()
+        self.dish_cache = dish_cache or CacheOptions("DISH")
+        self.callback_cache = callback_cache or CacheOptions("CALLBACK")
+        self.background_cache_dir = background_cache_dir
+        self.background_result_ttl = background_result_ttl
+        self.instrumentation = instrumentation
+        self.slow_query_ms = slow_query_ms
+        self.slow_callback_ms = slow_callback_ms
+        self.read_your_writes_seconds = read_your_writes_seconds
+
+    @classmethod
+    def from_env(cls: Type["Settings"]) -> "Settings":
+        """Returns an instance of the class using environment variables
+
+        Raises:
+            ValueError: If the credentials are missing, or a number is malformed
+
+        Returns:
+            Settings: An instance of the class
+        """
+        load_dotenv()
+
+        return cls(
+            credentials=Credentials.from_env(),
+            engine_options=EngineOptions.from_env(),
+            dish_cache=CacheOptions.from_env("DISH"),
+            callback_cache=CacheOptions.from_env("CALLBACK"),
+            background_cache_dir=getenv("BACKGROUND_CACHE_DIR", ""),
+            background_result_ttl=int(getenv("BACKGROUND_RESULT_TTL", "3600")),
+            instrumentation=getenv("INSTRUMENTATION") == "True",
+            slow_query_ms=float(getenv("SLOW_QUERY_MS", "100")),
+            slow_callback_ms=float(getenv("SLOW_CALLBACK_MS", "500")),
+            read_your_writes_seconds=float(getenv("READ_YOUR_WRITES_SECONDS", "10")),
+        )
+
+
+def get_settings() -> Settings:
+    """Returns the settings of the process, read from the environment on the first call"""
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = Settings.from_env()
+    return _settings
+
+
+def get_db() -> RecipeDBAccess:
+    """Returns the database, connected with the settings of the process"""
+    settings = get_settings()
+    return RecipeDBAccess.get_instance(
+        credentials=settings.credentials, engine_options=settings.engine_options
+    )
+
+
+def on_reload(hook: ReloadHook) -> ReloadHook:
+    """Registers a function to call with the new settings after every reload
+
+    Modules that build something from the settings, e.g. a cache, register a hook that drops
+    it, so it is built again from the new settings.
+
+    Args:
+        hook (ReloadHook): The function
+
+    Returns:
+        ReloadHook: The function, so this can be used as a decorator
+    """
+    _reload_hooks.append(hook)
+    return hook
+
+
+def reload_settings(settings: Settings | None = None) -> Settings:
+    """Replaces the settings of the process, e.g. after the environment or .env changed
+
+    The database connections are closed and opened again if the credentials or the engine
+    options changed, then the reload hooks are called.
+
+    Args:
+        settings (Settings | None): The new settings, defaults to reading the environment
+            again, with .env overriding the variables it loaded before
+
+    Returns:
+        Settings: The new settings
+    """
+    global _settings
+    if settings is None:
+        load_dotenv(override=True)
+        settings = Settings.from_env()
+    with _settings_lock:
+        previous, _settings = _settings, settings
+    if previous is not None and _connection_changed(previous, settings):
+        RecipeDBAccess.reset_instance()
+    for hook in _reload_hooks:
+        hook(settings)
+    return settings
+
+
+def _connection_changed(previous: Settings, settings: Settings) -> bool:
+    if vars(previous.credentials) != vars(settings.credentials):
+        return True
+    return vars(previous.engine_options) != vars(settings.engine_options)
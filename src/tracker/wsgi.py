@@ -0,0 +1,26 @@
+"""Production entry point, for WSGI servers such as gunicorn
+
+gunicorn -c gunicorn.conf.py "tracker.wsgi:create_app()"
+"""
+
+from flask import Flask
+
+from tracker.app import app
+from tracker.settings import get_db
+
+
+def create_app() -> Flask:
+    """Prepares the database and returns the Flask server of the Dash app
+
+    With preload_app this runs once, in the gunicorn master, before the workers are forked.
+    The master's connections are released afterwards, so it holds none while it only
+    supervises the workers, which each open their own.
+
+    Returns:
+        Flask: The WSGI application
+    """
+    db = get_db()
+    db.create_tables()
+    db.migrate()
+    db.dispose()
+    return app.server
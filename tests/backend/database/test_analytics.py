@@ -0,0 +1,99 @@
+from datetime import date, datetime
+from threading import Thread
+
+import pytest
+from sqlalchemy import text
+
+from database.analytics.summaries import (
+    dishes_per_event_type,
+    event_months,
+    most_cooked_dishes,
+    most_reviewed_dishes,
+    refresh_summaries,
+)
+from database.schema.models import Dish, Event, EventDish, PeopleReview, Person, Review
+
+
+def insert_data(test_db) -> None:
+    test_db.insert_many([Dish(name=f"test_dish_{i}") for i in range(1, 4)])
+    test_db.insert_many([Person(name="test_person_1"), Person(name="test_person_2")])
+    # Children take the partition key of their parent when they are linked to it
+    test_db.insert_many(
+        [
+            Event(
+                type="dinner",
+                started_at=datetime(2024, 1, 5),
+                dishes=[EventDish(dish_id=1), EventDish(dish_id=2)],
+            ),
+            Event(type="dinner", started_at=datetime(2024, 1, 20), dishes=[EventDish(dish_id=1)]),
+            Event(type="party", started_at=datetime(2024, 2, 1), dishes=[EventDish(dish_id=3)]),
+            Review(dish_id=1, people=[PeopleReview(people_id=1), PeopleReview(people_id=2)]),
+            Review(dish_id=2, people=[PeopleReview(people_id=1)]),
+        ]
+    )
+
+
+def test_refresh_summaries(test_db):
+    """Verify that a full refresh aggregates events and reviews per dish, month and type"""
+    insert_data(test_db)
+    refresh_summaries(test_db)
+
+    assert event_months(test_db) == [date(2024, 2, 1), date(2024, 1, 1)]
+    january = most_cooked_dishes(test_db, date(2024, 1, 1))
+    assert [(row.name, row.events) for row in january] == [("test_dish_1", 2), ("test_dish_2", 1)]
+    assert [tuple(row) for row in dishes_per_event_type(test_db)] == [
+        ("dinner", 2, 3),
+        ("party", 1, 1),
+    ]
+    reviewed = most_reviewed_dishes(test_db)
+    assert [(row.dish_id, row.reviews, row.reviewers) for row in reviewed] == [(1, 1, 2), (2, 1, 1)]
+
+
+def test_refresh_summaries_incremental(test_db):
+    """Verify that an incremental refresh only recomputes the given dishes"""
+    insert_data(test_db)
+    refresh_summaries(test_db)
+    test_db.insert_many(
+        [
+            Event(
+                type="party",
+                started_at=datetime(2024, 1, 10),
+                dishes=[EventDish(dish_id=2), EventDish(dish_id=3)],
+            )
+        ]
+    )
+
+    refresh_summaries(test_db, dish_ids=[2])
+    january = most_cooked_dishes(test_db, date(2024, 1, 1))
+    assert [(row.dish_id, row.events) for row in january] == [(1, 2), (2, 2)]
+    # The event type totals are always recomputed in full
+    assert [tuple(row) for row in dishes_per_event_type(test_db)] == [
+        ("dinner", 2, 3),
+        ("party", 2, 3),
+    ]
+
+    refresh_summaries(test_db, dish_ids=[])
+    refresh_summaries(test_db, dish_ids=[3])
+    january = most_cooked_dishes(test_db, date(2024, 1, 1))
+    assert [(row.dish_id, row.events) for row in january] == [(1, 2), (2, 2), (3, 1)]
+
+
+@pytest.mark.committed
+def test_refresh_summaries_takes_turns(test_db):
+    """Verify that a refresh waits for the one in progress, instead of inserting the same rows"""
+    insert_data(test_db)
+    key = {"key": f"dish_summaries:{test_db.schema}"}
+    with test_db._engine.connect() as connection:
+        # Held the way a refresh in progress holds it
+        connection.execute(text("SELECT pg_advisory_lock(hashtext(:key))"), key)
+        refresh = Thread(target=refresh_summaries, args=(test_db,), kwargs={"dish_ids": [1]})
+        refresh.start()
+        refresh.join(0.5)
+        assert refresh.is_alive()
+        connection.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), key)
+        refresh.join(10)
+    # The pool grew to hold both connections, leave it as other tests expect it
+    test_db._engine.dispose()
+    assert not refresh.is_alive()
+    january = most_cooked_dishes(test_db, date(2024, 1, 1))
+    assert [(row.dish_id, row.events) for row in january] == [(1, 2)]
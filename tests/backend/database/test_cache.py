@@ -0,0 +1,47 @@
+from unittest.mock import patch
+
+from database.utils.cache import TTLCache, cache_from_env
+
+
+def test_get_and_set():
+    """Verify that a cached value is returned until it is deleted"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    cache.delete("a")
+    assert cache.get("a") is None
+
+
+def test_least_recently_used_is_evicted():
+    """Verify that the least recently used entry is evicted when the cache is full"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_entries_expire():
+    """Verify that an entry is not served after its ttl"""
+    cache = TTLCache(maxsize=2, ttl=10)
+    with patch("database.utils.cache.monotonic", return_value=100.0):
+        cache.set("a", 1)
+    with patch("database.utils.cache.monotonic", return_value=109.0):
+        assert cache.get("a") == 1
+    with patch("database.utils.cache.monotonic", return_value=110.0):
+        assert cache.get("a") is None
+
+
+def test_cache_from_env(monkeypatch):
+    """Verify that the in-process cache is configured from the environment"""
+    monkeypatch.setenv("TEST_CACHE_SIZE", "3")
+    monkeypatch.setenv("TEST_CACHE_TTL", "1.5")
+    cache = cache_from_env("TEST")
+    assert isinstance(cache, TTLCache)
+    assert cache.maxsize == 3
+    assert cache.ttl == 1.5
@@ -1,14 +1,15 @@
+import pytest
 from sqlalchemy import inspect
 
-from database.schema.models import SCHEMA
 from database.utils.connection import RecipeDBAccess
 
 
 def table_exists(test_db: RecipeDBAccess, table_name: str) -> bool:
     """Check if table exists in the database."""
-    return inspect(test_db._engine).has_table(table_name=table_name, schema=SCHEMA)
+    return inspect(test_db._engine).has_table(table_name=table_name, schema=test_db.schema)
 
 
+@pytest.mark.committed
 def test_create_tables(test_db):
     """Verify that all tables are created"""
     test_db.create_tables()
@@ -25,6 +26,7 @@ def test_create_tables(test_db):
         assert table_exists(test_db, table) is True
 
 
+@pytest.mark.committed
 def test_drop_tables(test_db):
     """Verify that all tables are dropped"""
     test_db.drop_tables(force=True)
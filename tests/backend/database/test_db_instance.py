@@ -1,3 +1,10 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+import pytest
+from sqlalchemy import text
+
 from database.utils.connection import Credentials, RecipeDBAccess
 
 
@@ -14,3 +21,40 @@ def test_get_instance(test_db):
     assert test_db == RecipeDBAccess.get_instance(
         credentials=credentials
     ), "Singleton instance not returned"
+
+
+def test_get_instance_threads(test_db, monkeypatch):
+    """Verify that threads racing to create the singleton all get the same instance"""
+    monkeypatch.setattr(RecipeDBAccess, "_instance", None)
+    barrier = Barrier(8)
+
+    def get_instance(_):
+        barrier.wait()
+        return RecipeDBAccess.get_instance(credentials=test_db._credentials)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        instances = set(executor.map(get_instance, range(8)))
+    assert len(instances) == 1
+    instances.pop().dispose()
+
+
+@pytest.mark.committed
+def test_fork_drops_inherited_connections(test_db):
+    """Verify that a forked child opens its own connections and leaves the parent's alone"""
+    with test_db.get_session() as session:
+        backend_pid = session.execute(text("SELECT pg_backend_pid()")).scalar()
+
+    pid = os.fork()
+    if pid == 0:
+        # Child: any failure must end the process, never return into pytest
+        try:
+            with test_db.get_session() as session:
+                child_pid = session.execute(text("SELECT pg_backend_pid()")).scalar()
+            os._exit(0 if child_pid != backend_pid else 1)
+        except BaseException:
+            os._exit(2)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    with test_db.get_session() as session:
+        assert session.execute(text("SELECT pg_backend_pid()")).scalar() == backend_pid
@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy import text
+
+from database.utils.connection import Credentials, EngineOptions, RecipeDBAccess
+
+
+def test_engine_options_from_env(monkeypatch):
+    """Verify that the pool options are read from the environment"""
+    monkeypatch.setenv("POSTGRES_POOL_SIZE", "20")
+    monkeypatch.setenv("POSTGRES_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("POSTGRES_POOL_PRE_PING", "True")
+    monkeypatch.setenv("POSTGRES_STATEMENT_TIMEOUT", "5000")
+    options = EngineOptions.from_env()
+    assert options.pool_size == 20
+    assert options.max_overflow == 0
+    assert options.pool_pre_ping is True
+    assert options.statement_timeout == 5000
+    assert options.pool_timeout == EngineOptions().pool_timeout
+
+
+def test_engine_options_from_env_invalid(monkeypatch):
+    """Verify that a non-integer pool option is rejected"""
+    monkeypatch.setenv("POSTGRES_POOL_SIZE", "five")
+    with pytest.raises(ValueError):
+        EngineOptions.from_env()
+
+
+def test_statement_timeout(test_db):
+    """Verify that the statement timeout is set on new connections"""
+    db = RecipeDBAccess(
+        credentials=test_db._credentials,
+        engine_options=EngineOptions(statement_timeout=1234),
+    )
+    with db.get_session() as session:
+        assert session.execute(text("SHOW statement_timeout")).scalar() == "1234ms"
+    db._engine.dispose()
+
+
+def test_get_pool_status():
+    """Verify that the pool status reports checked out connections and checkout waits"""
+    db = RecipeDBAccess(
+        credentials=Credentials.from_env(),
+        engine_options=EngineOptions(pool_size=2, max_overflow=1),
+    )
+    with db.get_session() as session1, db.get_session() as session2:
+        session1.execute(text("SELECT 1"))
+        session2.execute(text("SELECT 1"))
+        status = db.get_pool_status()
+        assert status["checked_out"] == 2
+        assert status["overflow"] == 0
+
+    status = db.get_pool_status()
+    assert status["checked_out"] == 0
+    assert status["idle"] == 2
+    assert status["checkouts"] == 2
+    assert status["checkout_wait_max"] >= 0
+    db._engine.dispose()
@@ -1,6 +1,10 @@
+import pytest
 from sqlalchemy import text
 from sqlalchemy.orm.session import Session
 
+from database.schema.models import Dish
+from database.schema.read_models import DishSummary
+
 
 def test_get_session(test_db):
     """Verify that a session is returned and can be used"""
@@ -16,3 +20,18 @@ def test_get_session_context_manager(test_db):
         assert isinstance(session, Session)
         # Verify a query can be executed
         session.execute(text("SELECT 1"))
+
+
+@pytest.mark.committed
+def test_bind(test_db):
+    """Verify that sessions commit into the bound connection's transaction"""
+    with test_db._engine.connect() as connection:
+        transaction = connection.begin()
+        with test_db.bind(connection):
+            test_db.insert_one(Dish(name="test_dish"))
+            assert [dish.name for dish in test_db.get_rows(DishSummary)] == ["test_dish"]
+            with pytest.raises(RuntimeError):
+                with test_db.bind(connection):
+                    pass
+        transaction.rollback()
+    assert test_db.get_all(Dish) == []
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from database.ingest.fetch import FetchResult, RequestsFetcher
+from database.ingest.parse import extract_urls, parse_recipe
+from database.ingest.pipeline import fetch_recipes, get_recipe_content, ingest
+from database.schema.models import Dish, DishRecipe, Recipe, RecipeContent
+
+
+def recipe_page(name: str, ingredients: list[str]) -> str:
+    recipe = {
+        "@context": "https://schema.org",
+        "@graph": [
+            {"@type": "WebPage", "name": "Not the recipe"},
+            {
+                "@type": ["Recipe"],
+                "name": name,
+                "recipeIngredient": ingredients,
+                "recipeInstructions": [
+                    {"@type": "HowToSection", "itemListElement": [{"text": "Boil  water"}]},
+                    {"@type": "HowToStep", "text": "Serve"},
+                ],
+            },
+        ],
+    }
+    script = f'<script type="application/ld+json">{json.dumps(recipe)}</script>'
+    return f"<html><head><title>{name} | Site</title>{script}</head><body></body></html>"
+
+
+class RecipeSite(ThreadingHTTPServer):
+    """Serves recipe pages with ETags, and records the requests it answers"""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RecipeHandler)
+        self.pages: dict[str, str] = {}
+        self.requests: list[tuple[str, int]] = []
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class RecipeHandler(BaseHTTPRequestHandler):
+    server: RecipeSite
+
+    def do_GET(self):
+        page = self.server.pages.get(self.path)
+        etag = f'"{hash(page)}"'
+        if page is None:
+            status = 404
+        elif self.headers.get("If-None-Match") == etag:
+            status = 304
+        else:
+            status = 200
+        self.server.requests.append((self.path, status))
+        self.send_response(status)
+        if status != 404:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        if status == 200:
+            self.wfile.write(page.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def recipe_site():
+    site = RecipeSite()
+    thread = threading.Thread(target=site.serve_forever, daemon=True)
+    thread.start()
+    yield site
+    site.shutdown()
+    site.server_close()
+
+
+def test_extract_urls():
+    """Verify that URLs are found once each, without the punctuation around them"""
+    notes = "see https://a.com/x. Also (https://b.com/y?q=1), and https://a.com/x again"
+    assert extract_urls(notes) == ["https://a.com/x", "https://b.com/y?q=1"]
+    assert extract_urls(None) == []
+
+
+def test_extract_urls_parentheses():
+    """Verify that a closing parenthesis is kept when the URL opened it"""
+    notes = "pho (https://en.wikipedia.org/wiki/Pho_(soup)). https://a.com/b_(c)_d?e=(f)"
+    assert extract_urls(notes) == [
+        "https://en.wikipedia.org/wiki/Pho_(soup)",
+        "https://a.com/b_(c)_d?e=(f)",
+    ]
+    assert extract_urls("(see https://a.com/x)") == ["https://a.com/x"]
+
+
+def test_parse_recipe():
+    """Verify that the schema.org Recipe is found in a JSON-LD graph, with nested steps"""
+    parsed = parse_recipe(recipe_page("Soup", ["1 onion", "2  carrots"]))
+    assert parsed.title == "Soup"
+    assert parsed.ingredients == ["1 onion", "2 carrots"]
+    assert parsed.steps == ["Boil water", "Serve"]
+    assert parse_recipe("<title> Just a page </title>").title == "Just a page"
+
+
+def test_ingest(test_db, recipe_site):
+    """Verify that notes are linked to recipes, and re-crawls only download changed pages"""
+    recipe_site.pages = {"/soup": recipe_page("Soup", ["water"]), "/stew": recipe_page("Stew", [])}
+    soup, stew, missing = (recipe_site.url(path) for path in ["/soup", "/stew", "/missing"])
+    test_db.insert_many(
+        [
+            Dish(name="test_dish_1", notes=f"{soup} and {stew}"),
+            Dish(name="test_dish_2", notes=f"also {soup}, or {missing}"),
+        ]
+    )
+
+    outcomes = ingest(test_db, dish_ids=[1, 2], concurrency=2)
+    assert outcomes == {"changed": 2, "failed": 1}
+    recipe_ids = {recipe.url: recipe.id for recipe in test_db.get_all(Recipe)}
+    assert {(link.dish_id, link.recipe_id) for link in test_db.get_all(DishRecipe)} == {
+        (1, recipe_ids[soup]),
+        (1, recipe_ids[stew]),
+        (2, recipe_ids[soup]),
+        (2, recipe_ids[missing]),
+    }
+    assert get_recipe_content(test_db, recipe_ids[soup])["ingredients"] == ["water"]
+    assert get_recipe_content(test_db, recipe_ids[missing]) is None
+
+    # Unchanged pages are revalidated, and a changed page is stored next to the old content
+    recipe_site.requests.clear()
+    recipe_site.pages["/stew"] = recipe_page("Stew", ["beef"])
+    assert ingest(test_db) == {"not_modified": 1, "changed": 1, "failed": 1}
+    assert sorted(recipe_site.requests) == [("/missing", 404), ("/soup", 304), ("/stew", 200)]
+    assert get_recipe_content(test_db, recipe_ids[stew])["ingredients"] == ["beef"]
+    assert len(test_db.get_all(RecipeContent)) == 3
+
+
+def test_fetch_recipes_concurrency(test_db):
+    """Verify that no more fetches than the concurrency limit are in flight at a time"""
+    test_db.insert_many([Recipe(url=f"https://example.com/{i}") for i in range(10)])
+    in_flight = []
+
+    class SlowFetcher:
+        async def fetch(self, url, etag, last_modified):
+            in_flight.append(url)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(url)
+            return FetchResult(status=200, body=b"<title>same</title>", etag='"1"')
+
+    peak: list[int] = []
+    outcomes = asyncio.run(fetch_recipes(test_db, SlowFetcher(), concurrency=3, batch_size=4))
+    assert outcomes == {"changed": 10}
+    assert max(peak) == 3
+    # Every page parses to the same content, which is stored once
+    assert len(test_db.get_all(RecipeContent)) == 1
+
+
+def test_requests_fetcher(recipe_site):
+    """Verify that the default fetcher sends the validators of the previous fetch"""
+    recipe_site.pages = {"/soup": recipe_page("Soup", [])}
+    fetcher = RequestsFetcher()
+    first = asyncio.run(fetcher.fetch(recipe_site.url("/soup"), None, None))
+    assert first.status == 200 and b"Soup" in first.body
+    second = asyncio.run(fetcher.fetch(recipe_site.url("/soup"), first.etag, None))
+    assert second == FetchResult(status=304, etag=first.etag)
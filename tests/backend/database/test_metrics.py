@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from database.schema.models import Dish
+from database.utils.metrics import (
+    Histogram,
+    MetricsRegistry,
+    QueryInstrumentation,
+    RequestStats,
+    current_request,
+)
+
+
+def test_histogram_buckets():
+    """Verify that bucket counts are cumulative and bounds are inclusive"""
+    histogram = Histogram(buckets=(1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == [(1, 2), (5, 3), (float("inf"), 4)]
+    assert snapshot["count"] == 4
+    assert snapshot["sum"] == 14.5
+
+
+def test_render_prometheus():
+    """Verify the text exposition of a counter and a histogram"""
+    registry = MetricsRegistry()
+    registry.counter("test_total", "A counter")
+    registry.increment("test_total", 2, kind='say "hi"')
+    registry.observe("test_seconds", 0.2, buckets=(0.1, 1))
+    assert registry.render_prometheus().splitlines() == [
+        "# HELP test_seconds ",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{le="0.1"} 0',
+        'test_seconds_bucket{le="1"} 1',
+        'test_seconds_bucket{le="+Inf"} 1',
+        "test_seconds_sum 0.2",
+        "test_seconds_count 1",
+        "# HELP test_total A counter",
+        "# TYPE test_total counter",
+        'test_total{kind="say \\"hi\\""} 2',
+    ]
+
+
+@pytest.mark.committed
+def test_query_instrumentation(test_db):
+    """Verify that statements are recorded, counted against the request and logged as slow"""
+    registry = MetricsRegistry()
+    instrumentation = QueryInstrumentation(registry, slow_threshold=0)
+    test_db.instrument(instrumentation)
+    token = current_request.set(RequestStats())
+    try:
+        test_db.insert_many([Dish(name="test_dish"), Dish(name="test_dish_2")])
+        test_db.get_all(Dish)
+        stats = current_request.get()
+    finally:
+        current_request.reset(token)
+        instrumentation.detach(test_db._engine)
+
+    assert registry.get_counter("recipe_db_statements_total", kind="SELECT") == 1
+    assert registry.get_counter("recipe_db_rows_total", kind="SELECT") == 2
+    assert (
+        registry.get_histogram("recipe_db_statement_duration_seconds", kind="SELECT")["count"] == 1
+    )
+    assert (
+        stats.statements
+        == registry.get_histogram("recipe_db_statement_duration_seconds", kind="INSERT")["count"]
+        + 1
+    )
+    assert stats.rows >= 4
+    assert instrumentation.slow_log()[-1]["statement"].startswith("SELECT")
+
+
+@pytest.mark.committed
+def test_query_instrumentation_failed_statement(test_db):
+    """Verify that a failed statement leaves no start time on its pooled connection"""
+    registry = MetricsRegistry()
+    instrumentation = QueryInstrumentation(registry)
+    test_db.instrument(instrumentation)
+    try:
+        with test_db._engine.connect() as connection:
+            with pytest.raises(DBAPIError):
+                connection.execute(text("SELECT 1 / 0"))
+            connection.rollback()
+            assert connection.info["query_start_time"] == []
+            connection.execute(text("SELECT 1"))
+            assert connection.info["query_start_time"] == []
+    finally:
+        instrumentation.detach(test_db._engine)
+    assert registry.get_counter("recipe_db_statements_total", kind="SELECT") == 1
@@ -0,0 +1,135 @@
+import pytest
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, Table, inspect, text
+from sqlalchemy.exc import ProgrammingError
+
+from database.migrations.checks import find_unindexed_foreign_keys
+from database.migrations.migration import Migration
+from database.migrations.runner import MigrationRunner, load_migrations
+from database.schema.models import Dish, Event
+
+
+def index_names(test_db, table_name: str) -> set[str]:
+    return {
+        index["name"] for index in inspect(test_db._engine).get_indexes(table_name, test_db.schema)
+    }
+
+
+def test_load_migrations():
+    """Verify that migrations are loaded in version order"""
+    versions = [migration.version for migration in load_migrations()]
+    assert versions == sorted(versions)
+    assert versions[:2] == [1, 2]
+
+
+def test_create_tables_records_migrations(test_db):
+    """Verify that a database created from scratch has no pending migrations"""
+    assert MigrationRunner(test_db._engine).pending() == []
+
+
+@pytest.mark.committed
+def test_upgrade_existing_database(test_db):
+    """Verify that a database created before the migrations is brought up to date"""
+    schema = test_db.schema
+    with test_db._engine.begin() as connection:
+        connection.execute(text(f"ALTER TABLE {schema}.dishes DROP COLUMN search_vector"))
+        connection.execute(text(f"DROP INDEX {schema}.ix_dishes_created_at_id"))
+        connection.execute(text(f"DROP TABLE {schema}.schema_migrations"))
+        # Events and reviews as they were before they were partitioned
+        connection.execute(
+            text(
+                f"DROP TABLE {schema}.people_reviews, {schema}.event_dishes, {schema}.reviews,"
+                f" {schema}.events;"
+                f"CREATE TABLE {schema}.reviews (id SERIAL PRIMARY KEY,"
+                f" dish_id INTEGER REFERENCES {schema}.dishes (id));"
+                f"CREATE TABLE {schema}.people_reviews (people_id INTEGER REFERENCES"
+                f" {schema}.people (id), review_id INTEGER REFERENCES {schema}.reviews (id),"
+                " PRIMARY KEY (people_id, review_id));"
+                f"CREATE TABLE {schema}.events (id SERIAL PRIMARY KEY, type VARCHAR(100),"
+                " started_at TIMESTAMP);"
+                f"CREATE TABLE {schema}.event_dishes (event_id INTEGER REFERENCES"
+                f" {schema}.events (id), dish_id INTEGER REFERENCES {schema}.dishes (id),"
+                " PRIMARY KEY (event_id, dish_id));"
+                f"INSERT INTO {schema}.dishes (name) VALUES ('Pho');"
+                f"INSERT INTO {schema}.people (name) VALUES ('Ann');"
+                f"INSERT INTO {schema}.reviews (dish_id) VALUES (1);"
+                f"INSERT INTO {schema}.people_reviews VALUES (1, 1);"
+                f"INSERT INTO {schema}.events (type, started_at)"
+                " VALUES ('dinner', '2024-01-05'), ('party', NULL);"
+                f"INSERT INTO {schema}.event_dishes VALUES (1, 1), (2, 1);"
+            )
+        )
+
+    applied = test_db.migrate()
+
+    assert [migration.version for migration in applied][:2] == [1, 2]
+    assert MigrationRunner(test_db._engine).pending() == []
+    assert {"ix_dishes_search_vector", "ix_dishes_created_at_id"} <= index_names(test_db, "dishes")
+    assert "ix_reviews_dish_id" in index_names(test_db, "reviews")
+    assert "ix_events_started_at" in index_names(test_db, "events")
+    test_db.bulk_insert(Dish, [{"name": "Lasagna"}])
+    assert [dish.name for dish in test_db.search_dishes("lasagna")] == ["Lasagna"]
+
+    # The rows were kept, and those of a known month moved to its partition
+    with test_db._engine.connect() as connection:
+        events = connection.execute(
+            text(
+                "SELECT events.tableoid::regclass::text, events.id, count(*)"
+                f" FROM {schema}.events JOIN {schema}.event_dishes"
+                " ON event_dishes.event_id = events.id GROUP BY 1, 2 ORDER BY 2"
+            )
+        ).all()
+        people_reviews = connection.execute(
+            text(f"SELECT people_id, review_id FROM {schema}.people_reviews")
+        ).all()
+    assert events == [(f"{schema}.events_2024_01", 1, 1), (f"{schema}.events_default", 2, 1)]
+    assert people_reviews == [(1, 1)]
+    # The id sequences carried on from the copied rows
+    ((event_id, _),) = test_db.bulk_insert(Event, [{"type": "brunch"}])
+    assert event_id == 3
+
+
+@pytest.mark.committed
+def test_upgrade_in_transaction(test_db):
+    """Verify that a failing non-concurrent migration is rolled back and not recorded"""
+    migrations = [
+        Migration(version=1001, description="create", statements=["CREATE TABLE recipe.t (i int)"]),
+        Migration(
+            version=1002,
+            description="fail",
+            statements=["CREATE TABLE recipe.u (i int)", "SELECT missing_function()"],
+        ),
+    ]
+    runner = MigrationRunner(test_db._engine, migrations=migrations)
+    with pytest.raises(ProgrammingError):
+        runner.upgrade()
+
+    assert [migration.version for migration in runner.pending()] == [1002]
+    tables = inspect(test_db._engine).get_table_names(test_db.schema)
+    assert "t" in tables
+    assert "u" not in tables
+    with test_db._engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE {test_db.schema}.t"))
+
+
+def test_models_have_no_unindexed_foreign_keys():
+    """Verify that every foreign key in the models is served by an index"""
+    assert find_unindexed_foreign_keys() == []
+
+
+def test_find_unindexed_foreign_keys():
+    """Verify that foreign keys without a leading index are reported"""
+    metadata = MetaData()
+    Table("parents", metadata, Column("id", Integer, primary_key=True))
+    Table(
+        "children",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("parent_id", Integer, ForeignKey("parents.id")),
+    )
+    Table(
+        "links",
+        metadata,
+        Column("child_id", Integer, ForeignKey("children.id"), primary_key=True),
+        Column("parent_id", Integer, ForeignKey("parents.id"), primary_key=True),
+    )
+    assert find_unindexed_foreign_keys(metadata) == ["children(parent_id)", "links(parent_id)"]
@@ -0,0 +1,94 @@
+from time import perf_counter
+
+from database.notes import render
+from database.notes.render import backfill_rendered_notes, render_notes
+from database.schema.models import Dish
+
+
+def test_render_notes():
+    """Verify that bare URLs are linked once, and Markdown links and code are kept"""
+    notes = (
+        "Try https://a.com/soup. Or [the stew](https://b.com/stew), `curl https://c.com`"
+        " and <https://a.com/soup>"
+    )
+    rendered = render_notes(notes)
+    assert rendered.markdown == (
+        "Try [https://a.com/soup](https://a.com/soup). Or [the stew](https://b.com/stew),"
+        " `curl https://c.com` and <https://a.com/soup>"
+    )
+    assert rendered.links == [
+        {"url": "https://a.com/soup", "host": "a.com"},
+        {"url": "https://b.com/stew", "host": "b.com"},
+    ]
+    assert render_notes(None) == ("", [])
+
+
+def test_render_notes_unsafe_links():
+    """Verify that link targets with a script scheme are replaced"""
+    rendered = render_notes("[click](JavaScript:alert) ![x](data:image/png) [ok](/dish/1)")
+    assert rendered.markdown == "[click](#) ![x](#) [ok](/dish/1)"
+    assert rendered.links == []
+
+
+def test_render_notes_unsafe_bracketed_target():
+    """Verify that a script target is replaced when written between angle brackets"""
+    assert render_notes("[x](<javascript:alert(1)>)").markdown == "[x](#)"
+    assert render_notes("[x](java&#115;cript:alert(1))").markdown == "[x](#)"
+    assert render_notes("[ok](<https://a.com/x y>)").links == [
+        {"url": "https://a.com/x y", "host": "a.com"}
+    ]
+
+
+def test_render_notes_unsafe_reference_definitions():
+    """Verify that the target of a reference definition is checked like an inline one"""
+    rendered = render_notes("[x][1] [y][2]\n\n[1]: javascript:alert(1)\n  [2]:\n<https://a.com>")
+    assert rendered.markdown == "[x][1] [y][2]\n\n[1]: #\n  [2]:\n<https://a.com>"
+    assert rendered.links == [{"url": "https://a.com", "host": "a.com"}]
+
+
+def test_render_notes_unsafe_autolinks():
+    """Verify that an autolink with a script scheme is shown as text"""
+    rendered = render_notes("<javascript:alert(1)> <mailto:cook@a.com> <https://a.com>")
+    assert rendered.markdown == "\\<javascript:alert(1)> <mailto:cook@a.com> <https://a.com>"
+    assert rendered.links == [{"url": "https://a.com", "host": "a.com"}]
+
+
+def test_render_notes_unmatched_brackets():
+    """Verify that unmatched brackets are rendered in linear time, not rescanned from each"""
+    for notes in ["[" * 40_000, "[](" * 40_000, "\n[" * 40_000]:
+        start = perf_counter()
+        assert render_notes(notes).markdown == notes
+        assert perf_counter() - start < 0.5
+
+
+def test_backfill_rendered_notes(test_db):
+    """Verify that unrendered dishes are rendered in batches, without moving their version
+    or their place in the change feed"""
+    test_db.insert_many([Dish(name=f"test_dish_{i}", notes=f"https://a.com/{i}") for i in range(3)])
+    before = test_db.get_one_by_id(Dish, 3)
+
+    assert backfill_rendered_notes(test_db, batch_size=2) == 3
+    dish = test_db.get_one_by_id(Dish, 3)
+    assert dish.notes_rendered == "[https://a.com/2](https://a.com/2)"
+    assert dish.notes_links == [{"url": "https://a.com/2", "host": "a.com"}]
+    assert (dish.version, dish.updated_at) == (before.version, before.updated_at)
+
+    assert backfill_rendered_notes(test_db) == 0
+    assert backfill_rendered_notes(test_db, rerender=True) == 3
+
+
+def test_backfill_rendered_notes_concurrent_edit(test_db, monkeypatch):
+    """Verify that a dish edited while its batch is rendered is skipped, and not counted"""
+    test_db.insert_many([Dish(name=f"test_dish_{i}", notes=f"https://a.com/{i}") for i in range(3)])
+    render_for_update = render._render_for_update
+
+    def edit_while_rendering(notes):
+        if notes == "https://a.com/1":
+            with test_db.get_session() as session:
+                session.get(Dish, 2).notes = "edited"
+                session.commit()
+        return render_for_update(notes)
+
+    monkeypatch.setattr(render, "_render_for_update", edit_while_rendering)
+    assert backfill_rendered_notes(test_db) == 2
+    assert test_db.get_one_by_id(Dish, 2).notes_rendered is None
@@ -0,0 +1,117 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import event, text
+
+from database.schema.models import Dish, Event, EventDish, PeopleReview, Person, Review
+from database.utils.partitions import next_month, partition_name
+
+
+def insert_data(test_db) -> None:
+    test_db.insert_many([Dish(name="test_dish"), Person(name="test_person")])
+    test_db.insert_many(
+        [
+            Event(type="dinner", started_at=datetime(2024, 1, 5), dishes=[EventDish(dish_id=1)]),
+            Event(type="party", started_at=datetime(2024, 1, 20), dishes=[EventDish(dish_id=1)]),
+            Event(type="brunch", started_at=datetime(2024, 2, 3), dishes=[EventDish(dish_id=1)]),
+            Review(dish_id=1, created_at=datetime(2024, 1, 7), people=[PeopleReview(people_id=1)]),
+        ]
+    )
+
+
+def partitions_of(test_db, table: str) -> dict[int, str]:
+    with test_db._engine.connect() as connection:
+        rows = connection.execute(text(f"SELECT id, tableoid::regclass::text FROM {table}"))
+        return {row_id: name.split(".")[-1] for row_id, name in rows}
+
+
+def test_next_month():
+    """Verify that months roll over into the next year"""
+    assert next_month(date(2024, 1, 1)) == date(2024, 2, 1)
+    assert next_month(date(2024, 12, 1)) == date(2025, 1, 1)
+    assert partition_name("events", date(2024, 1, 1)) == "events_2024_01"
+
+
+@pytest.mark.committed
+def test_ensure_partitions(test_db):
+    """Verify that rows written before their month had a partition are moved into it"""
+    insert_data(test_db)
+    events = f"{test_db.schema}.events"
+    assert set(partitions_of(test_db, events).values()) == {"events_default"}
+
+    created = test_db.ensure_partitions()
+    assert {"events_2024_01", "event_dishes_2024_01", "reviews_2024_01"} <= set(created)
+    assert partitions_of(test_db, events) == {
+        1: "events_2024_01",
+        2: "events_2024_01",
+        3: "events_2024_02",
+    }
+    assert partitions_of(test_db, f"{test_db.schema}.reviews") == {1: "reviews_2024_01"}
+    # The current month and the next ones exist already
+    assert test_db.ensure_partitions() == []
+    assert partition_name("events", date.today().replace(day=1)) not in created
+
+
+@pytest.mark.committed
+def test_get_time_range(test_db):
+    """Verify that a time range is read newest first, from its month's partition only"""
+    insert_data(test_db)
+    test_db.ensure_partitions()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(test_db._engine, "before_cursor_execute", record)
+    try:
+        january = test_db.get_time_range(
+            Event, datetime(2024, 1, 1), datetime(2024, 2, 1), include=["dishes"]
+        )
+    finally:
+        event.remove(test_db._engine, "before_cursor_execute", record)
+    assert [(e.type, len(e.dishes)) for e in january] == [("party", 1), ("dinner", 1)]
+
+    statement, parameters = statements[0]
+    with test_db._engine.connect() as connection:
+        plan = "\n".join(connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).scalars())
+    assert "events_2024_01" in plan
+    assert "events_2024_02" not in plan and "events_default" not in plan
+
+    reviews = test_db.get_time_range(Review, datetime(2024, 1, 1), datetime(2024, 2, 1))
+    assert [review.id for review in reviews] == [1]
+    with pytest.raises(ValueError):
+        test_db.get_time_range(Dish, datetime(2024, 1, 1), datetime(2024, 2, 1))
+
+
+@pytest.mark.committed
+def test_detach_partitions(test_db):
+    """Verify that old months are detached into tables of their own, children included"""
+    insert_data(test_db)
+    test_db.ensure_partitions()
+    schema = test_db.schema
+
+    detached = test_db.detach_partitions(before=date(2024, 2, 1))
+    try:
+        assert detached == [
+            "people_reviews_2024_01",
+            "reviews_2024_01",
+            "event_dishes_2024_01",
+            "events_2024_01",
+        ]
+        assert test_db.get_time_range(Event, datetime(2024, 1, 1), datetime(2024, 3, 1))[0].id == 3
+        assert partitions_of(test_db, f"{schema}.events_2024_01") == {
+            1: "events_2024_01",
+            2: "events_2024_01",
+        }
+        # Archived rows do not keep their dish from being deleted
+        with test_db._engine.begin() as connection:
+            connection.execute(text(f"DELETE FROM {schema}.event_dishes WHERE event_id = 3"))
+            connection.execute(text(f"DELETE FROM {schema}.reviews_default"))
+            connection.execute(text(f"DELETE FROM {schema}.dishes"))
+        # Nor the partitioned tables from being dropped
+        with test_db._engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE {schema}.people_reviews, {schema}.reviews"))
+    finally:
+        with test_db._engine.begin() as connection:
+            for name in detached:
+                connection.execute(text(f"DROP TABLE {schema}.{name}"))
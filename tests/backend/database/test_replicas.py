@@ -0,0 +1,124 @@
+import pytest
+from sqlalchemy import create_engine, event
+
+from database.schema.models import Dish
+from database.utils.connection import Credentials, RecipeDBAccess
+from database.utils.replicas import (
+    LEAST_CONNECTIONS,
+    Replica,
+    ReplicaSet,
+    read_from_primary,
+    use_primary,
+)
+
+# Nothing listens on port 1, connections to it are refused at once
+DOWN = "localhost:1"
+
+
+def make_db(test_db: RecipeDBAccess, replica_hosts: list[str]) -> RecipeDBAccess:
+    credentials = test_db._credentials
+    return RecipeDBAccess(
+        credentials=Credentials(
+            username=credentials.username,
+            password=credentials.password,
+            host=credentials.host,
+            db=credentials.db,
+            is_production=False,
+            schema=credentials.schema,
+            replica_hosts=replica_hosts,
+        )
+    )
+
+
+def count_statements(engine) -> list[str]:
+    statements: list[str] = []
+    event.listen(engine, "before_cursor_execute", lambda c, cur, stmt, *_: statements.append(stmt))
+    return statements
+
+
+def make_replica_set(*names: str, **kwargs) -> ReplicaSet:
+    engines = [create_engine("postgresql+psycopg2://") for _ in names]
+    replica_set = ReplicaSet([Replica(n, e) for n, e in zip(names, engines)], **kwargs)
+    for replica in replica_set.replicas:
+        replica.checked_at = float("inf")
+    return replica_set
+
+
+@pytest.mark.committed
+def test_reads_go_to_replica(test_db):
+    """Verify that reads use the replica, and writes and use_primary() reads the primary"""
+    db = make_db(test_db, [test_db._credentials.host])
+    try:
+        replica = count_statements(db._replicas.replicas[0].engine)
+        primary = count_statements(db._engine)
+        dish = db.upsert(Dish(name="Pho"))
+        assert not replica
+
+        assert db.get_one_by_id(Dish, dish.id).name == "Pho"
+        assert [d.name for d in db.get_all(Dish)] == ["Pho"]
+        reads = len(replica)
+        assert reads and db.get_pool_status()["replicas"][0]["healthy"]
+
+        primary.clear()
+        with use_primary():
+            assert db.get_one_by_id(Dish, dish.id).name == "Pho"
+        assert len(replica) == reads and primary
+        assert not read_from_primary.get()
+    finally:
+        db.dispose()
+
+
+@pytest.mark.committed
+def test_unhealthy_replica_falls_back_to_primary(test_db):
+    """Verify that a replica that refuses connections is skipped, and reads still succeed"""
+    db = make_db(test_db, [DOWN])
+    try:
+        dish = db.upsert(Dish(name="Pho"))
+        assert db.get_one_by_id(Dish, dish.id).name == "Pho"
+        (status,) = db.get_pool_status()["replicas"]
+        assert status["name"] == DOWN
+        assert not status["healthy"] and status["error"]
+    finally:
+        db.dispose()
+
+
+def test_round_robin():
+    """Verify that round robin takes turns among the healthy replicas"""
+    replica_set = make_replica_set("a", "b", "c")
+    a, b, c = (replica.engine for replica in replica_set.replicas)
+    assert [replica_set.choose() for _ in range(4)] == [a, b, c, a]
+
+    replica_set.replicas[1].healthy = False
+    assert {replica_set.choose() for _ in range(4)} == {a, c}
+
+    for replica in replica_set.replicas:
+        replica.healthy = False
+    assert replica_set.choose() is None
+
+
+def test_least_connections(test_db):
+    """Verify that least connections picks the replica with the fewest checked out"""
+    credentials = test_db._credentials
+    url = (
+        f"postgresql+psycopg2://{credentials.username}:{credentials.password}"
+        f"@{credentials.host}/{credentials.db}"
+    )
+    replica_set = ReplicaSet(
+        [Replica("a", create_engine(url)), Replica("b", create_engine(url))],
+        strategy=LEAST_CONNECTIONS,
+        check_interval=3600,
+    )
+    a, b = (replica.engine for replica in replica_set.replicas)
+    try:
+        with a.connect():
+            assert replica_set.choose() is b
+        with b.connect():
+            assert replica_set.choose() is a
+    finally:
+        replica_set.dispose()
+
+
+def test_unknown_strategy():
+    """Verify that an unknown strategy is rejected"""
+    with pytest.raises(ValueError):
+        make_replica_set("a", strategy="random")
@@ -0,0 +1,105 @@
+import pytest
+
+from database.schema.models import Dish, DishRecipe, DishSimilarity, DishTerm, Recipe
+from database.similarity.neighbors import (
+    build_similarity,
+    similar_dishes,
+    term_counts,
+    update_similarity,
+)
+
+
+def insert_data(test_db) -> None:
+    test_db.insert_many(
+        [
+            Dish(name="spicy chicken curry", notes="serve with rice"),
+            Dish(name="chicken curry", notes="https://example.com/curry mild"),
+            Dish(name="beef tacos", notes="serve with salsa"),
+            Dish(name="fish tacos"),
+            Dish(name="lemon cake"),
+        ]
+    )
+    test_db.insert_one(Recipe(url="https://example.com/cake"))
+    test_db.insert_many([DishRecipe(dish_id=5, recipe_id=1)])
+
+
+def neighbors(test_db, dish_id: int) -> list[str]:
+    return [row.name for row in similar_dishes(test_db, dish_id)]
+
+
+def test_term_counts():
+    """Verify that names count double, URLs are left out, and recipes are terms"""
+    counts = term_counts("Chicken Curry", "the curry of https://example.com/curry", [3])
+    assert counts == {"chicken": 2, "curry": 3, "recipe:3": 1}
+
+
+def test_build_similarity(test_db):
+    """Verify that every dish gets its nearest neighbors, most similar first"""
+    insert_data(test_db)
+    assert build_similarity(test_db, top_k=2) == 5
+
+    assert neighbors(test_db, 1) == ["chicken curry", "beef tacos"]
+    assert neighbors(test_db, 4) == ["beef tacos"]
+    # Dishes that share nothing have no neighbors
+    assert neighbors(test_db, 5) == []
+    scores = [row.score for row in similar_dishes(test_db, 2)]
+    assert 0 < scores[0] < 1
+    assert len(test_db.get_all(DishSimilarity)) == 6
+
+
+def test_build_similarity_shared_recipe(test_db):
+    """Verify that dishes made from the same recipe are similar, whatever their names"""
+    insert_data(test_db)
+    test_db.insert_one(Dish(name="birthday treat"))
+    test_db.insert_many([DishRecipe(dish_id=6, recipe_id=1)])
+    build_similarity(test_db)
+    assert neighbors(test_db, 6) == ["lemon cake"]
+
+
+def test_update_similarity(test_db):
+    """Verify that a written dish gets its neighbors, and joins or leaves theirs"""
+    insert_data(test_db)
+    build_similarity(test_db, top_k=2)
+    test_db.insert_one(Dish(name="chicken tacos"))
+    update_similarity(test_db, 6, top_k=2)
+
+    assert set(neighbors(test_db, 6)) == {"fish tacos", "chicken curry"}
+    # A better match replaces the weakest neighbor
+    assert neighbors(test_db, 4) == ["chicken tacos", "beef tacos"]
+    assert neighbors(test_db, 2)[0] in {"spicy chicken curry", "chicken tacos"}
+    assert len(neighbors(test_db, 2)) == 2
+
+    with test_db.get_session() as session:
+        session.get(Dish, 6).name = "lemon pie"
+        session.commit()
+    update_similarity(test_db, 6, top_k=2)
+    assert neighbors(test_db, 6) == ["lemon cake"]
+    assert "chicken tacos" not in neighbors(test_db, 4)
+    assert "lemon pie" in neighbors(test_db, 5)
+
+
+def test_update_similarity_deleted_dish(test_db):
+    """Verify that the vector and neighbors of a deleted dish go with it"""
+    insert_data(test_db)
+    build_similarity(test_db)
+    test_db.insert_one(Dish(name="beef stew"))
+    update_similarity(test_db, 6)
+    assert "beef stew" in neighbors(test_db, 3)
+    with test_db.get_session() as session:
+        session.delete(session.get(Dish, 6))
+        session.commit()
+
+    update_similarity(test_db, 6)
+    assert neighbors(test_db, 3) == ["fish tacos", "spicy chicken curry"]
+    assert all(row.dish_id != 6 for row in test_db.get_all(DishTerm))
+    assert all(
+        6 not in (row.dish_id, row.similar_dish_id) for row in test_db.get_all(DishSimilarity)
+    )
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 100])
+def test_build_similarity_batches(test_db, batch_size):
+    """Verify that the batch size changes how the scores are computed, not what they are"""
+    insert_data(test_db)
+    build_similarity(test_db, top_k=3, batch_size=batch_size)
+    assert neighbors(test_db, 3) == ["fish tacos", "spicy chicken curry"]
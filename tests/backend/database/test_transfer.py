@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from database.schema.models import Dish, DishRecipe, Event, EventDish, Recipe, RecipeContent
+from database.transfer.transfer import export_database, import_database, transfer_models
+
+
+def insert_data(test_db) -> None:
+    dish = Dish(name='test "dish"', notes=None)
+    content = RecipeContent(hash="0" * 64, data=b"\x00binary\xff", size=8)
+    recipe = Recipe(url="https://example.com", content_hash=content.hash)
+    dish_2 = Dish(name="test_dish_2", notes="line 1\nline 2", notes_links=[{"url": "u"}])
+    event = Event(type="dinner", dishes=[EventDish(dish=dish_2)])
+    test_db.insert_many([content])
+    test_db.insert_many([dish, dish_2, recipe, event])
+    test_db.insert_many([DishRecipe(dish_id=1, recipe_id=1)])
+
+
+def snapshot(test_db) -> dict[str, list[dict]]:
+    return {
+        model.__tablename__: list(test_db.stream_rows(model, model.__table__.columns.keys()))
+        for model in transfer_models()
+    }
+
+
+@pytest.mark.committed
+@pytest.mark.parametrize("fmt", ["ndjson", "parquet"])
+def test_export_import_round_trip(test_db, tmp_path, fmt):
+    """Verify that an export imported into empty tables restores every row and sequence"""
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    insert_data(test_db)
+    before = snapshot(test_db)
+
+    counts = export_database(test_db, tmp_path, fmt=fmt, batch_size=1)
+    assert counts["dishes"] == 2 and counts["event_dishes"] == 1
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert "search_vector" not in manifest["tables"][0]["columns"]
+
+    test_db.drop_tables(force=True)
+    test_db.create_tables()
+    assert import_database(test_db, tmp_path, batch_size=1) == counts
+    assert snapshot(test_db) == before
+
+    test_db.insert_one(Dish(name="test_dish_3"))
+    assert test_db.get_one_by_id(Dish, 3).name == "test_dish_3"
+
+
+@pytest.mark.committed
+def test_export_snapshot(test_db, tmp_path):
+    """Verify that rows written during an export are left out of every table"""
+    insert_data(test_db)
+
+    def write_between_tables(done: int, total: int) -> None:
+        if done == 1:
+            test_db.insert_many([Recipe(url="https://example.com/2")])
+            test_db.insert_many([DishRecipe(dish_id=2, recipe_id=2)])
+
+    counts = export_database(test_db, tmp_path, progress=write_between_tables)
+    assert counts["recipes"] == 1 and counts["dish_recipes"] == 1
+    assert len(test_db.get_all(Recipe)) == 2
+
+
+def test_import_upsert(test_db, tmp_path):
+    """Verify that an upsert import overwrites changed rows and keeps the others"""
+    insert_data(test_db)
+    export_database(test_db, tmp_path)
+    with test_db.get_session() as session:
+        session.get(Dish, 1).name = "test_dish_renamed"
+        session.commit()
+    test_db.insert_one(Dish(name="test_dish_3"))
+
+    import_database(test_db, tmp_path, mode="upsert")
+    assert [dish.name for dish in sorted(test_db.get_all(Dish), key=lambda d: d.id)] == [
+        'test "dish"',
+        "test_dish_2",
+        "test_dish_3",
+    ]
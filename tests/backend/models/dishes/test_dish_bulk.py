@@ -0,0 +1,67 @@
+from database.schema.models import Dish
+from database.utils.bulk import CSVRowStream
+
+
+def test_bulk_insert(test_db):
+    """Verify that bulk_insert returns the generated ids in input order across batches"""
+    rows = ({"name": f"test_dish_{i}", "notes": "notes"} for i in range(5))
+    ids = test_db.bulk_insert(Dish, rows, batch_size=2)
+    assert ids == [1, 2, 3, 4, 5]
+    with test_db.get_session() as session:
+        result = session.query(Dish).order_by(Dish.id).all()
+    assert [dish.name for dish in result] == [f"test_dish_{i}" for i in range(5)]
+    assert all(dish.created_at is not None for dish in result)
+
+
+def test_bulk_upsert(test_db):
+    """Verify that bulk_upsert updates existing rows and inserts new ones"""
+    test_db.bulk_insert(Dish, [{"name": "test_dish", "notes": "notes"}])
+    ids = test_db.bulk_upsert(
+        Dish,
+        [
+            {"id": 1, "name": "test_dish_updated", "notes": None},
+            {"id": 7, "name": "test_dish_new", "notes": "new notes"},
+        ],
+    )
+    assert ids == [1, 7]
+    with test_db.get_session() as session:
+        result = session.query(Dish).order_by(Dish.id).all()
+    assert [(dish.id, dish.name, dish.notes) for dish in result] == [
+        (1, "test_dish_updated", None),
+        (7, "test_dish_new", "new notes"),
+    ]
+
+
+def test_copy_rows(test_db):
+    """Verify that copy_rows keeps NULLs, empty strings and quotes apart"""
+    rows = [
+        {"id": 1, "name": 'test "dish", quoted', "notes": None},
+        {"id": 2, "name": "test_dish_2", "notes": ""},
+        {"id": 3, "name": "test_dish_3", "notes": "line 1\nline 2"},
+    ]
+    assert test_db.copy_rows(Dish, rows, columns=["id", "name", "notes"]) == 3
+    with test_db.get_session() as session:
+        result = session.query(Dish).order_by(Dish.id).all()
+    assert [(dish.name, dish.notes) for dish in result] == [
+        ('test "dish", quoted', None),
+        ("test_dish_2", ""),
+        ("test_dish_3", "line 1\nline 2"),
+    ]
+
+
+def test_csv_row_stream():
+    """Verify that rows are rendered only as far as each read needs"""
+    stream = CSVRowStream(({"id": i, "name": f"a,{i}"} for i in range(3)), columns=["id", "name"])
+    assert stream.read(4) == '"0",'
+    assert stream.rowcount == 1
+    assert stream.readline() == '"a,0"\n'
+    assert stream.readline(3) == '"1"'
+    assert stream.read() == ',"a,1"\n"2","a,2"\n'
+    assert (stream.read(), stream.readline(), stream.rowcount) == ("", "", 3)
+
+
+def test_sync_sequences(test_db):
+    """Verify that ids generated after loading explicit ids do not collide"""
+    test_db.copy_rows(Dish, [{"id": 41, "name": "test_dish"}], columns=["id", "name"])
+    test_db.sync_sequences()
+    assert test_db.bulk_insert(Dish, [{"name": "test_dish_2"}]) == [42]
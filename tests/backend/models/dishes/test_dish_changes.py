@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy import update
+
+from database.schema.models import Dish
+from database.schema.read_models import DishChange
+
+
+@pytest.mark.committed
+def test_get_dish_changes(test_db):
+    """Verify that the change feed returns every dish once, then only the changed ones"""
+    test_db.insert_many([Dish(name=f"test_dish_{i}") for i in range(3)])
+    changes = test_db.get_dish_changes(limit=2)
+    assert [dish.id for dish in changes] == [1, 2]
+    assert isinstance(changes[0], DishChange)
+
+    cursor = test_db.get_dish_change_cursor()
+    assert cursor[1] == 3
+    assert [dish.id for dish in test_db.get_dish_changes(after=(changes[-1].updated_at, 2))] == [3]
+    assert test_db.get_dish_changes(after=cursor) == []
+
+    dish = test_db.get_one_by_id(Dish, 2)
+    dish.name = "test_dish_renamed"
+    test_db.upsert(dish)
+    changes = test_db.get_dish_changes(after=cursor)
+    assert [(dish.id, dish.name) for dish in changes] == [(2, "test_dish_renamed")]
+    assert test_db.get_dish_change_cursor() == (changes[0].updated_at, 2)
+
+
+@pytest.mark.committed
+def test_dish_updated_at(test_db):
+    """Verify that ORM, Core and bulk updates all move updated_at, and inserts set it"""
+    test_db.bulk_insert(Dish, [{"name": "test_dish"}])
+    created = test_db.get_one_by_id(Dish, 1)
+    assert created.updated_at == created.created_at
+
+    with test_db.get_session() as session:
+        session.execute(update(Dish).where(Dish.id == 1).values(name="test_dish_2"))
+        session.commit()
+    core_updated = test_db.get_one_by_id(Dish, 1).updated_at
+    assert core_updated > created.updated_at
+
+    test_db.bulk_upsert(Dish, [{"id": 1, "name": "test_dish_3"}])
+    assert test_db.get_one_by_id(Dish, 1).updated_at > core_updated
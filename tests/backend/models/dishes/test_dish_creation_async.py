@@ -0,0 +1,155 @@
+"""Parity tests for AsyncRecipeDBAccess, mirroring test_dish_creation.py"""
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from database.schema.models import Dish
+from database.utils.async_connection import AsyncRecipeDBAccess
+
+
+def validate_dish(dish: Dish, name: str, id: int):
+    """Validates the dish"""
+    assert dish.name == name
+    assert dish.created_at is not None
+    assert dish.id == id
+
+
+async def get_dish(db: AsyncRecipeDBAccess, **filters) -> Dish | None:
+    """Gets the single dish matching the filters"""
+    async with db.get_session() as session:
+        result = await session.execute(select(Dish).filter_by(**filters))
+        return result.scalar_one_or_none()
+
+
+async def get_dishes(db: AsyncRecipeDBAccess) -> list[Dish]:
+    """Gets all dishes ordered by id"""
+    async with db.get_session() as session:
+        result = await session.execute(select(Dish).order_by(Dish.id))
+        return list(result.scalars().all())
+
+
+def test_create_dish(async_test_db, run_async):
+    """Verify that a dish can be created"""
+
+    async def scenario():
+        await async_test_db.insert_one(Dish(name="test_dish"))
+        return await get_dish(async_test_db, name="test_dish")
+
+    result = run_async(scenario())
+    assert result is not None
+    validate_dish(dish=result, name="test_dish", id=1)
+
+
+def test_create_dish_with_custom_id(async_test_db, run_async):
+    """Verify that a dish cannot be created with a custom id"""
+
+    async def scenario():
+        await async_test_db.insert_one(Dish(id=10, name="test_dish"))
+        return await get_dish(async_test_db, name="test_dish")
+
+    result = run_async(scenario())
+    assert result is not None
+    validate_dish(dish=result, name="test_dish", id=1)
+
+
+def test_create_dishes(async_test_db, run_async):
+    """Verify that multiple dishes can be created"""
+
+    async def scenario():
+        await async_test_db.insert_many([Dish(name="test_dish"), Dish(name="test_dish_2")])
+        return await get_dishes(async_test_db)
+
+    result = run_async(scenario())
+    assert len(result) == 2
+    validate_dish(dish=result[0], name="test_dish", id=1)
+    validate_dish(dish=result[1], name="test_dish_2", id=2)
+
+
+def test_create_dishes_with_custom_ids(async_test_db, run_async):
+    """Verify that multiple dishes and their ids are not affected by custom ids"""
+
+    async def scenario():
+        dishes = [
+            Dish(id=2, name="test_dish"),
+            Dish(name="test_dish_2"),
+            Dish(id=1, name="test_dish_3"),
+        ]
+        await async_test_db.insert_many(dishes)
+        return await get_dishes(async_test_db)
+
+    result = run_async(scenario())
+    assert len(result) == 3
+    validate_dish(dish=result[0], name="test_dish", id=1)
+    validate_dish(dish=result[1], name="test_dish_2", id=2)
+    validate_dish(dish=result[2], name="test_dish_3", id=3)
+
+
+def test_update_dish(async_test_db, run_async):
+    """Verify that a dish can be updated with upsert"""
+
+    async def scenario():
+        dish = Dish(name="test_dish")
+        await async_test_db.insert_one(dish)
+        validate_dish(dish=await get_dish(async_test_db, id=1), name="test_dish", id=1)
+
+        dish.name = "test_dish_2"
+        updated_dish = await async_test_db.upsert(dish)
+        validate_dish(dish=updated_dish, name="test_dish_2", id=1)
+        return await get_dish(async_test_db, id=1)
+
+    result = run_async(scenario())
+    assert result is not None
+    validate_dish(dish=result, name="test_dish_2", id=1)
+
+
+def test_upsert_dish(async_test_db, run_async):
+    """Verify that a dish can be inserted with upsert, and then updated with upsert"""
+
+    async def scenario():
+        dish = await async_test_db.upsert(Dish(name="test_dish"))
+        validate_dish(dish=dish, name="test_dish", id=1)
+        validate_dish(dish=await get_dish(async_test_db, id=1), name="test_dish", id=1)
+
+        dish.name = "test_dish_2"
+        updated_dish = await async_test_db.upsert(dish)
+        validate_dish(dish=updated_dish, name="test_dish_2", id=1)
+        return await get_dishes(async_test_db)
+
+    result = run_async(scenario())
+    # Verify there is no new dish created
+    assert len(result) == 1
+    validate_dish(dish=result[0], name="test_dish_2", id=1)
+
+
+def test_update_dish_with_existing_id(async_test_db, run_async):
+    """Verify that a dish cannot be updated to violate a unique constraint"""
+
+    async def scenario():
+        dishes = [
+            await async_test_db.upsert(Dish(name="test_dish")),
+            await async_test_db.upsert(Dish(name="test_dish_2")),
+        ]
+        # Update dish 1 with dish 2's id
+        dishes[0].id = 2
+        await async_test_db.upsert(dishes[0])
+
+    with pytest.raises(IntegrityError):
+        run_async(scenario())
+
+
+def test_get_one_by_id_and_get_all(async_test_db, run_async):
+    """Verify that the read methods match the rows written"""
+
+    async def scenario():
+        await async_test_db.insert_many([Dish(name="test_dish"), Dish(name="test_dish_2")])
+        return (
+            await async_test_db.get_one_by_id(obj_type=Dish, obj_id=2),
+            await async_test_db.get_one_by_id(obj_type=Dish, obj_id=3),
+            await async_test_db.get_all(Dish),
+        )
+
+    dish, missing, dishes = run_async(scenario())
+    validate_dish(dish=dish, name="test_dish_2", id=2)
+    assert missing is None
+    assert sorted(dish.name for dish in dishes) == ["test_dish", "test_dish_2"]
@@ -0,0 +1,50 @@
+import pytest
+
+from database.schema.models import Dish
+from database.schema.read_models import DishSummary
+
+
+def insert_dishes(test_db, count: int) -> None:
+    """Inserts `count` dishes in one transaction, so they share the same created_at"""
+    test_db.insert_many([Dish(name=f"test_dish_{i}", notes="notes") for i in range(count)])
+
+
+def test_get_first_page(test_db):
+    """Verify that the first page is ordered by (created_at, id) and only has the key columns"""
+    insert_dishes(test_db, 5)
+    page = test_db.get_dish_page(limit=2)
+    assert [dish.id for dish in page] == [1, 2]
+    assert [dish.name for dish in page] == ["test_dish_0", "test_dish_1"]
+    assert isinstance(page[0], DishSummary)
+
+
+def test_get_next_pages(test_db):
+    """Verify that following the last key of each page walks every dish exactly once"""
+    insert_dishes(test_db, 5)
+    seen = []
+    page = test_db.get_dish_page(limit=2)
+    while page:
+        seen.extend(dish.id for dish in page)
+        last = page[-1]
+        page = test_db.get_dish_page(limit=2, after=(last.created_at, last.id))
+    assert seen == [1, 2, 3, 4, 5]
+
+
+def test_get_previous_page(test_db):
+    """Verify that paging backwards returns the rows before the key in ascending order"""
+    insert_dishes(test_db, 5)
+    third = test_db.get_dish_page(limit=3)[-1]
+    last_page = test_db.get_dish_page(limit=2, after=(third.created_at, third.id))
+    assert [dish.id for dish in last_page] == [4, 5]
+
+    first = last_page[0]
+    page = test_db.get_dish_page(limit=2, before=(first.created_at, first.id))
+    assert [dish.id for dish in page] == [2, 3]
+
+
+def test_get_page_with_after_and_before(test_db):
+    """Verify that a page cannot be bounded on both sides"""
+    insert_dishes(test_db, 2)
+    key = (test_db.get_dish_page(limit=1)[0].created_at, 1)
+    with pytest.raises(ValueError):
+        test_db.get_dish_page(limit=1, after=key, before=key)
@@ -0,0 +1,35 @@
+import dataclasses
+
+import pytest
+
+from database.schema.models import Dish
+from database.schema.read_models import DishRow, DishSummary, columns_of
+
+
+def test_get_rows(test_db):
+    """Verify that get_rows filters, orders and limits, and only selects the read model columns"""
+    test_db.insert_many([Dish(name=f"test_dish_{i}", notes="notes") for i in range(5)])
+    rows = test_db.get_rows(DishSummary, Dish.id > 1, order_by=[Dish.id.desc()], limit=3)
+    assert [(row.id, row.name) for row in rows] == [
+        (5, "test_dish_4"),
+        (4, "test_dish_3"),
+        (3, "test_dish_2"),
+    ]
+    assert columns_of(DishSummary) == (Dish.id, Dish.name, Dish.created_at)
+
+
+def test_read_models_are_compact_and_frozen(test_db):
+    """Verify that read models have no instance dict and cannot be modified"""
+    test_db.insert_one(Dish(name="test_dish"))
+    dish = test_db.get_one_as(DishSummary, 1)
+    assert not hasattr(dish, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        dish.name = "test_dish_2"
+    assert test_db.get_one_as(DishSummary, 2) is None
+
+
+def test_iter_rows(test_db):
+    """Verify that iter_rows streams every row across several batches"""
+    test_db.insert_many([Dish(name=f"test_dish_{i}", notes=f"notes_{i}") for i in range(5)])
+    rows = list(test_db.iter_rows(DishRow, order_by=[Dish.id], batch_size=2))
+    assert [row.notes for row in rows] == [f"notes_{i}" for i in range(5)]
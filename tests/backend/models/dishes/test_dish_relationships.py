@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy.orm.exc import DetachedInstanceError
+
+from database.schema.models import Dish, DishRecipe, PeopleReview, Person, Recipe, Review
+
+INCLUDE = ["recipes.recipe", "reviews.people.person"]
+
+
+def create_dish(test_db, recipes: int, reviews: int) -> None:
+    """Creates dish 1 with the given number of recipes, and reviews by two people each"""
+    dish = Dish(name="test_dish")
+    dish.recipes = [
+        DishRecipe(recipe=Recipe(url=f"https://example.com/{i}")) for i in range(recipes)
+    ]
+    people = [Person(name="reviewer_1"), Person(name="reviewer_2")]
+    dish.reviews = [
+        Review(people=[PeopleReview(person=person) for person in people]) for _ in range(reviews)
+    ]
+    test_db.insert_one(dish)
+
+
+@pytest.mark.parametrize("size", [1, 10])
+def test_get_one_by_id_include(test_db, count_queries, size):
+    """Verify that included relationships load in a constant number of statements"""
+    create_dish(test_db, recipes=size, reviews=size)
+    with count_queries() as statements:
+        dish = test_db.get_one_by_id(obj_type=Dish, obj_id=1, include=INCLUDE)
+        # The session is closed, so touching anything not loaded would raise or query
+        urls = [dish_recipe.recipe.url for dish_recipe in dish.recipes]
+        names = [pr.person.name for review in dish.reviews for pr in review.people]
+
+    # dishes, dish_recipes + recipes, reviews, people_reviews + people
+    assert len(statements) == 4
+    assert len(urls) == size
+    assert len(names) == 2 * size
+
+
+def test_get_all_include(test_db, count_queries):
+    """Verify that included relationships of every object load in one statement per level"""
+    create_dish(test_db, recipes=3, reviews=0)
+    create_dish(test_db, recipes=2, reviews=0)
+    with count_queries() as statements:
+        dishes = test_db.get_all(Dish, include=["recipes.recipe"])
+        urls = [dish_recipe.recipe.url for dish in dishes for dish_recipe in dish.recipes]
+
+    assert len(statements) == 2
+    assert len(urls) == 5
+
+
+def test_get_one_by_id_without_include(test_db):
+    """Verify that relationships are not loaded unless included"""
+    create_dish(test_db, recipes=1, reviews=1)
+    dish = test_db.get_one_by_id(obj_type=Dish, obj_id=1)
+    with pytest.raises(DetachedInstanceError):
+        dish.recipes
+
+
+def test_get_one_by_id_include_unknown(test_db):
+    """Verify that an unknown relationship path is rejected"""
+    with pytest.raises(ValueError):
+        test_db.get_one_by_id(obj_type=Dish, obj_id=1, include=["recipes.missing"])
@@ -0,0 +1,63 @@
+from sqlalchemy import inspect
+
+from database.schema.models import Dish
+
+
+def insert_dishes(test_db) -> None:
+    test_db.bulk_insert(
+        Dish,
+        [
+            {"name": "Chicken curry", "notes": "spicy coconut sauce"},
+            {"name": "Lasagna", "notes": "layers of pasta and ragu"},
+            {"name": "Pasta carbonara", "notes": "eggs and pecorino"},
+            {"name": "Coconut rice", "notes": None},
+        ],
+    )
+
+
+def test_search_indexes(test_db):
+    """Verify that the full-text and trigram indexes are created"""
+    indexes = {
+        index["name"] for index in inspect(test_db._engine).get_indexes("dishes", test_db.schema)
+    }
+    assert {"ix_dishes_search_vector", "ix_dishes_name_trgm"} <= indexes
+
+
+def test_search_ranks_name_and_notes(test_db):
+    """Verify that matches in the name rank above matches in the notes only"""
+    insert_dishes(test_db)
+    assert [dish.name for dish in test_db.search_dishes("pasta")] == ["Pasta carbonara", "Lasagna"]
+    assert [dish.name for dish in test_db.search_dishes("coconut")] == [
+        "Coconut rice",
+        "Chicken curry",
+    ]
+
+
+def test_search_web_syntax(test_db):
+    """Verify that phrases and excluded words are supported"""
+    insert_dishes(test_db)
+    # The phrase only matches Chicken curry's notes, Coconut rice is only a fuzzy name match
+    assert [dish.name for dish in test_db.search_dishes('"coconut sauce"')] == [
+        "Chicken curry",
+        "Coconut rice",
+    ]
+    assert [dish.name for dish in test_db.search_dishes("pasta -ragu")] == ["Pasta carbonara"]
+
+
+def test_search_fuzzy_name(test_db):
+    """Verify that misspelled names are found"""
+    insert_dishes(test_db)
+    assert [dish.name for dish in test_db.search_dishes("chiken")] == ["Chicken curry"]
+    assert [dish.name for dish in test_db.search_dishes("lasagne")] == ["Lasagna"]
+
+
+def test_search_pagination(test_db):
+    """Verify that results are paginated in rank order"""
+    test_db.bulk_insert(Dish, [{"name": f"Soup {i}", "notes": "soup " * i} for i in range(1, 6)])
+    first_page = test_db.search_dishes("soup", limit=3)
+    second_page = test_db.search_dishes("soup", limit=3, offset=3)
+    assert len(first_page) == 3
+    assert len(second_page) == 2
+    ranks = [dish.rank for dish in [*first_page, *second_page]]
+    assert ranks == sorted(ranks, reverse=True)
+    assert len({dish.id for dish in [*first_page, *second_page]}) == 5
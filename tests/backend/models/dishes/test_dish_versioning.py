@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy.orm.exc import StaleDataError
+
+from database.schema.models import Dish, Recipe
+from database.utils.connection import VersionConflictError
+
+
+@pytest.mark.committed
+def test_update_versioned(test_db, count_queries):
+    """Verify that a versioned update is a single statement that increments the version"""
+    test_db.insert_one(Dish(name="test_dish"))
+    dish = test_db.get_one_by_id(Dish, 1)
+    assert dish.version == 1
+
+    with count_queries() as statements:
+        updated = test_db.update_versioned(Dish, 1, 1, {"name": "test_dish_2", "notes": "notes"})
+    assert len(statements) == 1
+    assert (updated.name, updated.notes, updated.version) == ("test_dish_2", "notes", 2)
+    assert updated.updated_at > dish.updated_at
+    assert test_db.get_one_by_id(Dish, 1).name == "test_dish_2"
+
+
+def test_update_versioned_conflict(test_db):
+    """Verify that an update of a version that was overwritten fails and changes nothing"""
+    test_db.insert_one(Dish(name="test_dish"))
+    test_db.update_versioned(Dish, 1, 1, {"name": "first edit"})
+
+    with pytest.raises(VersionConflictError) as error:
+        test_db.update_versioned(Dish, 1, 1, {"name": "second edit"})
+    assert error.value.current == 2
+    assert test_db.get_one_by_id(Dish, 1).name == "first edit"
+
+    with pytest.raises(VersionConflictError) as error:
+        test_db.update_versioned(Dish, 2, 1, {"name": "missing"})
+    assert error.value.current is None
+
+    with pytest.raises(ValueError):
+        test_db.update_versioned(Recipe, 1, 1, {"url": "https://example.com"})
+
+
+def test_writes_increment_version(test_db):
+    """Verify that ORM and bulk writes move the version too, and stale merges are refused"""
+    test_db.insert_one(Dish(name="test_dish"))
+    stale = test_db.get_one_by_id(Dish, 1)
+
+    dish = test_db.get_one_by_id(Dish, 1)
+    dish.name = "test_dish_2"
+    assert test_db.upsert(dish).version == 2
+    test_db.bulk_upsert(Dish, [{"id": 1, "name": "test_dish_3"}])
+    assert test_db.get_one_by_id(Dish, 1).version == 3
+
+    stale.name = "stale edit"
+    with pytest.raises(StaleDataError):
+        test_db.upsert(stale)
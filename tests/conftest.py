@@ -1,16 +1,147 @@
-from typing import Any, Generator
+import asyncio
+import os
+from contextlib import contextmanager
+from typing import Any, Callable, ContextManager, Coroutine, Generator, Iterator
 
 import pytest
+from dash import Dash
+from sqlalchemy import event
+from sqlalchemy.schema import DropSchema
 
-from database.utils.connection import RecipeDBAccess
+from database.schema.models import SCHEMA
+from database.utils.async_connection import AsyncRecipeDBAccess
+from database.utils.connection import Credentials, RecipeDBAccess
+
+# Statements test_db wraps around each session, which are not part of the code under test
+SAVEPOINT_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+@pytest.fixture(scope="session")
+def worker_db() -> Generator[RecipeDBAccess, Any, Any]:
+    """Returns the database of this test process, with the tables in a schema of its own
+
+    Every pytest-xdist worker gets its own schema, created once and dropped at the end of the
+    run, so workers never see each other's rows. from_env returns this instance for the whole
+    run, also in the application code under test.
+    """
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("TEST_POSTGRES_SCHEMA", f"{SCHEMA}_test_{worker}")
+        patch.setattr(RecipeDBAccess, "_instance", None)
+        patch.setattr(AsyncRecipeDBAccess, "_instance", None)
+        credentials = Credentials.from_env()
+        assert not credentials.is_production, "Test database not being used"
+
+        db = RecipeDBAccess.from_env()
+        # An interrupted run leaves its schema behind, possibly at an older version
+        drop_schema(db)
+        db.create_tables()
+        yield db
+        drop_schema(db)
+        db.dispose()
+
+
+def drop_schema(db: RecipeDBAccess) -> None:
+    """Drops the schema of a test database, and everything in it"""
+    with db._engine.begin() as connection:
+        connection.execute(DropSchema(db.schema, cascade=True, if_exists=True))
+
+
+@pytest.fixture
+def test_db(request: pytest.FixtureRequest, worker_db: RecipeDBAccess) -> Iterator[RecipeDBAccess]:
+    """Returns a test database connection
+
+    The test runs in a transaction that is rolled back afterwards, and its sessions commit to
+    SAVEPOINTs inside it, so now() is the same for all of them. Tests marked `committed`, and
+    those using async_test_db, whose engine cannot see that transaction, commit for real and
+    get the tables recreated instead.
+    """
+    if request.node.get_closest_marker("committed") or "async_test_db" in request.fixturenames:
+        # Sequences ignore rollbacks, restart them so that every test's ids start at 1
+        worker_db.sync_sequences()
+        yield worker_db
+        worker_db.drop_tables(force=True)
+        worker_db.create_tables()
+        return
+
+    with worker_db._engine.connect() as connection:
+        transaction = connection.begin()
+        with worker_db.bind(connection):
+            worker_db.sync_sequences()
+            yield worker_db
+        transaction.rollback()
+
+
+@pytest.fixture
+def async_test_db(test_db: RecipeDBAccess) -> AsyncRecipeDBAccess:
+    """Returns an asyncio test database connection, on the tables created by test_db"""
+    return AsyncRecipeDBAccess(credentials=test_db._credentials)
+
+
+@pytest.fixture
+def run_async(async_test_db: AsyncRecipeDBAccess) -> Callable[[Coroutine], Any]:
+    """Returns a function that runs a coroutine in a new event loop
+
+    The engine is disposed before the loop closes, because asyncpg connections cannot be
+    reused from another event loop.
+    """
+
+    def run(coro: Coroutine) -> Any:
+        async def main() -> Any:
+            try:
+                return await coro
+            finally:
+                await async_test_db.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def count_queries(test_db: RecipeDBAccess) -> Callable[[], ContextManager[list[str]]]:
+    """Returns a context manager that records the SQL statements executed inside it"""
+
+    @contextmanager
+    def count() -> Iterator[list[str]]:
+        statements: list[str] = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if not statement.startswith(SAVEPOINT_STATEMENTS):
+                statements.append(statement)
+
+        event.listen(test_db._engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(test_db._engine, "before_cursor_execute", before_cursor_execute)
+
+    return count
+
+
+@pytest.fixture(scope="session")
+def app(worker_db: RecipeDBAccess) -> Dash:
+    """Returns the Dash app, with the callbacks of its pages registered"""
+    from tracker.app import app
+
+    app.server.test_client().get("/")  # The first request registers the callbacks
+    return app
+
+
+def find(component: Any, component_id: str) -> Any:
+    """Returns the component with the ID from the layout, or None"""
+    if getattr(component, "id", None) == component_id:
+        return component
+    children = getattr(component, "children", None)
+    for child in children if isinstance(children, list) else [children]:
+        if child is not None and not isinstance(child, str):
+            found = find(child, component_id)
+            if found is not None:
+                return found
+    return None
 
 
 @pytest.fixture
-def test_db() -> Generator[RecipeDBAccess, Any, Any]:
-    """Returns a test database connection"""
-    db = RecipeDBAccess.from_env()
-    assert not db._credentials.is_production, "Test database not being used"
-
-    db.create_tables()
-    yield db
-    db.drop_tables(force=True)
+def find_component() -> Callable[[Any, str], Any]:
+    """Returns a function that finds a component by its ID in a layout"""
+    return find
@@ -0,0 +1,25 @@
+from database.utils.cache import TTLCache
+from tracker.pages.common import callback_cache, dish_utils
+from tracker.pages.common.callback_cache import DISH_GENERATION_KEY, memoize_callback
+
+
+def test_memoize_callback(monkeypatch):
+    """Verify that results are reused until an ignored argument is the only change, and
+    recomputed once a dish is written"""
+    monkeypatch.setattr(callback_cache, "_callback_cache", TTLCache())
+    monkeypatch.setattr(dish_utils, "_dish_cache", TTLCache())
+    calls = []
+
+    @memoize_callback(DISH_GENERATION_KEY, ignore=["n_clicks"])
+    def update(n_clicks, page):
+        calls.append(page)
+        return f"page {page}"
+
+    assert update(0, 1) == "page 1"
+    assert update(5, 1) == "page 1"
+    assert update(5, 2) == "page 2"
+    assert calls == [1, 2]
+
+    dish_utils.invalidate_dish(1)
+    assert update(5, 1) == "page 1"
+    assert calls == [1, 2, 1]
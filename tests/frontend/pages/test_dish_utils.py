@@ -0,0 +1,117 @@
+import pytest
+
+from database.schema.models import Dish, DishRecipe, PeopleReview, Person, Recipe, Review
+from tracker.pages.common import dish_utils
+
+
+def test_get_cached_dish(test_db):
+    """Verify that a dish is read once and served from the cache afterwards"""
+    dish_utils.get_dish_cache().clear()
+    test_db.insert_one(Dish(name="test_dish", notes="see https://example.com"))
+
+    cached = dish_utils.get_cached_dish("1")
+    assert cached.dish.name == "test_dish"
+    assert cached.notes_markdown == "see [https://example.com](https://example.com)"
+
+    # Write behind the cache's back, the cached entry is still served
+    with test_db.get_session() as session:
+        session.get(Dish, 1).name = "test_dish_2"
+        session.commit()
+    assert dish_utils.get_cached_dish(1).dish.name == "test_dish"
+
+
+def test_upsert_dish_invalidates_cache(test_db):
+    """Verify that saving a dish through upsert_dish is never followed by a stale read"""
+    dish_utils.get_dish_cache().clear()
+    test_db.insert_one(Dish(name="test_dish"))
+    assert dish_utils.get_cached_dish(1).dish.name == "test_dish"
+
+    dish = dish_utils.get_dish_by_id(1)
+    dish.name = "test_dish_2"
+    dish_utils.upsert_dish(dish)
+    assert dish_utils.get_cached_dish(1).dish.name == "test_dish_2"
+
+
+def test_dish_notes_rendered_on_write(test_db):
+    """Verify that added and edited dishes store their rendered notes, which the cache serves"""
+    dish_utils.get_dish_cache().clear()
+    dish_utils.upsert_dish(Dish(name="test_dish", notes="see https://example.com"))
+    dish = test_db.get_one_by_id(Dish, 1)
+    assert dish.notes_rendered == "see [https://example.com](https://example.com)"
+    assert dish.notes_links == [{"url": "https://example.com", "host": "example.com"}]
+
+    dish_utils.update_dish(1, dish.version, name="test_dish", notes=None)
+    assert test_db.get_one_by_id(Dish, 1).notes_rendered == ""
+    assert dish_utils.get_cached_dish(1).notes_markdown == ""
+
+
+def test_get_cached_dish_missing(test_db):
+    """Verify that a missing dish is not cached"""
+    dish_utils.get_dish_cache().clear()
+    assert dish_utils.get_cached_dish(1) is None
+    assert len(dish_utils.get_dish_cache()) == 0
+
+
+def test_render_dish_notes_without_notes():
+    """Verify that a dish without notes renders as empty Markdown"""
+    assert dish_utils.render_dish_notes(None) == ""
+
+
+@pytest.mark.parametrize("size", [1, 10])
+def test_dish_detail_query_count(test_db, count_queries, size):
+    """Verify that rendering a dish's recipes and reviewers runs a constant number of statements"""
+    dish_utils.get_dish_cache().clear()
+    dish = Dish(name="test_dish")
+    dish.recipes = [DishRecipe(recipe=Recipe(url=f"https://example.com/{i}")) for i in range(size)]
+    dish.reviews = [
+        Review(people=[PeopleReview(person=Person(name=f"reviewer_{i}"))]) for i in range(size)
+    ]
+    test_db.insert_one(dish)
+
+    with count_queries() as statements:
+        cached = dish_utils.get_cached_dish(1)
+        recipes = dish_utils.make_html_dish_recipes(cached.dish)
+        reviewers = dish_utils.make_html_dish_reviewers(cached.dish)
+
+    # dishes, dish_recipes + recipes, reviews, people_reviews + people
+    assert len(statements) == 4
+    assert len(recipes.children[1].children) == size
+    assert len(reviewers.children[1].children) == size
+
+
+@pytest.mark.committed
+def test_patch_dish_list(test_db):
+    """Verify that changed dishes are replaced in place and new ones appended while there is
+    room"""
+    test_db.insert_many([Dish(name=f"test_dish_{i}") for i in range(2)])
+    listed = test_db.get_dish_page(limit=2)
+    cursor = test_db.get_dish_change_cursor()
+    dish = test_db.get_one_by_id(Dish, 2)
+    dish.name = "test_dish_renamed"
+    test_db.upsert(dish)
+    test_db.insert_many([Dish(name="test_dish_new_1"), Dish(name="test_dish_new_2")])
+    changes = test_db.get_dish_changes(after=cursor)
+
+    last = (listed[-1].created_at, listed[-1].id)
+    items, appended, overflow = dish_utils.patch_dish_list([1, 2], changes, last, room=1)
+    operations = [
+        (op["operation"], op["location"], op["params"]["value"].children.children)
+        for op in items.to_plotly_json()["operations"]
+    ]
+    assert operations == [
+        ("Assign", ["props", "children", 1], "test_dish_renamed"),
+        ("Append", ["props", "children"], "test_dish_new_1"),
+    ]
+    assert [dish.id for dish in appended] == [3]
+    assert overflow
+
+
+def test_similar_dishes_updated_on_write(test_db):
+    """Verify that a saved dish shows up among the similar dishes of the others"""
+    dish_utils.upsert_dish(Dish(name="chicken curry"))
+    assert dish_utils.make_html_similar_dishes(dish_utils.get_similar_dishes(1)).children is None
+
+    dish_utils.upsert_dish(Dish(name="spicy chicken curry"))
+    panel = dish_utils.make_html_similar_dishes(dish_utils.get_similar_dishes(1))
+    links = [item.children for item in panel.children[1].children]
+    assert [(link.children, link.href) for link in links] == [("spicy chicken curry", "/dish/2")]
@@ -0,0 +1,33 @@
+import dash
+import pytest
+
+from database.schema.models import Dish
+from database.utils.connection import VersionConflictError
+from tracker.pages.common import dish_utils
+
+
+def test_edit_page_reads_current_version(app, test_db, find_component):
+    """Verify that the editor is filled from the dish as stored, not as cached"""
+    dish_utils.get_dish_cache().clear()
+    test_db.insert_one(Dish(name="test_dish"))
+    assert dish_utils.get_cached_dish(1).dish.version == 1
+    # Written behind the cache's back, the cache keeps the first version
+    with test_db.get_session() as session:
+        session.get(Dish, 1).name = "test_dish_2"
+        session.commit()
+
+    layout = dash.page_registry["pages.edit.dish"]["layout"](dish_id=1)
+    assert find_component(layout, "dish-version").data == 2
+    assert find_component(layout, "dish-name").value == "test_dish_2"
+
+
+def test_update_dish_invalidates_cache(test_db):
+    """Verify that a versioned edit is visible through the cache, and a stale one is refused"""
+    dish_utils.get_dish_cache().clear()
+    test_db.insert_one(Dish(name="test_dish"))
+    cached = dish_utils.get_cached_dish(1).dish
+
+    dish_utils.update_dish(1, cached.version, name="test_dish_2", notes=None)
+    assert dish_utils.get_cached_dish(1).dish.name == "test_dish_2"
+    with pytest.raises(VersionConflictError):
+        dish_utils.update_dish(1, cached.version, name="test_dish_3", notes=None)
@@ -0,0 +1,55 @@
+import dash
+from dash import dcc
+
+from database.schema.models import Dish
+
+
+def server_callbacks(app, component_id: str) -> list[str]:
+    """Returns the server callbacks a change of the component triggers"""
+    return [
+        output
+        for output, callback in app.callback_map.items()
+        if any(dependency["id"] == component_id for dependency in callback["inputs"])
+    ]
+
+
+def test_callbacks_per_action(app, test_db, find_component):
+    """Verify that opening the editor costs no callback, and saving one that returns the URL"""
+    # Dash loads the pages itself, as pages.<module>
+    layouts = {name: page["layout"] for name, page in dash.page_registry.items()}
+    test_db.insert_one(Dish(name="test_dish"))
+    edit_link = find_component(layouts["pages.dish"](dish_id=1), "edit-link")
+    assert isinstance(edit_link, dcc.Link) and edit_link.href == "/edit/dish/1"
+
+    callbacks_per_action = {
+        "open the editor": server_callbacks(app, "edit-link"),
+        "add a dish": server_callbacks(app, "button-insert-dish"),
+        "save an edit": server_callbacks(app, "submit-button"),
+    }
+    assert {action: len(c) for action, c in callbacks_per_action.items()} == {
+        "open the editor": 0,
+        "add a dish": 1,
+        "save an edit": 1,
+    }
+    # The save callbacks navigate in the browser, instead of returning a component that
+    # reloads the whole app
+    for layout, location in [
+        (layouts["pages.add.dish"](), "url-add-dish"),
+        (layouts["pages.edit.dish"](dish_id=1), "url-edit-dish"),
+    ]:
+        assert find_component(layout, location).refresh == "callback-nav"
+
+    client = app.server.test_client()
+    (output,) = callbacks_per_action["add a dish"]
+    callback = app.callback_map[output]
+    values = {"button-insert-dish": 1, "dish-name": "test_dish_2", "dish-notes": ""}
+    response = client.post(
+        "/_dash-update-component",
+        json={
+            "output": output,
+            "inputs": [{**d, "value": values[d["id"]]} for d in callback["inputs"]],
+            "state": [{**d, "value": values[d["id"]]} for d in callback["state"]],
+            "changedPropIds": ["button-insert-dish.n_clicks"],
+        },
+    )
+    assert response.get_json()["response"] == {"url-add-dish": {"href": "/dish/2"}}
@@ -0,0 +1,25 @@
+import os
+
+from tracker.background import export_directory, prune_exports
+from tracker.settings import get_settings
+
+
+def test_export_archive(app, tmp_path, monkeypatch):
+    """Verify that archives are downloaded from the export directory only, until they expire"""
+    monkeypatch.setattr(get_settings(), "background_cache_dir", str(tmp_path))
+    exports = export_directory(str(tmp_path))
+    exports.mkdir(parents=True)
+    (exports / "recipe-export.zip").write_bytes(b"archive")
+    (tmp_path / "cache.db").write_bytes(b"cache")
+
+    client = app.server.test_client()
+    response = client.get("/export/recipe-export.zip")
+    assert response.status_code == 200 and response.data == b"archive"
+    assert response.headers["Content-Disposition"].startswith("attachment")
+    assert client.get("/export/..%2Fcache.db").data != b"cache"
+    assert client.get("/export/missing.zip").status_code == 404
+
+    os.utime(exports / "recipe-export.zip", (0, 0))
+    (exports / "recipe-export-2.zip").write_bytes(b"archive")
+    assert prune_exports(exports, max_age=3600) == [exports / "recipe-export.zip"]
+    assert [archive.name for archive in exports.iterdir()] == ["recipe-export-2.zip"]
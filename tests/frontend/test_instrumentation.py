@@ -0,0 +1,36 @@
+import pytest
+from dash.exceptions import PreventUpdate
+
+from database.utils.metrics import MetricsRegistry
+from tracker.instrumentation import CallbackInstrumentation
+
+
+def test_callback_instrumentation():
+    """Verify that callbacks are wrapped once, timed, and that failures are counted"""
+
+    def update(value):
+        if value is None:
+            raise PreventUpdate
+        if value < 0:
+            raise ValueError(value)
+        return value
+
+    registry = MetricsRegistry()
+    instrumentation = CallbackInstrumentation(registry, slow_threshold=0)
+    callback_map = {"output.children": {"callback": update}}
+    assert instrumentation.instrument(callback_map) == 1
+    assert instrumentation.instrument(callback_map) == 0
+
+    wrapped = callback_map["output.children"]["callback"]
+    name = f"{__name__}.update"
+    assert wrapped(1) == 1
+    with pytest.raises(PreventUpdate):
+        wrapped(None)
+    with pytest.raises(ValueError):
+        wrapped(-1)
+
+    assert (
+        registry.get_histogram("recipe_dash_callback_duration_seconds", callback=name)["count"] == 3
+    )
+    assert registry.get_counter("recipe_dash_callback_errors_total", callback=name) == 1
+    assert [entry["callback"] for entry in instrumentation.slow_log()] == [name] * 3
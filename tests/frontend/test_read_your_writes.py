@@ -0,0 +1,37 @@
+from dash import Dash, html
+
+from database.utils.replicas import read_from_primary
+from tracker.read_your_writes import COOKIE, mark_write, setup_read_your_writes
+
+
+def test_read_your_writes():
+    """Verify that a write keeps the writer's next requests, and only theirs, on the primary"""
+    app = Dash(__name__)
+    app.layout = html.Div()
+    setup_read_your_writes(app, seconds=60)
+    seen = []
+
+    @app.server.route("/write", methods=["POST"])
+    def write():
+        mark_write()
+        seen.append(read_from_primary.get())
+        return ""
+
+    @app.server.route("/read")
+    def read():
+        seen.append(read_from_primary.get())
+        return ""
+
+    writer = app.server.test_client()
+    response = writer.get("/read")
+    assert COOKIE not in response.headers.get("Set-Cookie", "")
+    response = writer.post("/write")
+    assert COOKIE in response.headers["Set-Cookie"]
+    writer.get("/read")
+    app.server.test_client().get("/read")
+    assert seen == [False, True, True, False]
+    assert not read_from_primary.get()
+
+    # Outside of a request, e.g. in a script, a write changes nothing
+    mark_write()
+    assert not read_from_primary.get()
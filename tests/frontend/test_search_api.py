@@ -0,0 +1,11 @@
+from database.schema.models import Dish
+
+
+def test_search_dish_paging(app, test_db):
+    """Verify that a negative limit or offset is clamped instead of failing the query"""
+    test_db.insert_many([Dish(name="chicken curry"), Dish(name="spicy chicken curry")])
+    client = app.server.test_client()
+    response = client.get("/api/search/dish?q=curry&limit=-1")
+    assert response.status_code == 200 and response.get_json() == []
+    response = client.get("/api/search/dish?q=curry&offset=-5")
+    assert response.status_code == 200 and len(response.get_json()) == 2
@@ -0,0 +1,49 @@
+from database.utils.cache import CacheOptions
+from database.utils.connection import Credentials, RecipeDBAccess
+from tracker import settings as app_settings
+from tracker.pages.common import dish_utils
+from tracker.settings import Settings, get_db, get_settings, reload_settings
+
+
+def test_settings_from_env(monkeypatch):
+    """Verify that the settings are read from the environment"""
+    monkeypatch.setenv("DISH_CACHE_SIZE", "7")
+    monkeypatch.setenv("INSTRUMENTATION", "True")
+    monkeypatch.setenv("SLOW_QUERY_MS", "25")
+    settings = Settings.from_env()
+    assert settings.dish_cache.size == 7
+    assert settings.instrumentation is True
+    assert settings.slow_query_ms == 25
+
+
+def test_get_db_reads_settings_once(test_db, monkeypatch):
+    """Verify that the database is looked up without reading the environment again"""
+    get_settings()
+
+    def from_env():
+        raise AssertionError("environment read")
+
+    monkeypatch.setattr(Credentials, "from_env", from_env)
+    monkeypatch.setattr(Settings, "from_env", from_env)
+    assert get_db() is test_db
+    assert RecipeDBAccess.from_env() is test_db
+
+
+def test_reload_settings(test_db, monkeypatch):
+    """Verify that a reload rebuilds the caches, and keeps the database if it is unchanged"""
+    previous = get_settings()
+    monkeypatch.setattr(app_settings, "_settings", previous)
+    assert dish_utils.get_dish_cache().maxsize == previous.dish_cache.size
+
+    settings = Settings(
+        credentials=previous.credentials,
+        engine_options=previous.engine_options,
+        dish_cache=CacheOptions("DISH", size=3),
+    )
+    assert reload_settings(settings) is get_settings()
+    try:
+        assert dish_utils.get_dish_cache().maxsize == 3
+        assert get_db() is test_db
+    finally:
+        reload_settings(previous)
+    assert dish_utils.get_dish_cache().maxsize == previous.dish_cache.size